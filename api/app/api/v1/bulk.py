@@ -0,0 +1,139 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.api.v1.schemas.kancelaria import BulkItemError, BulkResult
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+class _InvalidLine:
+    """Znacznik linii NDJSON, której nie udało się zdekodować"""
+
+
+def bulk_openapi(schema: Type[BaseModel]) -> dict:
+    """Opis ciała żądania masowego (tablica JSON lub strumień NDJSON) dla OpenAPI"""
+    item = {"$ref": f"#/components/schemas/{schema.__name__}"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": item}},
+                "application/x-ndjson": {"schema": item},
+            },
+        }
+    }
+
+
+async def iter_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Zwraca kolejne rekordy z ciała żądania wraz z indeksem.
+
+    Dla NDJSON ciało czytane jest strumieniowo, linia po linii, więc
+    duże importy nie są w całości trzymane w pamięci.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _decode_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _decode_line(buffer)
+        return
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Nieprawidłowy JSON w ciele żądania")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=422, detail="Oczekiwano tablicy rekordów")
+    if len(body) > settings.BULK_MAX_JSON_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Maksymalnie {settings.BULK_MAX_JSON_ITEMS} rekordów w tablicy JSON; "
+                   "większe importy należy przesyłać jako NDJSON"
+        )
+    for index, item in enumerate(body):
+        yield index, item
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return _InvalidLine()
+
+
+async def run_bulk(
+    request: Request,
+    db: Session,
+    schema: Type[BaseModel],
+    insert_batch: Callable,
+    atomic: bool = False,
+    overrides: Optional[dict] = None
+) -> BulkResult:
+    """
+    Waliduje rekordy i wstawia je partiami w jednej transakcji.
+
+    Błędy walidacji, brakujące rekordy nadrzędne i duplikaty są raportowane per rekord;
+    pozostałe rekordy są zapisywane. Przy `atomic=True` dowolny błąd
+    wycofuje całą operację. Naruszenie ograniczeń bazy wycofuje całość (409).
+    """
+    result = BulkResult()
+    batch = []
+
+    async def flush():
+        ids, errors = await run_in_threadpool(insert_batch, batch)
+        result.created_ids.extend(ids)
+        result.errors.extend(BulkItemError(**error) for error in errors)
+        batch.clear()
+
+    try:
+        async for index, item in iter_bulk_items(request):
+            if isinstance(item, _InvalidLine):
+                result.errors.append(BulkItemError(index=index, errors=[{"msg": "Nieprawidłowy JSON"}]))
+                continue
+            if overrides and isinstance(item, dict):
+                item = {**item, **overrides}
+            try:
+                batch.append((index, schema.model_validate(item)))
+            except ValidationError as exc:
+                result.errors.append(BulkItemError(index=index, errors=json.loads(exc.json(include_url=False))))
+                continue
+            if len(batch) >= settings.BULK_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+
+        if atomic and result.errors:
+            await run_in_threadpool(db.rollback)
+            result.created_ids = []
+        else:
+            await run_in_threadpool(db.commit)
+    except IntegrityError as exc:
+        await run_in_threadpool(db.rollback)
+        logger.warning("Operacja masowa %s wycofana: %s", request.url.path, exc.orig)
+        raise HTTPException(status_code=409, detail="Naruszenie ograniczeń bazy danych")
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
+
+    result.created = len(result.created_ids)
+    result.errors.sort(key=lambda error: error.index)
+    return result
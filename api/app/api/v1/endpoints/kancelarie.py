@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from app.db.session import get_db
+from app.core.query_budget import query_budget
+from app.api.v1.pagination import CURSOR_QUERY, list_response, paginated
+from app.api.v1.etag import check_if_match, conditional_get, set_validators
 from app.services.kancelaria_service import LawFirmService
 from app.api.v1.schemas.kancelaria import (
     LawFirm, LawFirmCreate, LawFirmUpdate, LawFirmWithStats
@@ -13,6 +16,7 @@ router = APIRouter()
 
 
 @router.post("/", response_model=LawFirm, status_code=201)
+@query_budget(2)
 def create_law_firm(
     law_firm_data: LawFirmCreate,
     db: Session = Depends(get_db)
@@ -34,21 +38,36 @@ def create_law_firm(
 
 
 @router.get("/", response_model=List[LawFirm])
+@query_budget(2)
 def get_law_firms(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Liczba rekordów do pominięcia"),
     limit: int = Query(100, ge=1, le=1000, description="Maksymalna liczba rekordów"),
+    cursor: Optional[str] = CURSOR_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Pobiera listę wszystkich kancelarii z paginacją.
+    
+    Kursory następnej i poprzedniej strony zwracane są w nagłówkach
+    `X-Next-Cursor` i `X-Prev-Cursor`. Z `If-None-Match` zwraca 304,
+    jeśli żadna kancelaria nie zmieniła się od wydania ETag.
     """
     service = LawFirmService(db)
-    return service.get_law_firms(skip=skip, limit=limit)
+    not_modified = conditional_get(request, response, service.get_law_firms_version())
+    if not_modified:
+        return not_modified
+    law_firms = paginated(response, service.get_law_firms_page, skip=skip, limit=limit, cursor=cursor)
+    return list_response(response, law_firms, LawFirm)
 
 
 @router.get("/{kancelaria_id}", response_model=LawFirmWithStats)
+@query_budget(2)
 def get_law_firm(
     kancelaria_id: UUID,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
@@ -58,17 +77,24 @@ def get_law_firm(
     - Liczba klientów
     - Liczba spraw
     - Liczba aktywnych spraw
+    
+    Odpowiedź ma ETag; z `If-None-Match` zwraca 304 po jednym tanim zapytaniu.
     """
     service = LawFirmService(db)
-    law_firm = service.get_law_firm(kancelaria_id)
-    
-    if not law_firm:
+    version = service.get_law_firm_version(kancelaria_id)
+    if not version:
         raise HTTPException(status_code=404, detail="Kancelaria nie została znaleziona")
+    not_modified = conditional_get(request, response, version)
+    if not_modified:
+        return not_modified
     
-    # Pobierz statystyki
-    stats = service.get_law_firm_stats(kancelaria_id)
+    result = service.get_law_firm_with_stats(kancelaria_id)
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Kancelaria nie została znaleziona")
     
     # Połącz dane kancelarii ze statystykami
+    law_firm, stats = result
     law_firm_dict = law_firm.__dict__.copy()
     law_firm_dict.update(stats)
     
@@ -76,26 +102,39 @@ def get_law_firm(
 
 
 @router.put("/{kancelaria_id}", response_model=LawFirm)
+@query_budget(5)
 def update_law_firm(
     kancelaria_id: UUID,
     law_firm_data: LawFirmUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Aktualizuje dane kancelarii.
     
     Można aktualizować wybrane pola - pola nie podane w żądaniu pozostaną bez zmian.
+    Z nagłówkiem `If-Match` (ETag z GET) zwraca 412, jeśli kancelaria zmieniła
+    się w międzyczasie. Odpowiedź zawiera ETag nowej wersji.
     """
     service = LawFirmService(db)
+    if "if-match" in request.headers:
+        version = service.get_law_firm_version(kancelaria_id, for_update=True)
+        if not version:
+            raise HTTPException(status_code=404, detail="Kancelaria nie została znaleziona")
+        check_if_match(request, version)
+    
     updated_law_firm = service.update_law_firm(kancelaria_id, law_firm_data)
     
     if not updated_law_firm:
         raise HTTPException(status_code=404, detail="Kancelaria nie została znaleziona")
     
+    set_validators(response, service.get_law_firm_version(kancelaria_id))
     return updated_law_firm
 
 
 @router.delete("/{kancelaria_id}", status_code=204)
+@query_budget(5)
 def delete_law_firm(
     kancelaria_id: UUID,
     db: Session = Depends(get_db)
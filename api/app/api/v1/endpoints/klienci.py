@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from app.db.session import get_db
-from app.services.kancelaria_service import ClientService
+from app.core.query_budget import query_budget
+from app.api.v1.pagination import CURSOR_QUERY, list_response, paginated
+from app.api.v1.etag import check_if_match, conditional_get, set_validators
+from app.api.v1.bulk import bulk_openapi, run_bulk
+from app.api.v1.export import EXPORT_FORMAT_QUERY, export_response
+from app.services.kancelaria_service import ClientService, CLIENT_EXPORT_COLUMNS
 from app.api.v1.schemas.kancelaria import (
-    Client, ClientCreate, ClientUpdate, ClientWithCases
+    Client, ClientCreate, ClientUpdate, ClientWithCases, BulkResult
 )
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Client, status_code=201)
+@query_budget(2)
 def create_client(
     client_data: ClientCreate,
     db: Session = Depends(get_db)
@@ -34,37 +41,104 @@ def create_client(
     return service.create_client(client_data)
 
 
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(ClientCreate))
+async def bulk_create_clients(
+    request: Request,
+    atomic: bool = Query(False, description="Wycofaj całą operację, jeśli którykolwiek rekord jest błędny"),
+    db: Session = Depends(get_db)
+):
+    """
+    Dodaje wielu klientów w jednej transakcji.
+    
+    Ciało żądania to tablica JSON lub strumień NDJSON (`Content-Type: application/x-ndjson`,
+    jeden klient w linii). Błędne rekordy są zwracane w `errors` z indeksem rekordu.
+    """
+    service = ClientService(db)
+    return await run_bulk(request, db, ClientCreate, service.bulk_create_clients, atomic=atomic)
+
+
 @router.get("/", response_model=List[Client])
+@query_budget(2)
 def get_clients(
+    request: Request,
+    response: Response,
     law_firm_id: Optional[UUID] = Query(None, description="Filtruj po ID kancelarii"),
     search: Optional[str] = Query(None, description="Wyszukaj po imieniu, nazwisku lub emailu"),
     skip: int = Query(0, ge=0, description="Liczba rekordów do pominięcia"),
     limit: int = Query(100, ge=1, le=1000, description="Maksymalna liczba rekordów"),
+    cursor: Optional[str] = CURSOR_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Pobiera listę klientów z opcjonalnym filtrowaniem i wyszukiwaniem.
     
     Można filtrować po kancelarii i wyszukiwać po imieniu, nazwisku lub emailu.
+    Wyszukiwanie dopasowuje początki słów, ignoruje polskie znaki i sortuje
+    wyniki według trafności (paginacja przez skip/limit).
+    Kursory następnej i poprzedniej strony zwracane są w nagłówkach
+    `X-Next-Cursor` i `X-Prev-Cursor`. Z `If-None-Match` zwraca 304,
+    jeśli żaden klient (kancelarii) nie zmienił się od wydania ETag.
     """
     service = ClientService(db)
+    not_modified = conditional_get(request, response, service.get_clients_version(law_firm_id))
+    if not_modified:
+        return not_modified
     
-    if search and law_firm_id:
-        return service.search_clients(law_firm_id, search, skip=skip, limit=limit)
+    if search:
+        clients = service.search_clients(law_firm_id, search, skip=skip, limit=limit)
     else:
-        return service.get_clients(law_firm_id=law_firm_id, skip=skip, limit=limit)
+        clients = paginated(
+            response, service.get_clients_page,
+            law_firm_id=law_firm_id, skip=skip, limit=limit, cursor=cursor
+        )
+    return list_response(response, clients, Client)
+
+
+@router.get("/export", response_class=StreamingResponse)
+@query_budget(1)
+def export_clients(
+    law_firm_id: Optional[UUID] = Query(None, description="Filtruj po ID kancelarii"),
+    format: str = EXPORT_FORMAT_QUERY,
+    db: Session = Depends(get_db)
+):
+    """
+    Eksportuje wszystkich klientów jako strumień NDJSON lub CSV.
+    
+    Rekordy są czytane kursorem po stronie serwera i wysyłane partiami,
+    więc zużycie pamięci nie zależy od liczby eksportowanych klientów.
+    """
+    service = ClientService(db)
+    return export_response(
+        db,
+        [column.key for column in CLIENT_EXPORT_COLUMNS],
+        service.export_clients(law_firm_id=law_firm_id),
+        format,
+        "klienci"
+    )
 
 
 @router.get("/{klient_id}", response_model=Client)
+@query_budget(2)
 def get_client(
     klient_id: UUID,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Pobiera szczegóły klienta.
+    
+    Odpowiedź ma ETag; z `If-None-Match` zwraca 304 po jednym tanim zapytaniu.
     """
     service = ClientService(db)
-    client = service.get_client(klient_id)
+    version = service.get_client_version(klient_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Klient nie został znaleziony")
+    not_modified = conditional_get(request, response, version)
+    if not_modified:
+        return not_modified
+    
+    client = service.get_client(klient_id, updated_at=version[1])
     
     if not client:
         raise HTTPException(status_code=404, detail="Klient nie został znaleziony")
@@ -73,26 +147,39 @@ def get_client(
 
 
 @router.put("/{klient_id}", response_model=Client)
+@query_budget(5)
 def update_client(
     klient_id: UUID,
     client_data: ClientUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Aktualizuje dane klienta.
     
     Można aktualizować wybrane pola - pola nie podane w żądaniu pozostaną bez zmian.
+    Z nagłówkiem `If-Match` (ETag z GET) zwraca 412, jeśli klient zmienił się
+    w międzyczasie. Odpowiedź zawiera ETag nowej wersji.
     """
     service = ClientService(db)
+    if "if-match" in request.headers:
+        version = service.get_client_version(klient_id, for_update=True)
+        if not version:
+            raise HTTPException(status_code=404, detail="Klient nie został znaleziony")
+        check_if_match(request, version)
+    
     updated_client = service.update_client(klient_id, client_data)
     
     if not updated_client:
         raise HTTPException(status_code=404, detail="Klient nie został znaleziony")
     
+    set_validators(response, service.get_client_version(klient_id))
     return updated_client
 
 
 @router.delete("/{klient_id}", status_code=204)
+@query_budget(3)
 def delete_client(
     klient_id: UUID,
     db: Session = Depends(get_db)
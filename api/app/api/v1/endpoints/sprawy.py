@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Set
 from uuid import UUID
 
 from app.db.session import get_db
-from app.services.kancelaria_service import CaseService, DocumentService, CaseNoteService
+from app.core.query_budget import query_budget
+from app.api.v1.pagination import CURSOR_QUERY, list_response, paginated
+from app.api.v1.etag import check_if_match, conditional_get, set_validators
+from app.api.v1.bulk import bulk_openapi, run_bulk
+from app.api.v1.export import EXPORT_FORMAT_QUERY, export_response
+from app.services.kancelaria_service import CaseService, DocumentService, CaseNoteService, CASE_EXPORT_COLUMNS
+from app.services.pagination import InvalidCursor
 from app.api.v1.schemas.kancelaria import (
-    Case, CaseCreate, CaseUpdate, CaseWithDetails,
+    Case, CaseCreate, CaseUpdate, CaseWithDetails, CaseStatistics,
+    Client, Profile,
     Document, DocumentCreate,
     CaseNote, CaseNoteCreate,
-    CaseStatus, CasePriority
+    CaseStatus, CasePriority,
+    BulkResult
 )
 
 router = APIRouter()
 
+# Pola, które można wybrać parametrem fields w GET /{sprawa_id}
+CASE_DETAIL_FIELDS = set(Case.model_fields) | {"client", "assigned_lawyer", "documents", "case_notes"}
+
 
 @router.post("/", response_model=Case, status_code=201)
+@query_budget(2)
 def create_case(
     case_data: CaseCreate,
     db: Session = Depends(get_db)
@@ -41,33 +56,99 @@ def create_case(
     return service.create_case(case_data)
 
 
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(CaseCreate))
+async def bulk_create_cases(
+    request: Request,
+    atomic: bool = Query(False, description="Wycofaj całą operację, jeśli którykolwiek rekord jest błędny"),
+    db: Session = Depends(get_db)
+):
+    """
+    Rejestruje wiele spraw w jednej transakcji.
+    
+    Ciało żądania to tablica JSON lub strumień NDJSON (`Content-Type: application/x-ndjson`,
+    jedna sprawa w linii). Błędne rekordy są zwracane w `errors` z indeksem rekordu.
+    """
+    service = CaseService(db)
+    return await run_bulk(request, db, CaseCreate, service.bulk_create_cases, atomic=atomic)
+
+
 @router.get("/", response_model=List[Case])
+@query_budget(2)
 def get_cases(
+    request: Request,
+    response: Response,
     law_firm_id: Optional[UUID] = Query(None, description="Filtruj po ID kancelarii"),
     client_id: Optional[UUID] = Query(None, description="Filtruj po ID klienta"),
     status: Optional[CaseStatus] = Query(None, description="Filtruj po statusie"),
     priority: Optional[CasePriority] = Query(None, description="Filtruj po priorytecie"),
     skip: int = Query(0, ge=0, description="Liczba rekordów do pominięcia"),
     limit: int = Query(100, ge=1, le=1000, description="Maksymalna liczba rekordów"),
+    cursor: Optional[str] = CURSOR_QUERY,
     db: Session = Depends(get_db)
 ):
     """
     Pobiera listę spraw z opcjonalnym filtrowaniem.
     
     Można filtrować po kancelarii, kliencie, statusie i priorytecie.
+    Kursory następnej i poprzedniej strony zwracane są w nagłówkach
+    `X-Next-Cursor` i `X-Prev-Cursor`. Z `If-None-Match` zwraca 304,
+    jeśli żadna sprawa spełniająca filtry nie zmieniła się od wydania ETag.
     """
     service = CaseService(db)
-    return service.get_cases(
+    not_modified = conditional_get(request, response, service.get_cases_version(
+        law_firm_id=law_firm_id,
+        client_id=client_id,
+        status=status,
+        priority=priority
+    ))
+    if not_modified:
+        return not_modified
+    cases = paginated(
+        response, service.get_cases_page,
         law_firm_id=law_firm_id,
         client_id=client_id,
         status=status,
         priority=priority,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor
+    )
+    return list_response(response, cases, Case)
+
+
+@router.get("/export", response_class=StreamingResponse)
+@query_budget(1)
+def export_cases(
+    law_firm_id: Optional[UUID] = Query(None, description="Filtruj po ID kancelarii"),
+    client_id: Optional[UUID] = Query(None, description="Filtruj po ID klienta"),
+    status: Optional[CaseStatus] = Query(None, description="Filtruj po statusie"),
+    priority: Optional[CasePriority] = Query(None, description="Filtruj po priorytecie"),
+    format: str = EXPORT_FORMAT_QUERY,
+    db: Session = Depends(get_db)
+):
+    """
+    Eksportuje wszystkie sprawy spełniające filtry jako strumień NDJSON lub CSV.
+    
+    Rekordy są czytane kursorem po stronie serwera i wysyłane partiami,
+    więc zużycie pamięci nie zależy od liczby eksportowanych spraw.
+    """
+    service = CaseService(db)
+    return export_response(
+        db,
+        [column.key for column in CASE_EXPORT_COLUMNS],
+        service.export_cases(
+            law_firm_id=law_firm_id,
+            client_id=client_id,
+            status=status,
+            priority=priority
+        ),
+        format,
+        "sprawy"
     )
 
 
-@router.get("/statistics")
+@router.get("/statistics", response_model=CaseStatistics)
+@query_budget(1)
 def get_case_statistics(
     law_firm_id: UUID = Query(..., description="ID kancelarii"),
     db: Session = Depends(get_db)
@@ -80,14 +161,45 @@ def get_case_statistics(
     - Liczbę aktywnych spraw
     - Liczbę oczekujących spraw
     - Liczbę pilnych spraw
+    - Podział spraw według statusu, priorytetu i przypisanego prawnika
+    
+    Wynik może być do `CASE_STATS_CACHE_TTL` sekund nieaktualny względem zmian
+    wykonanych przez inne procesy.
     """
     service = CaseService(db)
     return service.get_case_statistics(law_firm_id)
 
 
+@router.post("/statistics/refresh", status_code=204)
+@query_budget(1)
+def refresh_case_statistics(db: Session = Depends(get_db)):
+    """
+    Odświeża statystyki spraw wszystkich kancelarii.
+    
+    Przy `CASE_STATS_MATERIALIZED_VIEW` przelicza widok `case_statistics_mv`
+    (bez blokowania odczytów) - endpoint wywołuje się okresowo, np. z crona,
+    oraz po imporcie danych. Zawsze czyści cache statystyk procesu.
+    """
+    service = CaseService(db)
+    service.refresh_case_statistics_view()
+    return Response(status_code=204)
+
+
 @router.get("/{sprawa_id}", response_model=CaseWithDetails)
+@query_budget(4)
 def get_case(
     sprawa_id: UUID,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None,
+        description="Lista pól oddzielonych przecinkami (np. id,title,status,client). "
+                    "Pominięte pola nie są pobierane z bazy."
+    ),
+    documents_limit: int = Query(100, ge=1, le=1000, description="Maksymalna liczba dokumentów"),
+    documents_cursor: Optional[str] = Query(None, description="Kursor kolejnej strony dokumentów"),
+    notes_limit: int = Query(100, ge=1, le=1000, description="Maksymalna liczba notatek"),
+    notes_cursor: Optional[str] = Query(None, description="Kursor kolejnej strony notatek"),
     db: Session = Depends(get_db)
 ):
     """
@@ -96,39 +208,119 @@ def get_case(
     Zwraca sprawę wraz z:
     - Danymi klienta
     - Informacjami o przypisanym prawniku
-    - Listą dokumentów
-    - Notatkami do sprawy
+    - Listą dokumentów (maksymalnie `documents_limit`)
+    - Notatkami do sprawy (maksymalnie `notes_limit`)
+    
+    Kolejne strony dokumentów i notatek można pobrać kursorami
+    `documents_next_cursor` i `case_notes_next_cursor`.
+    
+    Odpowiedź ma ETag obejmujący sprawę, klienta, prawnika, dokumenty
+    i notatki; z `If-None-Match` zwraca 304 po jednym tanim zapytaniu.
     """
+    requested = parse_case_fields(fields)
     service = CaseService(db)
-    case = service.get_case(sprawa_id)
+    version = service.get_case_version(sprawa_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
+    not_modified = conditional_get(request, response, version)
+    if not_modified:
+        return not_modified
+    
+    try:
+        details = service.get_case_details(
+            sprawa_id,
+            fields=requested,
+            documents_limit=documents_limit,
+            documents_cursor=documents_cursor,
+            notes_limit=notes_limit,
+            notes_cursor=notes_cursor,
+            version=version
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     
-    if not case:
+    if not details:
         raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
     
-    return case
+    payload = case_details_payload(details, requested)
+    if requested is None:
+        return payload
+    
+    # Niepełny zestaw pól nie przejdzie walidacji response_model
+    return JSONResponse(content=jsonable_encoder(payload), headers=response.headers)
+
+
+def parse_case_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Zamienia parametr fields na zbiór nazw pól CaseWithDetails"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - CASE_DETAIL_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Nieznane pola: {', '.join(sorted(unknown))}"
+        )
+    return requested | {"id"}
+
+
+def case_details_payload(details, requested: Optional[Set[str]]) -> dict:
+    """Buduje odpowiedź szczegółów sprawy tylko z pobranych pól"""
+    def wanted(name: str) -> bool:
+        return requested is None or name in requested
+
+    case = details.case
+    payload = {name: getattr(case, name) for name in Case.model_fields if wanted(name)}
+    if wanted("client"):
+        payload["client"] = Client.model_validate(case.client)
+    if wanted("assigned_lawyer"):
+        payload["assigned_lawyer"] = (
+            Profile.model_validate(case.assigned_lawyer) if case.assigned_lawyer else None
+        )
+    if wanted("documents"):
+        payload["documents"] = [Document.model_validate(item) for item in details.documents.items]
+        payload["documents_next_cursor"] = details.documents.next_cursor
+    if wanted("case_notes"):
+        payload["case_notes"] = [CaseNote.model_validate(item) for item in details.case_notes.items]
+        payload["case_notes_next_cursor"] = details.case_notes.next_cursor
+    return payload
 
 
 @router.put("/{sprawa_id}", response_model=Case)
+@query_budget(5)
 def update_case(
     sprawa_id: UUID,
     case_data: CaseUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Aktualizuje dane sprawy.
     
     Można aktualizować wybrane pola - pola nie podane w żądaniu pozostaną bez zmian.
+    Z nagłówkiem `If-Match` (ETag z GET /{sprawa_id}) zwraca 412, jeśli sprawa
+    lub jej dane powiązane zmieniły się w międzyczasie. Odpowiedź zawiera
+    ETag nowej wersji.
     """
     service = CaseService(db)
+    if "if-match" in request.headers:
+        version = service.get_case_version(sprawa_id, for_update=True)
+        if not version:
+            raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
+        check_if_match(request, version)
+    
     updated_case = service.update_case(sprawa_id, case_data)
     
     if not updated_case:
         raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
     
+    set_validators(response, service.get_case_version(sprawa_id))
     return updated_case
 
 
 @router.delete("/{sprawa_id}", status_code=204)
+@query_budget(3)
 def delete_case(
     sprawa_id: UUID,
     db: Session = Depends(get_db)
@@ -149,6 +341,7 @@ def delete_case(
 
 # Endpointy dla dokumentów
 @router.post("/{sprawa_id}/documents", response_model=Document, status_code=201)
+@query_budget(3)
 def add_document_to_case(
     sprawa_id: UUID,
     document_data: DocumentCreate,
@@ -158,9 +351,7 @@ def add_document_to_case(
     Dodaje dokument do sprawy.
     """
     # Sprawdź czy sprawa istnieje
-    case_service = CaseService(db)
-    case = case_service.get_case(sprawa_id)
-    if not case:
+    if not CaseService(db).case_exists(sprawa_id):
         raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
     
     # Ustaw case_id
@@ -170,7 +361,30 @@ def add_document_to_case(
     return service.create_document(document_data)
 
 
+@router.post(
+    "/{sprawa_id}/documents/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(DocumentCreate)
+)
+async def bulk_add_documents_to_case(
+    sprawa_id: UUID,
+    request: Request,
+    atomic: bool = Query(False, description="Wycofaj całą operację, jeśli którykolwiek rekord jest błędny"),
+    db: Session = Depends(get_db)
+):
+    """
+    Dodaje wiele dokumentów do sprawy w jednej transakcji (tablica JSON lub NDJSON).
+    """
+    if not await run_in_threadpool(CaseService(db).case_exists, sprawa_id):
+        raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
+    
+    service = DocumentService(db)
+    return await run_bulk(
+        request, db, DocumentCreate, service.bulk_create_documents,
+        atomic=atomic, overrides={"case_id": str(sprawa_id)}
+    )
+
+
 @router.get("/{sprawa_id}/documents", response_model=List[Document])
+@query_budget(1)
 def get_case_documents(
     sprawa_id: UUID,
     db: Session = Depends(get_db)
@@ -183,6 +397,7 @@ def get_case_documents(
 
 
 @router.delete("/documents/{document_id}", status_code=204)
+@query_budget(2)
 def delete_document(
     document_id: UUID,
     db: Session = Depends(get_db)
@@ -201,6 +416,7 @@ def delete_document(
 
 # Endpointy dla notatek
 @router.post("/{sprawa_id}/notes", response_model=CaseNote, status_code=201)
+@query_budget(3)
 def add_note_to_case(
     sprawa_id: UUID,
     note_data: CaseNoteCreate,
@@ -210,9 +426,7 @@ def add_note_to_case(
     Dodaje notatkę do sprawy.
     """
     # Sprawdź czy sprawa istnieje
-    case_service = CaseService(db)
-    case = case_service.get_case(sprawa_id)
-    if not case:
+    if not CaseService(db).case_exists(sprawa_id):
         raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
     
     # Ustaw case_id
@@ -222,7 +436,30 @@ def add_note_to_case(
     return service.create_case_note(note_data)
 
 
+@router.post(
+    "/{sprawa_id}/notes/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(CaseNoteCreate)
+)
+async def bulk_add_notes_to_case(
+    sprawa_id: UUID,
+    request: Request,
+    atomic: bool = Query(False, description="Wycofaj całą operację, jeśli którykolwiek rekord jest błędny"),
+    db: Session = Depends(get_db)
+):
+    """
+    Dodaje wiele notatek do sprawy w jednej transakcji (tablica JSON lub NDJSON).
+    """
+    if not await run_in_threadpool(CaseService(db).case_exists, sprawa_id):
+        raise HTTPException(status_code=404, detail="Sprawa nie została znaleziona")
+    
+    service = CaseNoteService(db)
+    return await run_bulk(
+        request, db, CaseNoteCreate, service.bulk_create_case_notes,
+        atomic=atomic, overrides={"case_id": str(sprawa_id)}
+    )
+
+
 @router.get("/{sprawa_id}/notes", response_model=List[CaseNote])
+@query_budget(1)
 def get_case_notes(
     sprawa_id: UUID,
     include_private: bool = Query(True, description="Czy uwzględnić prywatne notatki"),
@@ -236,6 +473,7 @@ def get_case_notes(
 
 
 @router.delete("/notes/{note_id}", status_code=204)
+@query_budget(2)
 def delete_case_note(
     note_id: UUID,
     db: Session = Depends(get_db)
@@ -0,0 +1,97 @@
+"""
+Warunkowe żądania HTTP (ETag, If-None-Match, If-Match).
+
+Wersja zasobu to krotka zwracana przez tanie zapytanie serwisu
+(`get_*_version`) - identyfikator i `updated_at` rekordu oraz liczniki
+i najpóźniejsze zmiany danych powiązanych, a dla list liczba rekordów
+i maksymalne `updated_at` po filtrach. ETag jest skrótem wersji
+i parametrów zapytania, więc przy zgodnym `If-None-Match` endpoint
+odpowiada 304 bez ładowania i serializacji danych.
+
+Wersja odczytywana jest przed danymi - zmiana pomiędzy oboma zapytaniami
+daje co najwyżej nieaktualny ETag przy świeższych danych (kolejne
+żądanie pobierze je ponownie), nigdy odwrotnie.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(version: Sequence, variant: str = "") -> str:
+    """Silny ETag dla wersji zasobu i wariantu reprezentacji (parametrów zapytania)"""
+    raw = "|".join(str(value) for value in version) + "#" + variant
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def last_modified(version: Sequence) -> Optional[datetime]:
+    """Najpóźniejsza data w wersji zasobu (daty bez strefy traktowane jako UTC)"""
+    dates = [
+        value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        for value in version if isinstance(value, datetime)
+    ]
+    return max(dates) if dates else None
+
+
+def validator_headers(version: Sequence, variant: str = "") -> Dict[str, str]:
+    """
+    Nagłówki ETag, Last-Modified i Cache-Control dla wersji zasobu.
+
+    `no-cache` każe klientom zawsze walidować kopię. Last-Modified jest
+    informacyjny - warunki opieramy na ETag, bo usunięcie rekordu nie
+    zmienia najpóźniejszej daty modyfikacji.
+    """
+    headers = {ETAG_HEADER: make_etag(version, variant), "Cache-Control": "no-cache"}
+    modified = last_modified(version)
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def set_validators(response: Response, version: Optional[Sequence]) -> None:
+    """Ustawia nagłówki walidacji (np. po zapisie - ETag nowej wersji zasobu)"""
+    if version is not None:
+        response.headers.update(validator_headers(version))
+
+
+def _parse_etags(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def conditional_get(request: Request, response: Response, version: Sequence) -> Optional[Response]:
+    """
+    Ustawia nagłówki walidacji odpowiedzi i zwraca odpowiedź 304, gdy
+    `If-None-Match` zawiera aktualny ETag (porównanie słabe, RFC 9110).
+    W przeciwnym razie zwraca None - endpoint ładuje i zwraca dane.
+    """
+    headers = validator_headers(version, request.url.query)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = headers[ETAG_HEADER]
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in _parse_etags(if_none_match)]
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def check_if_match(request: Request, version: Sequence) -> None:
+    """
+    Sprawdza `If-Match` przed modyfikacją zasobu (optymistyczna kontrola
+    współbieżności). ETag porównywany jest z reprezentacją zasobu bez
+    parametrów zapytania, czyli z tą zwracaną przez GET i PUT.
+    """
+    if_match = request.headers.get("if-match")
+    if not if_match:
+        return
+    tags = _parse_etags(if_match)
+    if "*" in tags or make_etag(version) in tags:
+        return
+    raise HTTPException(
+        status_code=412,
+        detail="Zasób został zmieniony przez inne żądanie - pobierz aktualną wersję"
+    )
@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, Sequence
+from uuid import UUID
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXPORT_FORMAT_QUERY = Query(
+    "ndjson",
+    pattern="^(ndjson|csv)$",
+    description="Format eksportu: ndjson (jeden rekord JSON w linii) lub csv"
+)
+
+
+def export_value(value: Any) -> Any:
+    """Zamienia wartość kolumny na typ zapisywalny w JSON/CSV (jak w odpowiedziach API)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_ndjson(columns: Sequence[str], partitions: Iterator[Sequence]) -> Iterator[bytes]:
+    """Koduje partie wierszy jako NDJSON - jeden fragment odpowiedzi na partię"""
+    for rows in partitions:
+        yield "".join(
+            json.dumps(
+                {name: export_value(value) for name, value in zip(columns, row)},
+                ensure_ascii=False
+            ) + "\n"
+            for row in rows
+        ).encode()
+
+
+def encode_csv(columns: Sequence[str], partitions: Iterator[Sequence]) -> Iterator[bytes]:
+    """Koduje partie wierszy jako CSV z nagłówkiem - jeden fragment odpowiedzi na partię"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, aby Excel poprawnie rozpoznał polskie znaki
+    buffer.write("﻿")
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([export_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    db: Session,
+    columns: Sequence[str],
+    partitions: Iterator[Sequence],
+    export_format: str,
+    filename: str
+) -> StreamingResponse:
+    """
+    Buduje odpowiedź strumieniową z partii wierszy.
+
+    Odpowiedź jest wysyłana w trakcie czytania kursora, więc sesja bazy
+    danych jest zamykana dopiero po zakończeniu (lub przerwaniu) strumienia.
+    """
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+
+    def stream() -> Iterator[bytes]:
+        try:
+            yield from encode(columns, partitions)
+        finally:
+            partitions.close()
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
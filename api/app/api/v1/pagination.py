@@ -0,0 +1,47 @@
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel
+from typing import Optional, Type
+
+from app.core.config import settings
+from app.core.serialization import RawJSONResponse, serializer_for
+from app.services.pagination import Page, InvalidCursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+CURSOR_QUERY = Query(
+    None,
+    description="Kursor strony (z nagłówka X-Next-Cursor lub X-Prev-Cursor). "
+                "Gdy podany, parametr skip jest ignorowany."
+)
+
+
+def paginated(response: Response, load_page, *args, **kwargs) -> list:
+    """
+    Pobiera stronę wyników i zapisuje kursory sąsiednich stron
+    w nagłówkach odpowiedzi. Zwraca listę rekordów.
+    """
+    try:
+        page: Page = load_page(*args, **kwargs)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.prev_cursor:
+        response.headers[PREV_CURSOR_HEADER] = page.prev_cursor
+    return page.items
+
+
+def list_response(response: Response, items: list, schema: Type[BaseModel]):
+    """
+    Zwraca listę rekordów do serializacji przez response_model albo - przy
+    `FAST_SERIALIZATION` - gotową odpowiedź JSON zbudowaną wprost z obiektów
+    ORM (bez ponownej walidacji), z zachowaniem nagłówków kursorów.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return items
+    return RawJSONResponse(
+        serializer_for(schema).dumps_many(items),
+        headers={name: value for name, value in response.headers.items() if name != "content-length"}
+    )
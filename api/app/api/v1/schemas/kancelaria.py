@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, date
 from uuid import UUID
 from enum import Enum
@@ -240,6 +240,37 @@ class CaseWithDetails(Case):
     assigned_lawyer: Optional[Profile] = None
     documents: List[Document] = []
     case_notes: List[CaseNote] = []
+    documents_next_cursor: Optional[str] = None
+    case_notes_next_cursor: Optional[str] = None
+
+
+# Statistics schemas
+class LawyerCaseStatistics(BaseModel):
+    assigned_lawyer_id: Optional[UUID] = None
+    total_cases: int = 0
+    active_cases: int = 0
+
+
+class CaseStatistics(BaseModel):
+    total_cases: int = 0
+    active_cases: int = 0
+    pending_cases: int = 0
+    urgent_cases: int = 0
+    by_status: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}
+    by_lawyer: List[LawyerCaseStatistics] = []
+
+
+# Bulk operation schemas
+class BulkItemError(BaseModel):
+    index: int
+    errors: List[dict]
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    created_ids: List[UUID] = []
+    errors: List[BulkItemError] = []
 
 
 # Pagination
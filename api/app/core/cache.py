@@ -0,0 +1,306 @@
+"""
+Cache aplikacji.
+
+`TTLCache` to cache LRU w pamięci procesu, `RedisCache` - wspólny cache
+wszystkich procesów w Redis (zależność opcjonalna). Oba backendy mają ten
+sam interfejs (get/set/delete/clear oraz licznik unieważnień), więc
+`ReadThroughCache` działa z dowolnym z nich: przy braku wpisu ładuje wartość
+jednym wywołaniem na klucz (single-flight) i zlicza trafienia w metrykach
+`cache_requests_total`.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.core.metrics import registry
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis jest zależnością opcjonalną
+    redis = None
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Odczyty cache według wyniku (hit/miss)",
+    labels=("cache", "result")
+)
+CACHE_LOADS = registry.counter(
+    "cache_loads_total", "Wartości załadowane ze źródła po braku trafienia",
+    labels=("cache",)
+)
+CACHE_COALESCED = registry.counter(
+    "cache_coalesced_total", "Braki trafienia obsłużone przez trwające już ładowanie (single-flight)",
+    labels=("cache",)
+)
+
+
+class TTLCache:
+    """
+    Wątkowo bezpieczny cache LRU z czasem życia wpisów.
+
+    Po przekroczeniu `maxsize` usuwany jest najdawniej używany wpis.
+    Wpisy starsze niż `ttl` sekund są traktowane jak brakujące.
+    `ttl <= 0` wyłącza cache (get zawsze zwraca brak trafienia).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def generation(self) -> int:
+        """Licznik unieważnień (zwiększany przez next_generation)"""
+        return self._generation
+
+    def next_generation(self) -> int:
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def set_if_generation(self, key: Hashable, value: Any, generation: int) -> bool:
+        """Zapisuje wartość, jeśli od odczytu `generation` nie było unieważnienia"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self._store(key, value)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """
+    Cache w Redis współdzielony przez procesy aplikacji.
+
+    Wartości są serializowane modułem pickle - Redis musi być zaufanym,
+    wewnętrznym serwerem. Klucze dostają prefiks `prefix`, a `clear` usuwa
+    tylko klucze z tym prefiksem. `ttl <= 0` wyłącza cache. Licznik
+    unieważnień jest kluczem w Redis, więc unieważnienie w jednym procesie
+    blokuje zapis wartości odczytanych w tym czasie przez wszystkie procesy.
+    """
+
+    GENERATION_KEY = "__generation__"
+
+    def __init__(self, client, ttl: float = 60.0, prefix: str = ""):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        if redis is None:
+            raise RuntimeError("Backend cache redis wymaga pakietu redis (pip install redis)")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        raw = self.client.get(self._key(key))
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        self.client.set(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=ttl_ms)
+
+    def delete(self, key: Hashable) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        generation_key = self._key(self.GENERATION_KEY).encode()
+        keys = [key for key in self.client.scan_iter(match=f"{self.prefix}*") if key != generation_key]
+        if keys:
+            self.client.delete(*keys)
+
+    def generation(self) -> int:
+        """Licznik unieważnień wspólny dla procesów"""
+        return int(self.client.get(self._key(self.GENERATION_KEY)) or 0)
+
+    def next_generation(self) -> int:
+        return self.client.incr(self._key(self.GENERATION_KEY))
+
+    def set_if_generation(self, key: Hashable, value: Any, generation: int) -> bool:
+        """
+        Zapisuje wartość, jeśli od odczytu `generation` żaden proces nie
+        unieważnił wpisu (WATCH na liczniku - sprawdzenie i zapis są atomowe).
+        """
+        if not self.enabled:
+            return False
+        generation_key = self._key(self.GENERATION_KEY)
+        ttl_ms = int(self.ttl * 1000)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(generation_key)
+                if int(pipe.get(generation_key) or 0) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(self._key(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=ttl_ms)
+                pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Łączy równoczesne wywołania dla tego samego klucza: funkcję wykonuje
+    pierwszy wątek, pozostałe czekają na jej wynik (lub wyjątek).
+    Chroni źródło danych przed lawiną zapytań po wygaśnięciu gorącego klucza
+    (w obrębie procesu).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple:
+        """Zwraca (wynik, czy_wynik_współdzielony)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class ReadThroughCache:
+    """
+    Cache odczytu przez źródło (read-through) nad backendem TTLCache lub RedisCache.
+
+    `get_or_load` zwraca wartość z backendu albo ładuje ją funkcją `loader`
+    (single-flight per klucz) i zapisuje. Wartości None nie są zapisywane.
+    Wartość załadowana w trakcie unieważnienia dowolnego klucza nie trafia
+    do cache, żeby nie nadpisać świeższego stanu starszym odczytem. Licznik
+    unieważnień przechowuje backend - przy Redis obejmuje on wszystkie procesy.
+    """
+
+    def __init__(self, name: str, backend):
+        self.name = name
+        self.backend = backend
+        self._flights = SingleFlight()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.enabled
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return loader()
+
+        value = self.backend.get(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return value
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+
+        def load():
+            generation = self.backend.generation()
+            loaded = loader()
+            CACHE_LOADS.inc(cache=self.name)
+            if loaded is not None:
+                self.backend.set_if_generation(key, loaded, generation)
+            return loaded
+
+        value, shared = self._flights.do(key, load)
+        if shared:
+            CACHE_COALESCED.inc(cache=self.name)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        self.backend.next_generation()
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.next_generation()
+        self.backend.clear()
+
+
+def create_cache_backend(backend: str, maxsize: int, ttl: float, redis_url: Optional[str] = None, prefix: str = ""):
+    """Tworzy backend cache: "memory", "redis" lub "none" (wyłączony)"""
+    if backend == "memory":
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("Backend cache redis wymaga ustawienia CACHE_REDIS_URL")
+        return RedisCache.from_url(redis_url, ttl=ttl, prefix=prefix)
+    if backend == "none":
+        return TTLCache(maxsize=0, ttl=0)
+    raise ValueError(f"Nieznany backend cache: {backend}")
@@ -12,6 +12,51 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    # Read replicas for GET requests (JSON list of URLs); empty = everything on the primary
+    DATABASE_READ_URLS: list[str] = []
+    # "round_robin" or "least_connections" (fewest checked-out connections)
+    READ_REPLICA_STRATEGY: str = "round_robin"
+    # After a write the client reads from the primary for this long (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Skip replicas lagging more than this (seconds, 0 = no limit); health check period
+    REPLICA_MAX_LAG_SECONDS: float = 10.0
+    REPLICA_CHECK_INTERVAL: float = 5.0
+    # Read firm stats from the trigger-maintained law_firm_stats table
+    LAW_FIRM_STATS_COUNTERS: bool = False
+    # Case statistics cache (seconds, 0 disables) and materialized view source
+    CASE_STATS_CACHE_TTL: int = 30
+    CASE_STATS_CACHE_SIZE: int = 1024
+    CASE_STATS_MATERIALIZED_VIEW: bool = False
+    # Read-through cache of single firms, clients and cases: "memory" (per process),
+    # "redis" (shared, needs CACHE_REDIS_URL) or "none"; TTL in seconds, 0 disables
+    ENTITY_CACHE_BACKEND: str = "memory"
+    ENTITY_CACHE_TTL: int = 60
+    ENTITY_CACHE_SIZE: int = 10000
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_KEY_PREFIX: str = "kancelaria:"
+    # Bulk endpoints: rows per INSERT batch and max items in a JSON array body
+    BULK_BATCH_SIZE: int = 1000
+    BULK_MAX_JSON_ITEMS: int = 10000
+    # Streaming exports: rows fetched per server-side cursor round trip
+    EXPORT_BATCH_SIZE: int = 1000
+    # Serialize list endpoints straight from ORM rows, skipping response_model validation
+    FAST_SERIALIZATION: bool = False
+    # Connection pool (per process; size * uvicorn workers must fit max_connections)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # True: SELECT 1 on every checkout; False: rely on DB_POOL_RECYCLE and reconnect on error
+    DB_POOL_PRE_PING: bool = True
+    # Server-side statement timeout in milliseconds (PostgreSQL, 0 disables)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # Log every SQL statement (independent of DEBUG)
+    DB_ECHO: bool = False
+    # Log queries slower than this with their route (milliseconds, 0 disables)
+    SLOW_QUERY_MS: float = 500.0
+    # Check per-endpoint query budgets and repeated lazy loads (tests, staging)
+    QUERY_BUDGET_CHECKS: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 2
     
     # Supabase (optional)
     SUPABASE_URL: Optional[str] = None
@@ -25,7 +70,7 @@ class Settings(BaseSettings):
     
     # Environment
     ENVIRONMENT: str = "development"
-    DEBUG: bool = True
+    DEBUG: bool = False
     
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = [
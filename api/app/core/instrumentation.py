@@ -0,0 +1,154 @@
+"""
+Instrumentacja żądań HTTP i zapytań SQL.
+
+Middleware ASGI mierzy czas obsługi żądania (perf_counter) i zapisuje go
+w histogramie według szablonu ścieżki. Zdarzenia SQLAlchemy
+`before_cursor_execute`/`after_cursor_execute` zliczają zapytania i czas
+bazy danych bieżącego żądania; wolne zapytania są logowane razem z trasą.
+Wyniki trafiają do rejestru z `app.core.metrics` i nagłówka `Server-Timing`.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import QUERY_COUNT_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Czas obsługi żądania HTTP",
+    labels=("method", "route", "status")
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "Liczba zapytań SQL wykonanych w ramach żądania",
+    labels=("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = registry.histogram(
+    "http_request_db_duration_seconds", "Łączny czas zapytań SQL w ramach żądania",
+    labels=("method", "route")
+)
+SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "Zapytania SQL dłuższe niż SLOW_QUERY_MS",
+    labels=("route",)
+)
+
+
+class RequestStats:
+    """Liczniki zapytań SQL bieżącego żądania"""
+    __slots__ = ("scope", "queries", "db_seconds", "lazy_loads")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        # relacja (np. "Case.client") -> liczba leniwych ładowań, patrz app.core.query_budget
+        self.lazy_loads = {}
+
+    @property
+    def method(self) -> str:
+        return self.scope.get("method", "")
+
+    @property
+    def route(self) -> str:
+        # Szablon ścieżki (np. /api/v1/sprawy/{sprawa_id}) ogranicza liczbę
+        # etykiet niezależnie od identyfikatorów w URL. Odtwarzamy go z
+        # parametrów ścieżki, bo route.path trasy z dołączonego routera
+        # nie zawsze zawiera prefiks.
+        if self.scope.get("route") is None:
+            return UNMATCHED_ROUTE
+        path = self.scope.get("path", "")
+        params = {str(value): name for name, value in (self.scope.get("path_params") or {}).items()}
+        if not params:
+            return path
+        return "/".join(
+            "{" + params[segment] + "}" if segment in params else segment
+            for segment in path.split("/")
+        )
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Liczniki żądania obsługiwanego w bieżącym kontekście (None poza żądaniem)"""
+    return _request_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+    if settings.SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "-"
+        SLOW_QUERIES.inc(route=route)
+        logger.warning(
+            "Wolne zapytanie SQL (%.1f ms) [%s %s]: %s",
+            elapsed * 1000, stats.method if stats is not None else "-", route, statement
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI zbierające metryki żądań.
+
+    Czas liczony jest do wysłania ostatniego fragmentu odpowiedzi, więc
+    obejmuje także odpowiedzi strumieniowe.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'app;dur={total_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            method, route = stats.method, stats.route
+            REQUEST_DURATION.observe(elapsed, method=method, route=route, status=str(status))
+            REQUEST_DB_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, method=method, route=route)
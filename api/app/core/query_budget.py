@@ -0,0 +1,122 @@
+"""
+Wykrywanie problemu N+1 i budżety zapytań SQL dla endpointów.
+
+Endpoint deklaruje maksymalną liczbę zapytań dekoratorem `@query_budget(n)`
+umieszczonym pod dekoratorem trasy. Gdy sprawdzanie jest włączone
+(`QUERY_BUDGET_CHECKS`), `QueryBudgetMiddleware` porównuje liczbę zapytań
+żądania z budżetem i zgłasza wielokrotne leniwe ładowanie tej samej relacji
+(np. `Case.client` przy serializacji listy spraw). Naruszenia trafiają do
+logu oraz do zarejestrowanych obsług (np. pluginu pytest w `app/tests/conftest.py`).
+
+Operacje masowe nie mają budżetu (liczba zapytań rośnie z liczbą partii),
+ale nadal są sprawdzane pod kątem N+1.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.instrumentation import current_request_stats
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_ATTRIBUTE = "__query_budget__"
+
+
+def query_budget(max_queries: int):
+    """Deklaruje maksymalną liczbę zapytań SQL na jedno wywołanie endpointu"""
+    def decorator(endpoint: Callable) -> Callable:
+        setattr(endpoint, QUERY_BUDGET_ATTRIBUTE, max_queries)
+        return endpoint
+    return decorator
+
+
+def get_query_budget(endpoint: Optional[Callable]) -> Optional[int]:
+    return getattr(endpoint, QUERY_BUDGET_ATTRIBUTE, None)
+
+
+@dataclass
+class QueryBudgetViolation:
+    """Naruszenie budżetu zapytań lub wykryte N+1 dla jednego żądania"""
+    method: str
+    route: str
+    queries: int
+    budget: Optional[int]
+    lazy_loads: Dict[str, int] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        problems = []
+        if self.budget is not None and self.queries > self.budget:
+            problems.append(f"{self.queries} zapytań SQL przy budżecie {self.budget}")
+        problems.extend(
+            f"N+1: relacja {relationship} ładowana leniwie {count} razy"
+            for relationship, count in sorted(self.lazy_loads.items())
+        )
+        return f"{self.method} {self.route}: " + "; ".join(problems)
+
+
+# Obsługi naruszeń wywoływane poza logowaniem (np. zbieranie w testach)
+violation_handlers: List[Callable[[QueryBudgetViolation], None]] = []
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_lazy_loads(orm_execute_state):
+    # Leniwe ładowanie relacji ma ustawiony obiekt źródłowy; selectinload
+    # i joinedload ładują relacje hurtowo i nie są tu zliczane
+    if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+        return
+    stats = current_request_stats()
+    if stats is None:
+        return
+    relationship = orm_execute_state.loader_strategy_path[-1]
+    key = f"{relationship.parent.class_.__name__}.{relationship.key}"
+    stats.lazy_loads[key] = stats.lazy_loads.get(key, 0) + 1
+
+
+def check_request(stats, endpoint: Optional[Callable]) -> Optional[QueryBudgetViolation]:
+    """Zwraca naruszenie dla zakończonego żądania albo None"""
+    budget = get_query_budget(endpoint)
+    repeated = {
+        relationship: count
+        for relationship, count in stats.lazy_loads.items()
+        if count >= settings.N_PLUS_ONE_THRESHOLD
+    }
+    over_budget = budget is not None and stats.queries > budget
+    if not over_budget and not repeated:
+        return None
+    return QueryBudgetViolation(
+        method=stats.method,
+        route=stats.route,
+        queries=stats.queries,
+        budget=budget,
+        lazy_loads=repeated,
+    )
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ASGI (opcjonalne, do testów i środowiska staging) sprawdzające
+    budżet zapytań i N+1 po zakończeniu każdego żądania.
+
+    Korzysta z liczników żądania z `MetricsMiddleware`, więc musi być
+    dodane wewnątrz niego.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats = current_request_stats()
+            if scope["type"] == "http" and stats is not None:
+                route = scope.get("route")
+                violation = check_request(stats, getattr(route, "endpoint", None))
+                if violation is not None:
+                    logger.warning("Przekroczony budżet zapytań: %s", violation)
+                    for handler in list(violation_handlers):
+                        handler(violation)
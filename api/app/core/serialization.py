@@ -0,0 +1,104 @@
+"""
+Szybka serializacja odpowiedzi JSON.
+
+`DefaultJSONResponse` to domyślna klasa odpowiedzi aplikacji - korzysta
+z orjson, a bez zainstalowanego orjson z modułu json ze Starlette.
+`ModelSerializer` zamienia obiekty ORM bezpośrednio na JSON według pól
+schematu Pydantic, bez ponownej walidacji danych odczytanych z naszej bazy
+(włączane ustawieniem `FAST_SERIALIZATION` dla list).
+"""
+import typing
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson jest zależnością opcjonalną
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Typy, których orjson nie obsługuje natywnie
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Typ {type(value).__name__} nie jest serializowalny do JSON")
+
+
+if orjson is not None:
+    # Z: jak Pydantic (2024-01-01T00:00:00Z), klucze nie-tekstowe jak json.dumps
+    _ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:  # pragma: no cover
+    import json
+
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class DefaultJSONResponse(JSONResponse):
+    """Odpowiedź JSON renderowana przez orjson (lub json, gdy orjson jest niedostępny)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """Odpowiedź z gotowym ciałem JSON (bajty z ModelSerializer)"""
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+def _is_float_field(annotation) -> bool:
+    if annotation is float:
+        return True
+    return float in typing.get_args(annotation)
+
+
+class ModelSerializer:
+    """
+    Serializator obiektów ORM do JSON przygotowany raz dla schematu Pydantic.
+
+    Wartości kolumn czytane są wprost ze słownika instancji z pominięciem
+    deskryptorów SQLAlchemy (atrybuty wygaszone lub odroczone pobierane są
+    zwykłym getattr) i trafiają do orjson, który obsługuje UUID, datetime,
+    date i enumy natywnie. Kolumny Numeric zamieniane są na float, jak robi
+    to walidacja schematu.
+    Serializator nie waliduje danych - używać tylko dla rekordów z bazy.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields: Tuple[str, ...] = tuple(schema.model_fields)
+        self._float_fields = frozenset(
+            name for name, info in schema.model_fields.items() if _is_float_field(info.annotation)
+        )
+
+    def to_dict(self, obj) -> Dict[str, Any]:
+        state = obj.__dict__
+        row = {name: state[name] if name in state else getattr(obj, name) for name in self.fields}
+        for name in self._float_fields:
+            if row[name] is not None:
+                row[name] = float(row[name])
+        return row
+
+    def dumps_many(self, objects: Iterable) -> bytes:
+        return dumps([self.to_dict(obj) for obj in objects])
+
+
+_serializers: Dict[Type[BaseModel], ModelSerializer] = {}
+
+
+def serializer_for(schema: Type[BaseModel]) -> ModelSerializer:
+    """Zwraca (i zapamiętuje) serializator dla schematu"""
+    serializer = _serializers.get(schema)
+    if serializer is None:
+        serializer = _serializers[schema] = ModelSerializer(schema)
+    return serializer
@@ -0,0 +1,188 @@
+"""
+Konfiguracja i metryki puli połączeń.
+
+Parametry puli pochodzą z ustawień `DB_POOL_*`. Czas oczekiwania na
+połączenie i czas nawiązywania nowych połączeń mierzony jest dla każdej
+puli osobno i udostępniany na `/metrics`.
+"""
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+class PoolStats:
+    """Liczniki czasu pobierania i nawiązywania połączeń jednej puli"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+        self.invalidations = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_connect(self, seconds: float) -> None:
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds_total += seconds
+            self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def observe_invalidation(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+class _TimedCheckout:
+    """Mierzy czas oczekiwania na połączenie z puli (łącznie z nawiązaniem nowego)"""
+    stats: PoolStats
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.observe_timeout()
+            raise
+        self.stats.observe_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+# Statystyki pul zarejestrowanych w procesie, według nazwy silnika
+pool_stats: Dict[str, PoolStats] = {}
+_engines: Dict[str, Engine] = {}
+
+
+def engine_options(url: str) -> dict:
+    """
+    Buduje argumenty create_engine z ustawień puli.
+
+    SQLite korzysta z domyślnej puli dialektu (rozmiar puli nie ma tam
+    znaczenia, a baza w pamięci wymaga puli jednopołączeniowej).
+    """
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def instrument_engine(engine: Engine, name: str) -> PoolStats:
+    """Podpina pomiar czasu nawiązywania połączeń i rejestruje pulę pod nazwą"""
+    stats = PoolStats()
+    engine.pool.stats = stats
+
+    @event.listens_for(engine, "do_connect")
+    def _connect_started(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _connected(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started", None)
+        if started is not None:
+            stats.observe_connect(time.perf_counter() - started)
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidated(dbapi_connection, connection_record, exception):
+        stats.observe_invalidation()
+
+    pool_stats[name] = stats
+    _engines[name] = engine
+    return stats
+
+
+def pool_snapshot() -> Dict[str, dict]:
+    """Bieżący stan pul: połączenia wydane, nadmiarowe, wolne oraz liczniki czasu"""
+    snapshot = {}
+    for name, engine in _engines.items():
+        pool, stats = engine.pool, pool_stats[name]
+        state = {
+            "size": getattr(pool, "size", lambda: 0)(),
+            "checked_out": getattr(pool, "checkedout", lambda: 0)(),
+            "overflow": max(getattr(pool, "overflow", lambda: 0)(), 0),
+            "checked_in": getattr(pool, "checkedin", lambda: 0)(),
+            "checkouts": stats.checkouts,
+            "wait_seconds_total": stats.wait_seconds_total,
+            "wait_seconds_max": stats.wait_seconds_max,
+            "timeouts": stats.timeouts,
+            "connects": stats.connects,
+            "connect_seconds_total": stats.connect_seconds_total,
+            "connect_seconds_max": stats.connect_seconds_max,
+            "invalidations": stats.invalidations,
+        }
+        snapshot[name] = state
+    return snapshot
+
+
+# Nazwa metryki Prometheus -> (typ, opis, klucz w pool_snapshot)
+_POOL_METRICS = [
+    ("db_pool_size", "gauge", "Docelowa liczba połączeń w puli", "size"),
+    ("db_pool_checked_out", "gauge", "Połączenia aktualnie wydane z puli", "checked_out"),
+    ("db_pool_overflow", "gauge", "Połączenia ponad rozmiar puli", "overflow"),
+    ("db_pool_checked_in", "gauge", "Wolne połączenia w puli", "checked_in"),
+    ("db_pool_checkouts_total", "counter", "Liczba pobrań połączenia z puli", "checkouts"),
+    ("db_pool_wait_seconds_total", "counter", "Łączny czas oczekiwania na połączenie", "wait_seconds_total"),
+    ("db_pool_wait_seconds_max", "gauge", "Najdłuższe oczekiwanie na połączenie", "wait_seconds_max"),
+    ("db_pool_timeouts_total", "counter", "Przekroczenia DB_POOL_TIMEOUT", "timeouts"),
+    ("db_pool_connects_total", "counter", "Nowo nawiązane połączenia", "connects"),
+    ("db_pool_connect_seconds_total", "counter", "Łączny czas nawiązywania połączeń", "connect_seconds_total"),
+    ("db_pool_connect_seconds_max", "gauge", "Najdłuższe nawiązywanie połączenia", "connect_seconds_max"),
+    ("db_pool_invalidations_total", "counter", "Połączenia unieważnione (zerwane)", "invalidations"),
+]
+
+
+def render_pool_metrics() -> List[str]:
+    """Zwraca metryki pul w formacie tekstowym Prometheus"""
+    snapshot = pool_snapshot()
+    lines = []
+    for metric, kind, description, key in _POOL_METRICS:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, state in snapshot.items():
+            lines.append(f'{metric}{{engine="{name}"}} {state[key]}')
+    return lines
+
+
+registry.register_collector(render_pool_metrics)
@@ -0,0 +1,281 @@
+"""
+Kierowanie odczytów do replik bazy danych (DATABASE_READ_URLS).
+
+`ReadRoutingMiddleware` oznacza żądania GET/HEAD jako odczyty. Sesja
+`RoutingSession` utworzona w takim żądaniu wybiera przy pierwszym zapytaniu
+jedną replikę (round-robin lub najmniej wydanych połączeń) i korzysta z niej
+do końca sesji, żeby wszystkie odczyty widziały ten sam stan bazy. Zapis,
+flush, SELECT ... FOR UPDATE i `primary_reads` zawsze trafiają do bazy
+głównej.
+
+Po udanym żądaniu zapisującym klient dostaje ciasteczko
+`READ_YOUR_WRITES_COOKIE`, które przez `READ_YOUR_WRITES_SECONDS` kieruje
+jego odczyty do bazy głównej (read-your-writes także między procesami).
+Repliki są okresowo sprawdzane (połączenie i opóźnienie replikacji);
+niedostępna lub opóźniona ponad `REPLICA_MAX_LAG_SECONDS` replika jest
+pomijana, a bez dostępnych replik odczyt trafia do bazy głównej.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+READ_METHODS = frozenset({"GET", "HEAD"})
+PRIMARY = "primary"
+
+READ_ROUTING = registry.counter(
+    "db_read_routing_total", "Sesje odczytu według bazy, do której trafiły",
+    labels=("target", "reason")
+)
+
+# PostgreSQL: sekundy od ostatniej odtworzonej transakcji (0, gdy replika nadąża)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def replica_lag(connection) -> float:
+    """Opóźnienie replikacji w sekundach (0 dla baz bez replikacji strumieniowej)"""
+    if connection.dialect.name == "postgresql":
+        return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+    connection.execute(text("SELECT 1"))
+    return 0.0
+
+
+class Replica:
+    """Silnik repliki wraz z wynikiem ostatniego sprawdzenia"""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag_seconds = 0.0
+        self.checked_at: Optional[float] = None
+        self._check_lock = threading.Lock()
+
+        @event.listens_for(engine, "handle_error")
+        def _mark_down(exception_context):
+            # Zerwane połączenie wyklucza replikę do następnego sprawdzenia
+            if exception_context.is_disconnect:
+                self.mark_down(exception_context.original_exception)
+
+    @property
+    def connections(self) -> int:
+        return getattr(self.engine.pool, "checkedout", lambda: 0)()
+
+    def mark_down(self, error) -> None:
+        if self.healthy:
+            logger.warning("Replika %s niedostępna: %s", self.name, error)
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+    def check(self) -> None:
+        """Sprawdza połączenie i opóźnienie replikacji"""
+        try:
+            with self.engine.connect() as connection:
+                self.lag_seconds = replica_lag(connection)
+        except Exception as exc:
+            self.mark_down(exc)
+            return
+        if not self.healthy:
+            logger.info("Replika %s ponownie dostępna", self.name)
+        self.healthy = True
+        self.checked_at = time.monotonic()
+
+    def refresh(self, interval: float) -> None:
+        """Sprawdza replikę, jeśli wynik jest starszy niż `interval` (jeden wątek naraz)"""
+        if self.checked_at is not None and time.monotonic() - self.checked_at < interval:
+            return
+        if self._check_lock.acquire(blocking=self.checked_at is None):
+            try:
+                if self.checked_at is None or time.monotonic() - self.checked_at >= interval:
+                    self.check()
+            finally:
+                self._check_lock.release()
+
+    def available(self, max_lag: float) -> bool:
+        return self.healthy and (max_lag <= 0 or self.lag_seconds <= max_lag)
+
+
+class ReplicaSet:
+    """Repliki do odczytu i strategia wyboru: "round_robin" lub "least_connections" """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        strategy: str = "round_robin",
+        max_lag: float = 10.0,
+        check_interval: float = 5.0
+    ):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Nieznana strategia wyboru repliki: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """Wybiera dostępną replikę albo zwraca None (odczyt z bazy głównej)"""
+        for replica in self.replicas:
+            replica.refresh(self.check_interval)
+        candidates = [replica for replica in self.replicas if replica.available(self.max_lag)]
+        if not candidates:
+            return None
+        if self.strategy == "least_connections":
+            return min(candidates, key=lambda replica: replica.connections)
+        return candidates[next(self._counter) % len(candidates)]
+
+    def render_metrics(self) -> List[str]:
+        lines = [
+            "# HELP db_replica_up Replika dostępna do odczytu (1) lub pomijana (0)",
+            "# TYPE db_replica_up gauge",
+        ]
+        lines.extend(
+            f'db_replica_up{{replica="{replica.name}"}} {int(replica.available(self.max_lag))}'
+            for replica in self.replicas
+        )
+        lines.append("# HELP db_replica_lag_seconds Opóźnienie replikacji z ostatniego sprawdzenia")
+        lines.append("# TYPE db_replica_lag_seconds gauge")
+        lines.extend(
+            f'db_replica_lag_seconds{{replica="{replica.name}"}} {replica.lag_seconds}'
+            for replica in self.replicas
+        )
+        return lines
+
+
+# Czy bieżące żądanie może czytać z repliki (ustawiane przez ReadRoutingMiddleware)
+_read_only_request: ContextVar[bool] = ContextVar("read_only_request", default=False)
+
+FORCE_PRIMARY = "force_primary"
+
+
+class RoutingSession(Session):
+    """
+    Sesja kierująca odczyty żądań GET do repliki, a pozostałe zapytania
+    do bazy głównej (`bind`).
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.read_only = bool(replicas) and _read_only_request.get()
+        self._replica: Optional[Replica] = None
+        self._routed = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            not self.read_only
+            or self._flushing
+            or self.info.get(FORCE_PRIMARY)
+            or (clause is not None and (clause.is_dml or getattr(clause, "_for_update_arg", None) is not None))
+        ):
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+        if not self._routed:
+            self._routed = True
+            self._replica = self.replicas.choose()
+            if self._replica is None:
+                READ_ROUTING.inc(target=PRIMARY, reason="no_replica")
+            else:
+                READ_ROUTING.inc(target=self._replica.name, reason="read")
+        if self._replica is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        return self._replica.engine
+
+
+@contextmanager
+def primary_reads(session: Session):
+    """Kieruje odczyty sesji w bloku do bazy głównej (np. przy zasilaniu cache)"""
+    previous = session.info.get(FORCE_PRIMARY)
+    session.info[FORCE_PRIMARY] = True
+    try:
+        yield session
+    finally:
+        session.info[FORCE_PRIMARY] = previous
+
+
+def _primary_until(scope) -> float:
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            try:
+                return float(cookie_parser(value.decode("latin-1")).get(READ_YOUR_WRITES_COOKIE, 0))
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
+class ReadRoutingMiddleware:
+    """
+    Middleware ASGI oznaczające żądania GET/HEAD jako odczyty z repliki
+    i ustawiające ciasteczko read-your-writes po udanym zapisie.
+    """
+
+    def __init__(self, app, window_seconds: float = 5.0):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        if method in READ_METHODS:
+            read_only = _primary_until(scope) <= time.time()
+            if not read_only:
+                READ_ROUTING.inc(target=PRIMARY, reason="read_your_writes")
+            token = _read_only_request.set(read_only)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _read_only_request.reset(token)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400 and self.window_seconds > 0:
+                until = time.time() + self.window_seconds
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={until:.3f}; Max-Age={int(self.window_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def build_replica_set(engine_factory) -> ReplicaSet:
+    """Tworzy repliki z DATABASE_READ_URLS (`engine_factory(url, name)` zwraca silnik)"""
+    replicas = [
+        Replica(f"replica{index}", engine_factory(url, f"replica{index}"))
+        for index, url in enumerate(settings.DATABASE_READ_URLS)
+    ]
+    replica_set = ReplicaSet(
+        replicas,
+        strategy=settings.READ_REPLICA_STRATEGY,
+        max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.REPLICA_CHECK_INTERVAL
+    )
+    if replica_set:
+        registry.register_collector(replica_set.render_metrics)
+    return replica_set
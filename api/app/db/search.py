@@ -0,0 +1,98 @@
+"""
+Indeks wyszukiwania klientów.
+
+PostgreSQL: generowane kolumny `search_text` (znormalizowany tekst, bez
+polskich znaków diakrytycznych) i `search_vector` (tsvector) z indeksami GIN
+(pełnotekstowym i trigramowym). SQLite: tabela FTS5 `clients_fts`
+utrzymywana przez triggery - pozwala testować wyszukiwanie lokalnie.
+"""
+import re
+import sqlite3
+import unicodedata
+from typing import List
+
+from sqlalchemy import DDL, event
+from sqlalchemy.engine import Engine
+
+# Znaki, których dekompozycja Unicode nie rozkłada na literę bazową
+_EXTRA_FOLDS = str.maketrans({"ł": "l", "Ł": "L", "ø": "o", "Ø": "O", "ß": "ss"})
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "clients_fts"
+
+
+def normalize_search_text(value) -> str:
+    """Zamienia tekst na małe litery i usuwa znaki diakrytyczne (Łódź -> lodz)"""
+    if value is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(value).translate(_EXTRA_FOLDS))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def search_tokens(search_term: str) -> List[str]:
+    """Dzieli znormalizowaną frazę na tokeny bezpieczne dla składni zapytań FTS"""
+    return _TOKEN_RE.findall(normalize_search_text(search_term))
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # Funkcja używana przez triggery FTS5 do normalizacji indeksowanego tekstu.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            "normalize_search_text", 1, normalize_search_text, deterministic=True
+        )
+
+
+_SQLITE_DOCUMENT = (
+    "normalize_search_text("
+    "coalesce({row}.first_name, '') || ' ' || coalesce({row}.last_name, '') || ' ' || coalesce({row}.email, '')"
+    ")"
+)
+
+_SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "client_id UNINDEXED, search_text, tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, client_id, search_text)
+        VALUES (new.rowid, new.id, {_SQLITE_DOCUMENT.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF first_name, last_name, email ON clients BEGIN
+        UPDATE {FTS_TABLE} SET search_text = {_SQLITE_DOCUMENT.format(row='new')} WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid;
+    END""",
+]
+
+# Wyrażenie obu kolumn generowanych - kolumna generowana nie może odwoływać
+# się do innej kolumny generowanej, więc search_vector nie używa search_text
+_POSTGRES_DOCUMENT = (
+    "lower(public.immutable_unaccent("
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '')"
+    "))"
+)
+
+_POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """CREATE OR REPLACE FUNCTION public.immutable_unaccent(value TEXT)
+    RETURNS TEXT
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, value) $$""",
+    f"""ALTER TABLE clients ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS ({_POSTGRES_DOCUMENT}) STORED""",
+    f"""ALTER TABLE clients ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', {_POSTGRES_DOCUMENT})) STORED""",
+    "CREATE INDEX IF NOT EXISTS idx_clients_search_vector ON clients USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS idx_clients_search_text_trgm ON clients USING GIN (search_text gin_trgm_ops)",
+]
+
+
+def register_client_search(table) -> None:
+    """Podpina DDL indeksu wyszukiwania pod tworzenie/usuwanie tabeli klientów"""
+    for statement in _SQLITE_CREATE:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+    for statement in _POSTGRES_CREATE:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
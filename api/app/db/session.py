@@ -2,16 +2,32 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import engine_options, instrument_engine
+from app.db.routing import RoutingSession, build_replica_set
+
+# Create SQLAlchemy engine (pool settings: DB_POOL_* in app.core.config)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_engine(engine, "sync")
+
+
+def create_replica_engine(url: str, name: str):
+    """Silnik repliki do odczytu z tymi samymi ustawieniami puli co baza główna"""
+    replica_engine = create_engine(url, **engine_options(url))
+    instrument_engine(replica_engine, name)
+    return replica_engine
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+
+# Read replicas for GET requests (DATABASE_READ_URLS, see app.db.routing)
+replicas = build_replica_set(create_replica_engine)
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replicas
+)
 
 # Create Base class for models
 Base = declarative_base()
@@ -25,4 +41,5 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
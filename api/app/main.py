@@ -1,12 +1,18 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.openapi.utils import get_openapi
-import time
 import logging
 
 from app.core.config import settings
 from app.api.v1.endpoints import kancelarie, klienci, sprawy
+from app.api.v1.pagination import NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER
+from app.api.v1.etag import ETAG_HEADER
+from app.core.instrumentation import MetricsMiddleware
+from app.core.query_budget import QueryBudgetMiddleware
+from app.core.metrics import registry
+from app.core.serialization import DefaultJSONResponse
+from app.db.routing import ReadRoutingMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +25,8 @@ app = FastAPI(
     description=settings.DESCRIPTION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=DefaultJSONResponse
 )
 
 # CORS middleware
@@ -29,17 +36,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, ETAG_HEADER],
 )
 
+# Query budget / N+1 checks (opt-in); must run inside MetricsMiddleware
+if settings.QUERY_BUDGET_CHECKS:
+    app.add_middleware(QueryBudgetMiddleware)
 
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+# Route GET requests to read replicas, with read-your-writes stickiness after writes
+if settings.DATABASE_READ_URLS:
+    app.add_middleware(ReadRoutingMiddleware, window_seconds=settings.READ_YOUR_WRITES_SECONDS)
+
+# Request/SQL metrics middleware (latency histograms, Server-Timing header)
+app.add_middleware(MetricsMiddleware)
 
 
 # Global exception handler
@@ -68,6 +77,16 @@ async def health_check():
     }
 
 
+# Metrics endpoint (Prometheus text format)
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """
+    Metryki procesu: histogramy czasu żądań i liczby zapytań SQL według
+    trasy, wolne zapytania oraz stan puli połączeń.
+    """
+    return registry.render()
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, Numeric, Date, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, Numeric, Date, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, ENUM
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 from app.db.session import Base
+from app.db.search import register_client_search
 
 # Enums matching Supabase schema
 case_status_enum = ENUM('active', 'pending', 'closed', 'archived', name='case_status')
@@ -13,6 +14,10 @@ user_role_enum = ENUM('admin', 'lawyer', 'client', 'staff', name='user_role')
 
 class LawFirm(Base):
     __tablename__ = "law_firms"
+    __table_args__ = (
+        # Paginacja kursorowa po (created_at, id)
+        Index('idx_law_firms_created_at_id', 'created_at', 'id'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
@@ -32,6 +37,17 @@ class LawFirm(Base):
     cases = relationship("Case", back_populates="law_firm")
 
 
+class LawFirmStats(Base):
+    """Liczniki kancelarii utrzymywane przyrostowo przez triggery (opcjonalne)"""
+    __tablename__ = "law_firm_stats"
+
+    law_firm_id = Column(UUID(as_uuid=True), ForeignKey('law_firms.id', ondelete='CASCADE'), primary_key=True)
+    clients_count = Column(Integer, nullable=False, default=0)
+    cases_count = Column(Integer, nullable=False, default=0)
+    active_cases_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class Profile(Base):
     __tablename__ = "profiles"
 
@@ -51,11 +67,16 @@ class Profile(Base):
     law_firm = relationship("LawFirm", back_populates="profiles")
     assigned_cases = relationship("Case", back_populates="assigned_lawyer")
     case_notes = relationship("CaseNote", back_populates="author")
-    uploaded_documents = relationship("Document", back_populates="uploaded_by")
+    uploaded_documents = relationship("Document", back_populates="uploader")
 
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Paginacja kursorowa po (created_at, id)
+        Index('idx_clients_created_at_id', 'created_at', 'id'),
+        Index('idx_clients_law_firm_created_at_id', 'law_firm_id', 'created_at', 'id'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True))
@@ -76,8 +97,19 @@ class Client(Base):
     cases = relationship("Case", back_populates="client")
 
 
+# Indeks wyszukiwania (tsvector/trigramy w PostgreSQL, FTS5 w SQLite)
+register_client_search(Client.__table__)
+
+
 class Case(Base):
     __tablename__ = "cases"
+    __table_args__ = (
+        # Paginacja kursorowa po (created_at, id)
+        Index('idx_cases_created_at_id', 'created_at', 'id'),
+        Index('idx_cases_law_firm_created_at_id', 'law_firm_id', 'created_at', 'id'),
+        Index('idx_cases_client_created_at_id', 'client_id', 'created_at', 'id'),
+        UniqueConstraint('law_firm_id', 'case_number', name='cases_law_firm_id_case_number_key'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     law_firm_id = Column(UUID(as_uuid=True), ForeignKey('law_firms.id'), nullable=False)
@@ -119,7 +151,7 @@ class Document(Base):
 
     # Relationships
     case = relationship("Case", back_populates="documents")
-    uploaded_by = relationship("Profile", back_populates="uploaded_documents")
+    uploader = relationship("Profile", back_populates="uploaded_documents")
 
 
 class CaseNote(Base):
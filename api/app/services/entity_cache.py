@@ -0,0 +1,93 @@
+"""
+Cache pojedynczych encji (kancelarie, klienci, sprawy) z odczytem przez bazę.
+
+W cache przechowywane są wartości kolumn rekordu (nie obiekty ORM), więc
+wpis można bezpiecznie współdzielić między wątkami i zapisać w Redis.
+Przy trafieniu rekord jest dołączany do sesji żądania przez
+`Session.merge(load=False)` - bez zapytania SQL, a relacje ładowane są
+przez sesję jak zwykle. Metody `update_*` i `delete_*` serwisów
+unieważniają wpis po zatwierdzeniu transakcji.
+"""
+from datetime import datetime
+from typing import Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.core.cache import ReadThroughCache, create_cache_backend
+from app.core.config import settings
+from app.db.routing import primary_reads
+
+entity_cache = ReadThroughCache("entity", create_cache_backend(
+    settings.ENTITY_CACHE_BACKEND,
+    maxsize=settings.ENTITY_CACHE_SIZE,
+    ttl=settings.ENTITY_CACHE_TTL,
+    redis_url=settings.CACHE_REDIS_URL,
+    prefix=settings.CACHE_KEY_PREFIX
+))
+
+
+def entity_key(model, entity_id: UUID) -> str:
+    """Klucz cache encji, np. "clients:<uuid>" """
+    return f"{model.__tablename__}:{entity_id}"
+
+
+def entity_snapshot(instance) -> dict:
+    """Wartości kolumn obiektu ORM"""
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs}
+
+
+def attach_entity(db: Session, model, values: dict):
+    """Dołącza rekord z cache do sesji jako trwały, bez zapytania SQL"""
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+
+def cached_entity(
+    db: Session,
+    model,
+    entity_id: UUID,
+    load: Callable[[], Optional[object]],
+    updated_at: Optional[datetime] = None
+):
+    """
+    Zwraca encję z cache albo ładuje ją funkcją `load` (jedno ładowanie na
+    klucz naraz). Obiekt obecny już w sesji jest zwracany bez sięgania do cache.
+    Podane `updated_at` (np. z zapytania wersji dla ETag) odrzuca wpis
+    o innej dacie modyfikacji.
+    """
+    if not entity_cache.enabled:
+        return load()
+    existing = db.identity_map.get(identity_key(model, entity_id))
+    if existing is not None:
+        return existing
+
+    key = entity_key(model, entity_id)
+    loaded = []
+
+    def load_snapshot():
+        # Cache zasilany jest z bazy głównej - opóźniona replika utrwaliłaby
+        # w nim stan sprzed zapisu na cały TTL
+        with primary_reads(db):
+            instance = load()
+        loaded.append(instance)
+        return entity_snapshot(instance) if instance is not None else None
+
+    values = entity_cache.get_or_load(key, load_snapshot)
+    if values is not None and updated_at is not None and values.get("updated_at") != updated_at:
+        entity_cache.invalidate(key)
+        values = entity_cache.get_or_load(key, load_snapshot)
+    if loaded:
+        # Załadowany w tej sesji obiekt ma już relacje z opcji zapytania `load`
+        return loaded[-1]
+    if values is None:
+        return None
+    return attach_entity(db, model, values)
+
+
+def invalidate_entity(model, entity_id: UUID) -> None:
+    """Usuwa encję z cache (po zapisie lub usunięciu rekordu)"""
+    entity_cache.invalidate(entity_key(model, entity_id))
@@ -1,9 +1,19 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
-from typing import List, Optional
-from uuid import UUID
-
-from app.models.kancelaria import LawFirm, Profile, Client, Case, Document, CaseNote
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Select, select, insert, func, and_, or_, literal, literal_column, table, column, text
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.kancelaria import LawFirm, LawFirmStats, Profile, Client, Case, Document, CaseNote
+from app.services.pagination import Page, keyset_statement, page_from_rows, paginate
+from app.services.entity_cache import cached_entity, entity_cache, invalidate_entity
+from app.db.search import FTS_TABLE, search_tokens
 from app.api.v1.schemas.kancelaria import (
     LawFirmCreate, LawFirmUpdate,
     ProfileCreate, ProfileUpdate,
@@ -15,6 +25,291 @@ from app.api.v1.schemas.kancelaria import (
 )
 
 
+def client_search_statement(dialect: str, search_term: str, law_firm_id: Optional[UUID] = None) -> Optional[Select]:
+    """
+    Buduje zapytanie wyszukiwania klientów dla danego dialektu bazy.
+
+    PostgreSQL: ranking tsvector z prefiksami, trigramy jako uzupełnienie dla
+    fragmentów słów. SQLite: ranking BM25 z indeksu FTS5. Pozostałe bazy:
+    dopasowanie LIKE. Zwraca None, gdy fraza nie zawiera żadnych słów.
+    """
+    tokens = search_tokens(search_term)
+    if not tokens:
+        return None
+
+    if dialect == 'postgresql':
+        search_vector = literal_column('clients.search_vector')
+        search_text = literal_column('clients.search_text')
+        ts_query = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        phrase = ' '.join(tokens)
+        statement = select(Client).where(
+            or_(search_vector.op('@@')(ts_query), search_text.contains(phrase, autoescape=True))
+        ).order_by(
+            func.ts_rank(search_vector, ts_query).desc(),
+            func.similarity(search_text, phrase).desc(),
+            Client.id
+        )
+    elif dialect == 'sqlite':
+        fts = table(FTS_TABLE, column('client_id'), column('search_text'))
+        statement = select(Client).join(
+            fts, fts.c.client_id == Client.id
+        ).where(
+            fts.c.search_text.op('MATCH')(' '.join(f'"{token}"*' for token in tokens))
+        ).order_by(
+            func.bm25(literal_column(FTS_TABLE)),
+            Client.id
+        )
+    else:
+        document = func.lower(
+            func.coalesce(Client.first_name, '') + ' ' +
+            func.coalesce(Client.last_name, '') + ' ' +
+            func.coalesce(Client.email, '')
+        )
+        statement = select(Client).where(
+            and_(*(document.like(f'%{token}%') for token in tokens))
+        ).order_by(Client.last_name, Client.first_name, Client.id)
+
+    if law_firm_id:
+        statement = statement.where(Client.law_firm_id == law_firm_id)
+    return statement
+
+
+def law_firm_stats_statement(law_firm_id: UUID) -> Select:
+    """
+    Buduje zapytanie zwracające kancelarię wraz z licznikami.
+
+    Liczniki są liczone osobnymi podzapytaniami skorelowanymi (bez złączenia
+    klienci x sprawy), a przy LAW_FIRM_STATS_COUNTERS odczytywane z tabeli
+    law_firm_stats utrzymywanej przez triggery.
+    """
+    if settings.LAW_FIRM_STATS_COUNTERS:
+        statement = select(
+            LawFirm,
+            LawFirmStats.clients_count,
+            LawFirmStats.cases_count,
+            LawFirmStats.active_cases_count
+        ).outerjoin(LawFirmStats, LawFirmStats.law_firm_id == LawFirm.id)
+    else:
+        statement = select(
+            LawFirm,
+            select(func.count(Client.id)).where(
+                Client.law_firm_id == LawFirm.id
+            ).correlate(LawFirm).scalar_subquery().label('clients_count'),
+            select(func.count(Case.id)).where(
+                Case.law_firm_id == LawFirm.id
+            ).correlate(LawFirm).scalar_subquery().label('cases_count'),
+            select(func.count(Case.id)).where(
+                Case.law_firm_id == LawFirm.id, Case.status == 'active'
+            ).correlate(LawFirm).scalar_subquery().label('active_cases_count')
+        )
+    return statement.where(LawFirm.id == law_firm_id)
+
+
+def law_firm_stats_from_row(row) -> dict:
+    """Wyciąga liczniki z wiersza zapytania law_firm_stats_statement"""
+    return {
+        'clients_count': row.clients_count or 0,
+        'cases_count': row.cases_count or 0,
+        'active_cases_count': row.active_cases_count or 0
+    }
+
+
+# Widok zmaterializowany z migracji supabase (CASE_STATS_MATERIALIZED_VIEW)
+CASE_STATISTICS_VIEW = 'case_statistics_mv'
+
+# Statystyki spraw per kancelaria (cache procesu, unieważniany przez CaseService)
+case_statistics_cache = TTLCache(
+    maxsize=settings.CASE_STATS_CACHE_SIZE,
+    ttl=settings.CASE_STATS_CACHE_TTL
+)
+
+
+def case_statistics_statement(law_firm_id: UUID) -> Select:
+    """
+    Buduje zapytanie zwracające liczbę spraw kancelarii w podziale
+    na (status, priorytet, prawnik). Wszystkie statystyki liczone są
+    z tego jednego zestawienia.
+    """
+    if settings.CASE_STATS_MATERIALIZED_VIEW:
+        view = table(
+            CASE_STATISTICS_VIEW,
+            column('law_firm_id'), column('status'), column('priority'),
+            column('assigned_lawyer_id'), column('cases_count')
+        )
+        return select(
+            view.c.status, view.c.priority, view.c.assigned_lawyer_id, view.c.cases_count
+        ).where(view.c.law_firm_id == law_firm_id)
+
+    return select(
+        Case.status,
+        Case.priority,
+        Case.assigned_lawyer_id,
+        func.count(Case.id).label('cases_count')
+    ).where(
+        Case.law_firm_id == law_firm_id
+    ).group_by(Case.status, Case.priority, Case.assigned_lawyer_id)
+
+
+def case_statistics_from_rows(rows) -> dict:
+    """Składa statystyki spraw z wierszy zapytania case_statistics_statement"""
+    by_status = {status.value: 0 for status in CaseStatus}
+    by_priority = {priority.value: 0 for priority in CasePriority}
+    by_lawyer = {}
+
+    for row in rows:
+        status = getattr(row.status, 'value', row.status)
+        priority = getattr(row.priority, 'value', row.priority)
+        by_status[status] = by_status.get(status, 0) + row.cases_count
+        by_priority[priority] = by_priority.get(priority, 0) + row.cases_count
+
+        lawyer = by_lawyer.setdefault(row.assigned_lawyer_id, {
+            'assigned_lawyer_id': row.assigned_lawyer_id,
+            'total_cases': 0,
+            'active_cases': 0
+        })
+        lawyer['total_cases'] += row.cases_count
+        if status == CaseStatus.active.value:
+            lawyer['active_cases'] += row.cases_count
+
+    return {
+        'total_cases': sum(by_status.values()),
+        'active_cases': by_status[CaseStatus.active.value],
+        'pending_cases': by_status[CaseStatus.pending.value],
+        'urgent_cases': by_priority[CasePriority.urgent.value],
+        'by_status': by_status,
+        'by_priority': by_priority,
+        'by_lawyer': sorted(by_lawyer.values(), key=lambda item: -item['total_cases'])
+    }
+
+
+# Kolumny sprawy, które można wybrać parametrem fields
+CASE_COLUMNS = tuple(column.key for column in Case.__table__.columns)
+
+
+@dataclass
+class CaseDetails:
+    """Sprawa wraz ze stronami dokumentów i notatek"""
+    case: Case
+    documents: Optional[Page] = None
+    case_notes: Optional[Page] = None
+
+
+def bulk_insert(db: Session, model, items: Sequence[Tuple[int, BaseModel]]) -> List[UUID]:
+    """
+    Wstawia partię zwalidowanych rekordów jednym INSERT (executemany)
+    bez zatwierdzania transakcji. Zwraca identyfikatory w kolejności rekordów.
+    """
+    rows = [{'id': uuid4(), **data.model_dump()} for _, data in items]
+    if rows:
+        db.execute(insert(model), rows)
+    return [row['id'] for row in rows]
+
+
+# Kolumny eksportu klientów i spraw (w kolejności kolumn tabel)
+CLIENT_EXPORT_COLUMNS = tuple(Client.__table__.columns)
+CASE_EXPORT_COLUMNS = tuple(Case.__table__.columns)
+
+
+def export_rows(db: Session, statement: Select, batch_size: int) -> Iterator[Sequence]:
+    """
+    Zwraca wyniki zapytania partiami po `batch_size` wierszy.
+
+    `yield_per` włącza kursor po stronie serwera (stream_results), więc
+    w pamięci znajduje się najwyżej jedna partia niezależnie od liczby
+    eksportowanych wierszy. Zwracane są krotki kolumn, bez obiektów ORM.
+    """
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def bulk_error(index: int, message: str) -> dict:
+    """Opis błędu pojedynczego rekordu w operacji masowej"""
+    return {'index': index, 'errors': [{'msg': message}]}
+
+
+def collection_version(model, *criteria, changed_column=None) -> tuple:
+    """
+    Podzapytania skalarne z liczbą rekordów i najpóźniejszą zmianą kolekcji
+    (część wersji zasobu dla ETag - patrz app.api.v1.etag). Warunki odwołujące
+    się do zapytania zewnętrznego są z nim automatycznie skorelowane.
+    """
+    changed_column = changed_column if changed_column is not None else model.updated_at
+    return (
+        select(func.count(model.id)).where(*criteria).scalar_subquery(),
+        select(func.max(changed_column)).where(*criteria).scalar_subquery()
+    )
+
+
+def list_version(db: Session, model, *criteria) -> tuple:
+    """Wersja listy: liczba rekordów i maksymalne updated_at po filtrach"""
+    return tuple(db.execute(
+        select(func.count(model.id), func.max(model.updated_at)).where(*criteria)
+    ).one())
+
+
+def resource_version(db: Session, model, statement: Select, for_update: bool = False) -> Optional[tuple]:
+    """
+    Wykonuje zapytanie wersji pojedynczego zasobu. `for_update` blokuje
+    wiersz modelu do końca transakcji, żeby sprawdzenie If-Match i zapis
+    były atomowe.
+    """
+    if for_update:
+        statement = statement.with_for_update(of=model)
+    row = db.execute(statement).first()
+    return tuple(row) if row is not None else None
+
+
+def case_criteria(
+    law_firm_id: Optional[UUID] = None,
+    client_id: Optional[UUID] = None,
+    status: Optional[CaseStatus] = None,
+    priority: Optional[CasePriority] = None
+) -> list:
+    """Warunki filtrowania listy spraw"""
+    criteria = []
+    if law_firm_id:
+        criteria.append(Case.law_firm_id == law_firm_id)
+    if client_id:
+        criteria.append(Case.client_id == client_id)
+    if status:
+        criteria.append(Case.status == status)
+    if priority:
+        criteria.append(Case.priority == priority)
+    return criteria
+
+
+# Zapytania list współdzielone przez usługi synchroniczne i asynchroniczne
+# (obie warstwy stronicują je funkcją keyset_statement)
+
+def law_firms_statement() -> Select:
+    """Zapytanie listy kancelarii"""
+    return select(LawFirm)
+
+
+def clients_statement(law_firm_id: Optional[UUID] = None) -> Select:
+    """Zapytanie listy klientów, opcjonalnie jednej kancelarii"""
+    statement = select(Client)
+    if law_firm_id:
+        statement = statement.where(Client.law_firm_id == law_firm_id)
+    return statement
+
+
+def cases_statement(
+    law_firm_id: Optional[UUID] = None,
+    client_id: Optional[UUID] = None,
+    status: Optional[CaseStatus] = None,
+    priority: Optional[CasePriority] = None
+) -> Select:
+    """Zapytanie listy spraw po filtrach, z klientem ładowanym złączeniem"""
+    return select(Case).options(joinedload(Case.client)).where(
+        *case_criteria(law_firm_id, client_id, status, priority)
+    )
+
+
 class LawFirmService:
     def __init__(self, db: Session):
         self.db = db
@@ -28,16 +323,24 @@ class LawFirmService:
         return db_law_firm
 
     def get_law_firm(self, law_firm_id: UUID) -> Optional[LawFirm]:
-        """Pobiera kancelarię po ID"""
-        return self.db.query(LawFirm).filter(LawFirm.id == law_firm_id).first()
+        """Pobiera kancelarię po ID (przez cache encji)"""
+        return cached_entity(
+            self.db, LawFirm, law_firm_id,
+            lambda: self.db.query(LawFirm).filter(LawFirm.id == law_firm_id).first()
+        )
 
     def get_law_firms(self, skip: int = 0, limit: int = 100) -> List[LawFirm]:
         """Pobiera listę kancelarii z paginacją"""
-        return self.db.query(LawFirm).offset(skip).limit(limit).all()
+        return self.get_law_firms_page(skip=skip, limit=limit).items
+
+    def get_law_firms_page(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+        """Pobiera stronę kancelarii (paginacja kursorowa lub OFFSET)"""
+        statement, direction = keyset_statement(law_firms_statement(), LawFirm, skip=skip, limit=limit, cursor=cursor)
+        return page_from_rows(self.db.scalars(statement).all(), limit, skip=skip, direction=direction)
 
     def update_law_firm(self, law_firm_id: UUID, law_firm_data: LawFirmUpdate) -> Optional[LawFirm]:
         """Aktualizuje dane kancelarii"""
-        db_law_firm = self.get_law_firm(law_firm_id)
+        db_law_firm = self.db.query(LawFirm).filter(LawFirm.id == law_firm_id).first()
         if not db_law_firm:
             return None
         
@@ -46,34 +349,53 @@ class LawFirmService:
             setattr(db_law_firm, field, value)
         
         self.db.commit()
+        invalidate_entity(LawFirm, law_firm_id)
         self.db.refresh(db_law_firm)
         return db_law_firm
 
     def delete_law_firm(self, law_firm_id: UUID) -> bool:
         """Usuwa kancelarię"""
-        db_law_firm = self.get_law_firm(law_firm_id)
+        db_law_firm = self.db.query(LawFirm).filter(LawFirm.id == law_firm_id).first()
         if not db_law_firm:
             return False
         
         self.db.delete(db_law_firm)
         self.db.commit()
+        invalidate_entity(LawFirm, law_firm_id)
         return True
 
     def get_law_firm_stats(self, law_firm_id: UUID) -> dict:
         """Pobiera statystyki kancelarii"""
-        stats = self.db.query(
-            func.count(Client.id).label('clients_count'),
-            func.count(Case.id).label('cases_count'),
-            func.count(Case.id).filter(Case.status == 'active').label('active_cases_count')
-        ).select_from(LawFirm).outerjoin(Client).outerjoin(Case).filter(
-            LawFirm.id == law_firm_id
-        ).first()
-        
-        return {
-            'clients_count': stats.clients_count or 0,
-            'cases_count': stats.cases_count or 0,
-            'active_cases_count': stats.active_cases_count or 0
-        }
+        result = self.get_law_firm_with_stats(law_firm_id)
+        if not result:
+            return {'clients_count': 0, 'cases_count': 0, 'active_cases_count': 0}
+        return result[1]
+
+    def get_law_firm_version(self, law_firm_id: UUID, for_update: bool = False) -> Optional[tuple]:
+        """
+        Wersja kancelarii wraz ze statystykami (do ETag): updated_at kancelarii,
+        liczba klientów oraz liczba i ostatnia zmiana spraw.
+        """
+        statement = select(
+            LawFirm.id,
+            LawFirm.updated_at,
+            select(func.count(Client.id)).where(
+                Client.law_firm_id == LawFirm.id
+            ).correlate(LawFirm).scalar_subquery(),
+            *collection_version(Case, Case.law_firm_id == LawFirm.id)
+        ).where(LawFirm.id == law_firm_id)
+        return resource_version(self.db, LawFirm, statement, for_update)
+
+    def get_law_firms_version(self) -> tuple:
+        """Wersja listy kancelarii (do ETag)"""
+        return list_version(self.db, LawFirm)
+
+    def get_law_firm_with_stats(self, law_firm_id: UUID) -> Optional[Tuple[LawFirm, dict]]:
+        """Pobiera kancelarię wraz ze statystykami w jednym zapytaniu"""
+        row = self.db.execute(law_firm_stats_statement(law_firm_id)).first()
+        if not row:
+            return None
+        return row.LawFirm, law_firm_stats_from_row(row)
 
 
 class ClientService:
@@ -88,20 +410,72 @@ class ClientService:
         self.db.refresh(db_client)
         return db_client
 
-    def get_client(self, client_id: UUID) -> Optional[Client]:
-        """Pobiera klienta po ID"""
-        return self.db.query(Client).filter(Client.id == client_id).first()
+    def bulk_create_clients(self, items: Sequence[Tuple[int, ClientCreate]]) -> Tuple[List[UUID], List[dict]]:
+        """
+        Wstawia partię klientów (bez zatwierdzania transakcji).
+
+        Istnienie kancelarii sprawdzane jest jednym zapytaniem dla całej partii;
+        rekordy z nieistniejącą kancelarią są zwracane jako błędy.
+        """
+        firm_ids = {data.law_firm_id for _, data in items}
+        existing = set(self.db.scalars(select(LawFirm.id).where(LawFirm.id.in_(firm_ids))))
+
+        valid, errors = [], []
+        for index, data in items:
+            if data.law_firm_id in existing:
+                valid.append((index, data))
+            else:
+                errors.append(bulk_error(index, "Kancelaria nie została znaleziona"))
+        return bulk_insert(self.db, Client, valid), errors
+
+    def get_client(self, client_id: UUID, updated_at: Optional[datetime] = None) -> Optional[Client]:
+        """
+        Pobiera klienta po ID (przez cache encji). Z `updated_at` wpis cache
+        o innej dacie modyfikacji jest pomijany.
+        """
+        return cached_entity(
+            self.db, Client, client_id,
+            lambda: self.db.query(Client).filter(Client.id == client_id).first(),
+            updated_at=updated_at
+        )
+
+    def get_client_version(self, client_id: UUID, for_update: bool = False) -> Optional[tuple]:
+        """Wersja klienta (do ETag): identyfikator i updated_at"""
+        statement = select(Client.id, Client.updated_at).where(Client.id == client_id)
+        return resource_version(self.db, Client, statement, for_update)
+
+    def get_clients_version(self, law_firm_id: Optional[UUID] = None) -> tuple:
+        """Wersja listy klientów (do ETag), także dla wyników wyszukiwania"""
+        criteria = [Client.law_firm_id == law_firm_id] if law_firm_id else []
+        return list_version(self.db, Client, *criteria)
 
     def get_clients(self, law_firm_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[Client]:
         """Pobiera listę klientów z opcjonalnym filtrowaniem po kancelarii"""
-        query = self.db.query(Client)
+        return self.get_clients_page(law_firm_id=law_firm_id, skip=skip, limit=limit).items
+
+    def get_clients_page(
+        self,
+        law_firm_id: Optional[UUID] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """Pobiera stronę klientów (paginacja kursorowa lub OFFSET)"""
+        statement, direction = keyset_statement(
+            clients_statement(law_firm_id), Client, skip=skip, limit=limit, cursor=cursor
+        )
+        return page_from_rows(self.db.scalars(statement).all(), limit, skip=skip, direction=direction)
+
+    def export_clients(self, law_firm_id: Optional[UUID] = None) -> Iterator[Sequence]:
+        """Strumieniuje klientów partiami wierszy (kolumny CLIENT_EXPORT_COLUMNS)"""
+        statement = select(*CLIENT_EXPORT_COLUMNS).order_by(Client.created_at, Client.id)
         if law_firm_id:
-            query = query.filter(Client.law_firm_id == law_firm_id)
-        return query.offset(skip).limit(limit).all()
+            statement = statement.where(Client.law_firm_id == law_firm_id)
+        return export_rows(self.db, statement, settings.EXPORT_BATCH_SIZE)
 
     def update_client(self, client_id: UUID, client_data: ClientUpdate) -> Optional[Client]:
         """Aktualizuje dane klienta"""
-        db_client = self.get_client(client_id)
+        db_client = self.db.query(Client).filter(Client.id == client_id).first()
         if not db_client:
             return None
         
@@ -110,27 +484,41 @@ class ClientService:
             setattr(db_client, field, value)
         
         self.db.commit()
+        invalidate_entity(Client, client_id)
         self.db.refresh(db_client)
         return db_client
 
     def delete_client(self, client_id: UUID) -> bool:
         """Usuwa klienta"""
-        db_client = self.get_client(client_id)
+        db_client = self.db.query(Client).filter(Client.id == client_id).first()
         if not db_client:
             return False
         
         self.db.delete(db_client)
         self.db.commit()
+        invalidate_entity(Client, client_id)
         return True
 
-    def search_clients(self, law_firm_id: UUID, search_term: str, skip: int = 0, limit: int = 100) -> List[Client]:
-        """Wyszukuje klientów po imieniu, nazwisku lub emailu"""
-        return self.db.query(Client).filter(
-            and_(
-                Client.law_firm_id == law_firm_id,
-                func.concat(Client.first_name, ' ', Client.last_name, ' ', Client.email).ilike(f'%{search_term}%')
-            )
-        ).offset(skip).limit(limit).all()
+    def search_clients(
+        self,
+        law_firm_id: Optional[UUID],
+        search_term: str,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Client]:
+        """
+        Wyszukuje klientów po imieniu, nazwisku lub emailu.
+
+        Wyszukiwanie ignoruje wielkość liter i polskie znaki diakrytyczne,
+        dopasowuje prefiksy słów i zwraca wyniki od najlepiej dopasowanych.
+        Bez `law_firm_id` przeszukuje klientów wszystkich kancelarii.
+        """
+        statement = client_search_statement(
+            self.db.get_bind().dialect.name, search_term, law_firm_id
+        )
+        if statement is None:
+            return []
+        return list(self.db.scalars(statement.offset(skip).limit(limit)).all())
 
 
 class CaseService:
@@ -143,16 +531,158 @@ class CaseService:
         self.db.add(db_case)
         self.db.commit()
         self.db.refresh(db_case)
+        case_statistics_cache.delete(db_case.law_firm_id)
         return db_case
 
     def get_case(self, case_id: UUID) -> Optional[Case]:
-        """Pobiera sprawę po ID z powiązanymi danymi"""
-        return self.db.query(Case).options(
+        """
+        Pobiera sprawę po ID z powiązanymi danymi (przez cache encji).
+
+        Przy trafieniu w cache klient pobierany jest także z cache,
+        a prawnik, dokumenty i notatki ładowane przy pierwszym odczycie.
+        """
+        # Kolekcje ładowane osobnymi zapytaniami IN - złączenie obu kolekcji
+        # dawałoby iloczyn kartezjański dokumenty x notatki
+        case = cached_entity(self.db, Case, case_id, lambda: self.db.query(Case).options(
             joinedload(Case.client),
             joinedload(Case.assigned_lawyer),
-            joinedload(Case.documents),
-            joinedload(Case.case_notes)
-        ).filter(Case.id == case_id).first()
+            selectinload(Case.documents),
+            selectinload(Case.case_notes)
+        ).filter(Case.id == case_id).first())
+        if case is not None:
+            set_committed_value(case, 'client', ClientService(self.db).get_client(case.client_id))
+        return case
+
+    def bulk_create_cases(self, items: Sequence[Tuple[int, CaseCreate]]) -> Tuple[List[UUID], List[dict]]:
+        """
+        Wstawia partię spraw (bez zatwierdzania transakcji).
+
+        Klienci sprawdzani są jednym zapytaniem dla całej partii; klient musi
+        istnieć i należeć do kancelarii sprawy. Numer sprawy musi być
+        unikalny w kancelarii - duplikaty w partii i numery już zapisane
+        (również we wcześniejszych partiach tej samej operacji) są
+        zwracane jako błędy rekordów.
+        """
+        client_ids = {data.client_id for _, data in items}
+        client_firms = dict(self.db.execute(
+            select(Client.id, Client.law_firm_id).where(Client.id.in_(client_ids))
+        ).all())
+        taken = {(law_firm_id, case_number) for law_firm_id, case_number in self.db.execute(
+            select(Case.law_firm_id, Case.case_number).where(
+                Case.law_firm_id.in_({data.law_firm_id for _, data in items}),
+                Case.case_number.in_({data.case_number for _, data in items})
+            )
+        )}
+
+        valid, errors = [], []
+        for index, data in items:
+            key = (data.law_firm_id, data.case_number)
+            if data.client_id not in client_firms:
+                errors.append(bulk_error(index, "Klient nie został znaleziony"))
+            elif client_firms[data.client_id] != data.law_firm_id:
+                errors.append(bulk_error(index, "Klient nie należy do wskazanej kancelarii"))
+            elif key in taken:
+                errors.append(bulk_error(index, "Sprawa o tym numerze już istnieje w kancelarii"))
+            else:
+                taken.add(key)
+                valid.append((index, data))
+
+        ids = bulk_insert(self.db, Case, valid)
+        for law_firm_id in {data.law_firm_id for _, data in valid}:
+            case_statistics_cache.delete(law_firm_id)
+        return ids, errors
+
+    def case_exists(self, case_id: UUID) -> bool:
+        """Sprawdza istnienie sprawy bez ładowania jej danych (SELECT 1 po kluczu głównym)"""
+        return self.db.execute(
+            select(literal(1)).where(Case.id == case_id).limit(1)
+        ).first() is not None
+
+    def get_case_version(self, case_id: UUID, for_update: bool = False) -> Optional[tuple]:
+        """
+        Wersja szczegółów sprawy (do ETag): updated_at sprawy, klienta
+        i przypisanego prawnika oraz liczba i ostatnia zmiana dokumentów
+        i notatek - jednym zapytaniem po kluczu głównym.
+        """
+        statement = select(
+            Case.id,
+            Case.updated_at,
+            select(Client.updated_at).where(Client.id == Case.client_id).correlate(Case).scalar_subquery(),
+            select(Profile.updated_at).where(Profile.id == Case.assigned_lawyer_id).correlate(Case).scalar_subquery(),
+            *collection_version(Document, Document.case_id == Case.id, changed_column=Document.created_at),
+            *collection_version(CaseNote, CaseNote.case_id == Case.id)
+        ).where(Case.id == case_id)
+        return resource_version(self.db, Case, statement, for_update)
+
+    def get_cases_version(
+        self,
+        law_firm_id: Optional[UUID] = None,
+        client_id: Optional[UUID] = None,
+        status: Optional[CaseStatus] = None,
+        priority: Optional[CasePriority] = None
+    ) -> tuple:
+        """Wersja listy spraw po filtrach (do ETag)"""
+        return list_version(self.db, Case, *case_criteria(law_firm_id, client_id, status, priority))
+
+    def get_case_details(
+        self,
+        case_id: UUID,
+        fields: Optional[Set[str]] = None,
+        documents_limit: int = 100,
+        documents_cursor: Optional[str] = None,
+        notes_limit: int = 100,
+        notes_cursor: Optional[str] = None,
+        version: Optional[tuple] = None
+    ) -> Optional[CaseDetails]:
+        """
+        Pobiera szczegóły sprawy z ograniczonymi kolekcjami dokumentów i notatek.
+
+        `fields` ogranicza ładowane dane do podanych pól (kolumny sprawy oraz
+        client, assigned_lawyer, documents, case_notes). Dokumenty i notatki
+        są stronicowane kursorem po (created_at, id).
+
+        Sprawa i klient pochodzą z cache encji; `version` (wynik
+        get_case_version) odrzuca ich wpisy o innej dacie modyfikacji.
+        """
+        def wanted(name: str) -> bool:
+            return fields is None or name in fields
+
+        options = []
+        # Wpis cache obejmuje cały wiersz (dla dowolnego zestawu pól),
+        # więc load_only stosowane jest tylko z wyłączonym cache
+        if fields is not None and not entity_cache.enabled:
+            columns = [getattr(Case, name) for name in CASE_COLUMNS if name in fields]
+            options.append(load_only(Case.id, *columns))
+        if wanted('client'):
+            options.append(joinedload(Case.client))
+        if wanted('assigned_lawyer'):
+            options.append(joinedload(Case.assigned_lawyer))
+
+        case = cached_entity(
+            self.db, Case, case_id,
+            lambda: self.db.query(Case).options(*options).filter(Case.id == case_id).first(),
+            updated_at=version[1] if version else None
+        )
+        if not case:
+            return None
+        if wanted('client'):
+            # Klient także z cache; przypisanie bez historii zmian utrzymuje
+            # go w (słabo referencyjnej) mapie tożsamości sesji
+            client = ClientService(self.db).get_client(case.client_id, updated_at=version[2] if version else None)
+            set_committed_value(case, 'client', client)
+
+        details = CaseDetails(case=case)
+        if wanted('documents'):
+            details.documents = paginate(
+                self.db.query(Document).filter(Document.case_id == case_id),
+                Document, limit=documents_limit, cursor=documents_cursor
+            )
+        if wanted('case_notes'):
+            details.case_notes = paginate(
+                self.db.query(CaseNote).filter(CaseNote.case_id == case_id),
+                CaseNote, limit=notes_limit, cursor=notes_cursor
+            )
+        return details
 
     def get_cases(
         self, 
@@ -164,18 +694,44 @@ class CaseService:
         limit: int = 100
     ) -> List[Case]:
         """Pobiera listę spraw z filtrowaniem"""
-        query = self.db.query(Case).options(joinedload(Case.client))
-        
-        if law_firm_id:
-            query = query.filter(Case.law_firm_id == law_firm_id)
-        if client_id:
-            query = query.filter(Case.client_id == client_id)
-        if status:
-            query = query.filter(Case.status == status)
-        if priority:
-            query = query.filter(Case.priority == priority)
-        
-        return query.offset(skip).limit(limit).all()
+        return self.get_cases_page(
+            law_firm_id=law_firm_id,
+            client_id=client_id,
+            status=status,
+            priority=priority,
+            skip=skip,
+            limit=limit
+        ).items
+
+    def get_cases_page(
+        self,
+        law_firm_id: Optional[UUID] = None,
+        client_id: Optional[UUID] = None,
+        status: Optional[CaseStatus] = None,
+        priority: Optional[CasePriority] = None,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """Pobiera stronę spraw z filtrowaniem (paginacja kursorowa lub OFFSET)"""
+        statement, direction = keyset_statement(
+            cases_statement(law_firm_id, client_id, status, priority), Case,
+            skip=skip, limit=limit, cursor=cursor
+        )
+        return page_from_rows(self.db.scalars(statement).all(), limit, skip=skip, direction=direction)
+
+    def export_cases(
+        self,
+        law_firm_id: Optional[UUID] = None,
+        client_id: Optional[UUID] = None,
+        status: Optional[CaseStatus] = None,
+        priority: Optional[CasePriority] = None
+    ) -> Iterator[Sequence]:
+        """Strumieniuje sprawy partiami wierszy (kolumny CASE_EXPORT_COLUMNS)"""
+        statement = select(*CASE_EXPORT_COLUMNS).where(
+            *case_criteria(law_firm_id, client_id, status, priority)
+        ).order_by(Case.created_at, Case.id)
+        return export_rows(self.db, statement, settings.EXPORT_BATCH_SIZE)
 
     def update_case(self, case_id: UUID, case_data: CaseUpdate) -> Optional[Case]:
         """Aktualizuje dane sprawy"""
@@ -188,7 +744,9 @@ class CaseService:
             setattr(db_case, field, value)
         
         self.db.commit()
+        invalidate_entity(Case, case_id)
         self.db.refresh(db_case)
+        case_statistics_cache.delete(db_case.law_firm_id)
         return db_case
 
     def delete_case(self, case_id: UUID) -> bool:
@@ -200,23 +758,34 @@ class CaseService:
         # Zamiast usuwać, archiwizujemy
         db_case.status = CaseStatus.archived
         self.db.commit()
+        invalidate_entity(Case, case_id)
+        case_statistics_cache.delete(db_case.law_firm_id)
         return True
 
     def get_case_statistics(self, law_firm_id: UUID) -> dict:
-        """Pobiera statystyki spraw dla kancelarii"""
-        stats = self.db.query(
-            func.count(Case.id).label('total_cases'),
-            func.count(Case.id).filter(Case.status == 'active').label('active_cases'),
-            func.count(Case.id).filter(Case.status == 'pending').label('pending_cases'),
-            func.count(Case.id).filter(Case.priority == 'urgent').label('urgent_cases')
-        ).filter(Case.law_firm_id == law_firm_id).first()
-        
-        return {
-            'total_cases': stats.total_cases or 0,
-            'active_cases': stats.active_cases or 0,
-            'pending_cases': stats.pending_cases or 0,
-            'urgent_cases': stats.urgent_cases or 0
-        }
+        """
+        Pobiera statystyki spraw dla kancelarii.
+
+        Wynik jest przechowywany w cache procesu (LRU + TTL) i unieważniany
+        przy tworzeniu, aktualizacji i archiwizacji spraw danej kancelarii.
+        """
+        stats = case_statistics_cache.get(law_firm_id)
+        if stats is None:
+            rows = self.db.execute(case_statistics_statement(law_firm_id)).all()
+            stats = case_statistics_from_rows(rows)
+            case_statistics_cache.set(law_firm_id, stats)
+        return stats
+
+    def refresh_case_statistics_view(self) -> None:
+        """
+        Odświeża widok zmaterializowany statystyk (bez blokowania odczytów)
+        i czyści cache statystyk. Gdy statystyki nie są czytane z widoku
+        (CASE_STATS_MATERIALIZED_VIEW wyłączone), czyści tylko cache.
+        """
+        if settings.CASE_STATS_MATERIALIZED_VIEW:
+            self.db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {CASE_STATISTICS_VIEW}"))
+            self.db.commit()
+        case_statistics_cache.clear()
 
 
 class DocumentService:
@@ -231,6 +800,10 @@ class DocumentService:
         self.db.refresh(db_document)
         return db_document
 
+    def bulk_create_documents(self, items: Sequence[Tuple[int, DocumentCreate]]) -> Tuple[List[UUID], List[dict]]:
+        """Wstawia partię dokumentów jednej sprawy (bez zatwierdzania transakcji)"""
+        return bulk_insert(self.db, Document, items), []
+
     def get_case_documents(self, case_id: UUID) -> List[Document]:
         """Pobiera wszystkie dokumenty dla sprawy"""
         return self.db.query(Document).filter(Document.case_id == case_id).all()
@@ -258,6 +831,10 @@ class CaseNoteService:
         self.db.refresh(db_note)
         return db_note
 
+    def bulk_create_case_notes(self, items: Sequence[Tuple[int, CaseNoteCreate]]) -> Tuple[List[UUID], List[dict]]:
+        """Wstawia partię notatek jednej sprawy (bez zatwierdzania transakcji)"""
+        return bulk_insert(self.db, CaseNote, items), []
+
     def get_case_notes(self, case_id: UUID, include_private: bool = True) -> List[CaseNote]:
         """Pobiera notatki dla sprawy"""
         query = self.db.query(CaseNote).filter(CaseNote.case_id == case_id)
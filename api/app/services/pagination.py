@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, tuple_, func, literal
+from sqlalchemy.orm import Query
+
+
+class InvalidCursor(ValueError):
+    """Nieprawidłowy lub uszkodzony token kursora"""
+
+
+@dataclass
+class Page:
+    """Strona wyników wraz z kursorami do sąsiednich stron"""
+    items: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(item, direction: str = "next") -> str:
+    """Tworzy nieprzezroczysty token kursora dla rekordu (created_at, id)"""
+    payload = {
+        "c": item.created_at.isoformat() if item.created_at else None,
+        "i": str(item.id),
+        "d": direction,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], UUID, str]:
+    """Dekoduje token kursora do krotki (created_at, id, kierunek)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        direction = payload.get("d", "next")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return created_at, UUID(payload["i"]), direction
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Nieprawidłowy kursor paginacji") from exc
+
+
+def keyset_statement(query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """
+    Zawęża zapytanie (Query lub Select) do jednej strony po kluczu (created_at, id).
+
+    Zwraca zapytanie pobierające `limit + 1` rekordów (nadmiarowy rekord
+    oznacza istnienie kolejnej strony) oraz kierunek kursora (None w trybie
+    OFFSET). Wynik składa się w stronę funkcją page_from_rows, więc warstwa
+    synchroniczna i asynchroniczna budują strony tak samo.
+    """
+    key = tuple_(model.created_at, model.id)
+
+    if cursor is None:
+        return query.order_by(model.created_at, model.id).offset(skip).limit(limit + 1), None
+
+    created_at, cursor_id, direction = decode_cursor(cursor)
+    # Pozycję kursora odczytujemy z bazy po kluczu głównym, dzięki czemu
+    # porównanie nie zależy od formatu zapisu znacznika czasu w danym dialekcie.
+    # Gdy rekord został usunięty, używamy wartości zapisanej w tokenie.
+    anchor_created_at = func.coalesce(
+        select(model.created_at).where(model.id == cursor_id).scalar_subquery(),
+        created_at
+    )
+    anchor = tuple_(anchor_created_at, literal(cursor_id, model.id.type))
+
+    if direction == "next":
+        return query.filter(key > anchor).order_by(model.created_at, model.id).limit(limit + 1), direction
+    return query.filter(key < anchor).order_by(
+        model.created_at.desc(), model.id.desc()
+    ).limit(limit + 1), direction
+
+
+def page_from_rows(rows: List, limit: int, skip: int = 0, direction: Optional[str] = None) -> Page:
+    """Składa stronę z wierszy zapytania keyset_statement"""
+    if direction == "prev":
+        items = list(reversed(rows[:limit]))
+        return Page(
+            items=items,
+            next_cursor=encode_cursor(items[-1], "next") if items else None,
+            prev_cursor=encode_cursor(items[0], "prev") if len(rows) > limit else None,
+        )
+
+    items = list(rows[:limit])
+    has_prev = bool(items) and (direction == "next" or bool(skip))
+    return Page(
+        items=items,
+        next_cursor=encode_cursor(items[-1], "next") if len(rows) > limit else None,
+        prev_cursor=encode_cursor(items[0], "prev") if has_prev else None,
+    )
+
+
+def paginate(query: Query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+    """
+    Paginacja po kluczu (created_at, id).
+
+    Z kursorem zapytanie korzysta z indeksu złożonego i nie zależy od
+    numeru strony. Bez kursora używany jest OFFSET (tryb zgodności), ale
+    kolejność jest ta sama, więc zwrócone kursory pozwalają przejść na
+    tryb kursorowy od dowolnej strony.
+    """
+    statement, direction = keyset_statement(query, model, skip=skip, limit=limit, cursor=cursor)
+    return page_from_rows(statement.all(), limit, skip=skip, direction=direction)
@@ -0,0 +1,36 @@
+"""
+Plugin pytest wykrywający N+1 i przekroczenia budżetów zapytań.
+
+Włącza `QUERY_BUDGET_CHECKS` przed importem aplikacji i oblewa test, w którym
+dowolne żądanie przekroczyło budżet zadeklarowany przy endpoincie
+(`@query_budget`) albo wielokrotnie leniwie ładowało tę samą relację.
+Testy celowo przekraczające budżet oznacza się `@pytest.mark.query_budget_exempt`.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("QUERY_BUDGET_CHECKS", "True")
+
+from app.core.query_budget import violation_handlers  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget_exempt: nie oblewaj testu za przekroczenie budżetu zapytań"
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budget_violations(request):
+    """Zbiera naruszenia budżetu zapytań z żądań wykonanych w teście"""
+    violations = []
+    violation_handlers.append(violations.append)
+    yield violations
+    violation_handlers.remove(violations.append)
+
+    if violations and request.node.get_closest_marker("query_budget_exempt") is None:
+        pytest.fail(
+            "Przekroczone budżety zapytań SQL:\n" + "\n".join(f"- {violation}" for violation in violations),
+            pytrace=False
+        )
@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.cache import CACHE_COALESCED, CACHE_REQUESTS, ReadThroughCache, RedisCache, TTLCache
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    """Test wygasania wpisów po czasie życia"""
+    now = [1000.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    
+    now[0] += 31
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test usuwania najdawniej używanego wpisu po przekroczeniu rozmiaru"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_disabled():
+    """Test wyłączonego cache (ttl=0)"""
+    cache = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_redis_cache_backend():
+    """Test backendu Redis (fakeredis): zapis z TTL, usuwanie i czyszczenie po prefiksie"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    cache = RedisCache(fakeredis.FakeRedis(server=server), ttl=60, prefix="test:")
+    other = fakeredis.FakeRedis(server=server)
+    other.set("obcy:klucz", b"1")
+    
+    cache.set("clients:1", {"id": 1, "name": "Jan"})
+    assert cache.get("clients:1") == {"id": 1, "name": "Jan"}
+    assert 0 < other.pttl("test:clients:1") <= 60000
+    
+    cache.delete("clients:1")
+    assert cache.get("clients:1") is None
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.clear()
+    assert cache.get("a") is None and cache.get("b") is None
+    assert other.get("obcy:klucz") == b"1"
+
+
+def test_read_through_cache_single_flight():
+    """Test ładowania gorącego klucza jednym wywołaniem przy równoczesnych braku trafienia"""
+    cache = ReadThroughCache("test_single_flight", TTLCache(maxsize=10, ttl=60))
+    calls = []
+    release = threading.Event()
+    
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "wartość"
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get_or_load, "gorący", loader) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while CACHE_REQUESTS.value(cache="test_single_flight", result="miss") < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+    
+    assert results == ["wartość"] * 8
+    assert len(calls) == 1
+    assert cache.get_or_load("gorący", loader) == "wartość"
+    assert CACHE_REQUESTS.value(cache="test_single_flight", result="miss") == 8
+    assert CACHE_REQUESTS.value(cache="test_single_flight", result="hit") == 1
+    assert CACHE_COALESCED.value(cache="test_single_flight") == 7
+
+
+def test_read_through_cache_skips_value_loaded_during_invalidation():
+    """Test pominięcia zapisu wartości odczytanej przed równoczesnym unieważnieniem"""
+    cache = ReadThroughCache("test_invalidation", TTLCache(maxsize=10, ttl=60))
+    
+    def stale_loader():
+        cache.invalidate("klucz")
+        return "stara"
+    
+    assert cache.get_or_load("klucz", stale_loader) == "stara"
+    assert cache.get_or_load("klucz", lambda: "nowa") == "nowa"
+    assert cache.get_or_load("klucz", lambda: "inna") == "nowa"
+
+
+def test_read_through_cache_shares_invalidation_between_processes():
+    """Test unieważnienia w innym procesie (wspólny Redis) w trakcie ładowania wartości"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    worker = ReadThroughCache("test_shared_a", RedisCache(fakeredis.FakeRedis(server=server), ttl=60, prefix="test:"))
+    other = ReadThroughCache("test_shared_b", RedisCache(fakeredis.FakeRedis(server=server), ttl=60, prefix="test:"))
+    
+    def stale_loader():
+        other.invalidate("klucz")
+        return "stara"
+    
+    assert worker.get_or_load("klucz", stale_loader) == "stara"
+    assert other.get_or_load("klucz", lambda: "nowa") == "nowa"
+    assert worker.get_or_load("klucz", lambda: "inna") == "nowa"
+    
+    # Czyszczenie cache nie zeruje licznika unieważnień
+    generation = worker.backend.generation()
+    other.clear()
+    assert worker.backend.generation() == generation + 1
@@ -2,11 +2,12 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from app.main import app
 from app.db.session import get_db, Base
-from app.models.kancelaria import LawFirm
+from app.core.config import settings
+from app.models.kancelaria import LawFirm, LawFirmStats
 
 # Test database URL (SQLite in memory for testing)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -25,16 +26,16 @@ def override_get_db():
         db.close()
 
 
-app.dependency_overrides[get_db] = override_get_db
-
 client = TestClient(app)
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="module", autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
 
 
 def test_create_law_firm(setup_database):
@@ -105,4 +106,88 @@ def test_root_endpoint():
     data = response.json()
     assert "message" in data
     assert "version" in data
-    assert "docs_url" in data
\ No newline at end of file
+    assert "docs_url" in data
+
+def test_get_law_firms_cursor_pagination(setup_database):
+    """Test paginacji kursorowej listy kancelarii"""
+    for i in range(5):
+        client.post("/api/v1/kancelarie/", json={"name": f"Kancelaria Kursor {i}"})
+    
+    expected = [firm["id"] for firm in client.get("/api/v1/kancelarie/?limit=1000").json()]
+    
+    # Przejście do przodu po stronach po 2 rekordy
+    collected = []
+    response = client.get("/api/v1/kancelarie/?limit=2")
+    while True:
+        assert response.status_code == 200
+        collected.extend(firm["id"] for firm in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        last_page = response
+        response = client.get(f"/api/v1/kancelarie/?limit=2&cursor={next_cursor}")
+    
+    assert collected == expected
+    
+    # Powrót do poprzedniej strony
+    prev_cursor = response.headers["X-Prev-Cursor"]
+    previous = client.get(f"/api/v1/kancelarie/?limit=2&cursor={prev_cursor}")
+    assert [firm["id"] for firm in previous.json()] == [firm["id"] for firm in last_page.json()]
+
+
+def test_get_law_firms_invalid_cursor(setup_database):
+    """Test listy kancelarii z nieprawidłowym kursorem"""
+    response = client.get("/api/v1/kancelarie/?cursor=nieprawidlowy")
+    assert response.status_code == 400
+
+
+def test_get_law_firm_stats(setup_database):
+    """Test statystyk kancelarii - klient z wieloma sprawami liczony raz"""
+    law_firm = client.post("/api/v1/kancelarie/", json={"name": "Kancelaria Statystyki"}).json()
+    klient = client.post("/api/v1/klienci/", json={
+        "first_name": "Jan",
+        "last_name": "Kowalski",
+        "law_firm_id": law_firm["id"]
+    }).json()
+    client.post("/api/v1/klienci/", json={
+        "first_name": "Anna",
+        "last_name": "Nowak",
+        "law_firm_id": law_firm["id"]
+    })
+    for number, status in (("I C 1/25", "active"), ("I C 2/25", "pending"), ("I C 3/25", "active")):
+        response = client.post("/api/v1/sprawy/", json={
+            "case_number": number,
+            "title": f"Sprawa {number}",
+            "law_firm_id": law_firm["id"],
+            "client_id": klient["id"],
+            "status": status
+        })
+        assert response.status_code == 201
+    
+    response = client.get(f"/api/v1/kancelarie/{law_firm['id']}")
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["name"] == "Kancelaria Statystyki"
+    assert data["clients_count"] == 2
+    assert data["cases_count"] == 3
+    assert data["active_cases_count"] == 2
+
+
+def test_get_law_firm_stats_from_counter_table(setup_database, monkeypatch):
+    """Test odczytu statystyk z tabeli liczników law_firm_stats"""
+    law_firm = client.post("/api/v1/kancelarie/", json={"name": "Kancelaria Liczniki"}).json()
+    
+    db = TestingSessionLocal()
+    db.add(LawFirmStats(
+        law_firm_id=UUID(law_firm["id"]),
+        clients_count=7,
+        cases_count=12,
+        active_cases_count=5
+    ))
+    db.commit()
+    db.close()
+    
+    monkeypatch.setattr(settings, "LAW_FIRM_STATS_COUNTERS", True)
+    data = client.get(f"/api/v1/kancelarie/{law_firm['id']}").json()
+    assert (data["clients_count"], data["cases_count"], data["active_cases_count"]) == (7, 12, 5)
@@ -1,12 +1,16 @@
+import csv
+import io
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from uuid import uuid4
+from uuid import UUID, uuid4
 from datetime import date
 
 from app.main import app
 from app.db.session import get_db, Base
+from app.core.cache import CACHE_REQUESTS
+from app.services.kancelaria_service import ClientService
 
 # Test database URL (SQLite in memory for testing)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_clients.db"
@@ -25,16 +29,16 @@ def override_get_db():
         db.close()
 
 
-app.dependency_overrides[get_db] = override_get_db
-
 client = TestClient(app)
 
 
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="module", autouse=True)
 def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
 
 
 @pytest.fixture
@@ -200,4 +204,94 @@ def test_search_clients(sample_law_firm):
     
     data = response.json()
     assert len(data) >= 1
-    assert any("Testowy" in f"{c['first_name']} {c['last_name']}" for c in data)
\ No newline at end of file
+    assert any("Testowy" in f"{c['first_name']} {c['last_name']}" for c in data)
+
+def test_search_clients_ignores_diacritics_and_matches_prefix(sample_law_firm):
+    """Test wyszukiwania bez polskich znaków i po początku słowa"""
+    client.post("/api/v1/klienci/", json={
+        "first_name": "Paweł",
+        "last_name": "Żółkiewski",
+        "law_firm_id": sample_law_firm["id"],
+        "email": "pawel.zolkiewski@example.com"
+    })
+    
+    response = client.get(f"/api/v1/klienci/?law_firm_id={sample_law_firm['id']}&search=zolk")
+    assert response.status_code == 200
+    assert [c["last_name"] for c in response.json()] == ["Żółkiewski"]
+    
+    response = client.get(f"/api/v1/klienci/?law_firm_id={sample_law_firm['id']}&search=PAWEŁ ŻÓŁ")
+    assert [c["last_name"] for c in response.json()] == ["Żółkiewski"]
+
+
+def test_search_clients_without_law_firm(sample_law_firm):
+    """Test wyszukiwania klientów bez filtrowania po kancelarii"""
+    other_firm = client.post("/api/v1/kancelarie/", json={"name": "Inna Kancelaria"}).json()
+    client.post("/api/v1/klienci/", json={
+        "first_name": "Grzegorz",
+        "last_name": "Brzęczyszczykiewicz",
+        "law_firm_id": other_firm["id"]
+    })
+    
+    response = client.get("/api/v1/klienci/?search=brzeczyszczykiewicz")
+    assert response.status_code == 200
+    assert [c["law_firm_id"] for c in response.json()] == [other_firm["id"]]
+    
+    # Wyszukiwanie w obrębie innej kancelarii nie zwraca klienta
+    response = client.get(f"/api/v1/klienci/?law_firm_id={sample_law_firm['id']}&search=brzeczyszczykiewicz")
+    assert response.json() == []
+
+
+def test_search_clients_reflects_updates(sample_law_firm):
+    """Test aktualizacji indeksu wyszukiwania po zmianie danych klienta"""
+    created = client.post("/api/v1/klienci/", json={
+        "first_name": "Zofia",
+        "last_name": "Przedtem",
+        "law_firm_id": sample_law_firm["id"]
+    }).json()
+    client.put(f"/api/v1/klienci/{created['id']}", json={"last_name": "Potem"})
+    
+    assert client.get("/api/v1/klienci/?search=przedtem").json() == []
+    assert [c["id"] for c in client.get("/api/v1/klienci/?search=zofia potem").json()] == [created["id"]]
+
+
+def test_export_clients_csv(sample_law_firm):
+    """Test eksportu klientów kancelarii do CSV"""
+    law_firm = client.post("/api/v1/kancelarie/", json={"name": "Kancelaria Eksport"}).json()
+    for last_name in ("Żółć", "Nowak"):
+        client.post("/api/v1/klienci/", json={
+            "first_name": "Anna",
+            "last_name": last_name,
+            "law_firm_id": law_firm["id"]
+        })
+    
+    response = client.get(f"/api/v1/klienci/export?law_firm_id={law_firm['id']}&format=csv")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert sorted(row["last_name"] for row in rows) == ["Nowak", "Żółć"]
+    assert all(row["law_firm_id"] == law_firm["id"] for row in rows)
+    assert all(row["email"] == "" for row in rows)
+
+
+def test_get_client_is_served_from_entity_cache(sample_law_firm):
+    """Test cache klienta: trafienie bez zapytania o rekord, unieważnienie przy aktualizacji"""
+    created = client.post("/api/v1/klienci/", json={
+        "first_name": "Anna", "last_name": "Cache", "law_firm_id": sample_law_firm["id"]
+    }).json()
+    url = f"/api/v1/klienci/{created['id']}"
+    
+    hits_before = CACHE_REQUESTS.value(cache="entity", result="hit")
+    assert 'desc="2 queries"' in client.get(url).headers["server-timing"]
+    cached = client.get(url)
+    assert cached.json()["last_name"] == "Cache"
+    # Tylko zapytanie wersji dla ETag - rekord pochodzi z cache
+    assert 'desc="1 queries"' in cached.headers["server-timing"]
+    assert CACHE_REQUESTS.value(cache="entity", result="hit") == hits_before + 1
+    
+    client.put(url, json={"last_name": "Zmieniona"})
+    assert client.get(url).json()["last_name"] == "Zmieniona"
+    
+    db = TestingSessionLocal()
+    try:
+        assert ClientService(db).get_client(UUID(created["id"])).last_name == "Zmieniona"
+    finally:
+        db.close()
@@ -0,0 +1,191 @@
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.config import settings
+from app.core.metrics import Histogram, Registry
+from app.core.instrumentation import REQUEST_DB_QUERIES, REQUEST_DURATION, RequestStats, _request_stats
+from app.core.query_budget import check_request, query_budget
+from app.models.kancelaria import LawFirm, Client, Case, Document
+from app.db import pool as db_pool
+from app.db.pool import TimedQueuePool, instrument_engine, pool_snapshot
+from app.db.session import get_db, Base
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_metrics_app.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def instrumented_engine():
+    engine = create_engine(
+        "sqlite:///./test_metrics.db",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1
+    )
+    instrument_engine(engine, "test")
+    yield engine
+    engine.dispose()
+    db_pool.pool_stats.pop("test", None)
+    db_pool._engines.pop("test", None)
+
+
+def test_pool_snapshot_tracks_checkouts(instrumented_engine):
+    """Test liczników puli: połączenia wydane, czas oczekiwania i nawiązywania"""
+    with instrumented_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        state = pool_snapshot()["test"]
+        assert state["checked_out"] == 1
+        assert state["connects"] == 1
+
+        # Pula o rozmiarze 1 bez nadmiaru - kolejne pobranie kończy się timeoutem
+        with pytest.raises(exc.TimeoutError):
+            instrumented_engine.connect()
+
+    with instrumented_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    state = pool_snapshot()["test"]
+    assert state["checked_out"] == 0
+    assert state["checked_in"] == 1
+    assert state["checkouts"] == 2
+    assert state["timeouts"] == 1
+    assert state["connects"] == 1
+    assert state["connect_seconds_total"] > 0
+
+    # Statystyki przeżywają odtworzenie puli
+    instrumented_engine.dispose()
+    with instrumented_engine.connect():
+        pass
+    assert pool_snapshot()["test"]["checkouts"] == 3
+
+
+def test_metrics_endpoint_exposes_pool_stats(instrumented_engine):
+    """Test endpointu /metrics w formacie Prometheus"""
+    with instrumented_engine.connect():
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_checked_out gauge" in response.text
+    assert 'db_pool_checked_out{engine="test"} 1' in response.text
+    assert 'db_pool_checkouts_total{engine="sync"}' in response.text
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test formatu histogramu Prometheus (przedziały kumulatywne, suma, liczba)"""
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Opis", labels=("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, route="/a")
+    registry.counter("hits_total", "Opis").inc(2)
+    
+    rendered = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in rendered
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in rendered
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in rendered
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in rendered
+    assert 'latency_seconds_count{route="/a"} 4' in rendered
+    assert "hits_total 2" in rendered
+    assert isinstance(histogram, Histogram) and histogram.sum(route="/a") == pytest.approx(4.25)
+
+
+def test_request_metrics_count_queries_per_route():
+    """Test zliczania zapytań SQL i czasu żądań według szablonu trasy"""
+    route = "/api/v1/kancelarie/{kancelaria_id}"
+    law_firm = client.post("/api/v1/kancelarie/", json={"name": "Kancelaria Metryki"}).json()
+    before = REQUEST_DURATION.count(method="GET", route=route, status="200")
+    
+    response = client.get(f"/api/v1/kancelarie/{law_firm['id']}")
+    assert response.status_code == 200
+    assert "X-Process-Time" not in response.headers
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("app;dur=")
+    assert 'desc="2 queries"' in server_timing
+    
+    assert REQUEST_DURATION.count(method="GET", route=route, status="200") == before + 1
+    assert REQUEST_DB_QUERIES.count(method="GET", route=route) >= 1
+    
+    text_metrics = client.get("/metrics").text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}",status="200"}}' in text_metrics
+    assert f'http_request_db_queries_bucket{{method="GET",route="{route}",le="1.0"}}' in text_metrics
+    assert 'db_pool_checked_out{engine="sync"}' in text_metrics
+
+
+def test_slow_queries_are_logged_with_route(monkeypatch, caplog):
+    """Test logowania wolnych zapytań wraz z trasą żądania"""
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+        client.get("/api/v1/kancelarie/")
+    
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("[GET /api/v1/kancelarie/]" in message and "SELECT" in message for message in messages)
+
+
+def test_repeated_lazy_loads_are_reported_as_n_plus_one():
+    """Test wykrywania wielokrotnego leniwego ładowania tej samej relacji"""
+    db = TestingSessionLocal()
+    law_firm = LawFirm(name="Kancelaria N+1")
+    client_row = Client(first_name="Jan", last_name="Kowalski", law_firm=law_firm)
+    for i in range(3):
+        case = Case(case_number=f"N {i}/25", title="Sprawa", law_firm=law_firm, client=client_row)
+        db.add(Document(name=f"Dokument {i}", case=case))
+    db.commit()
+    law_firm_id = law_firm.id
+    db.expunge_all()
+    
+    stats = RequestStats({"method": "GET", "path": "/test"})
+    token = _request_stats.set(stats)
+    try:
+        cases = db.query(Case).filter(Case.law_firm_id == law_firm_id).all()
+        assert sum(len(case.documents) for case in cases) == 3
+    finally:
+        _request_stats.reset(token)
+        db.close()
+    
+    assert stats.lazy_loads == {"Case.documents": 3}
+    assert stats.queries == 4
+    violation = check_request(stats, None)
+    assert "N+1: relacja Case.documents ładowana leniwie 3 razy" in str(violation)
+
+
+def test_query_budget_is_checked_against_endpoint():
+    """Test porównania liczby zapytań z budżetem zadeklarowanym przy endpoincie"""
+    @query_budget(2)
+    def endpoint():
+        pass
+    
+    stats = RequestStats({"method": "GET", "path": "/test"})
+    stats.queries = 2
+    assert check_request(stats, endpoint) is None
+    
+    stats.queries = 3
+    assert str(check_request(stats, endpoint)) == "GET unmatched: 3 zapytań SQL przy budżecie 2"
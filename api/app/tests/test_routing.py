@@ -0,0 +1,129 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+
+from app.db import routing
+from app.db.routing import (
+    READ_YOUR_WRITES_COOKIE, ReadRoutingMiddleware, Replica, ReplicaSet, RoutingSession,
+    _read_only_request, primary_reads
+)
+from app.db.session import Base
+from app.models.kancelaria import LawFirm
+
+
+def make_database(path, name):
+    engine = create_engine(f"sqlite:///./{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with RoutingSession(bind=engine) as db:
+        db.add(LawFirm(name=name))
+        db.commit()
+    return engine
+
+
+@pytest.fixture(scope="module")
+def databases():
+    engines = {
+        "primary": make_database("test_routing_primary.db", "Główna"),
+        "replica0": make_database("test_routing_replica0.db", "Replika 0"),
+        "replica1": make_database("test_routing_replica1.db", "Replika 1"),
+    }
+    yield engines
+    for engine in engines.values():
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def read_request():
+    token = _read_only_request.set(True)
+    yield
+    _read_only_request.reset(token)
+
+
+def replica_set(databases, *names, **options):
+    return ReplicaSet([Replica(name, databases[name]) for name in names], **options)
+
+
+def firm_names(db):
+    return set(db.scalars(select(LawFirm.name)))
+
+
+def test_read_requests_use_replica_and_writes_use_primary(databases, read_request):
+    """Test kierowania odczytów GET do repliki, a zapisów i FOR UPDATE do bazy głównej"""
+    with RoutingSession(bind=databases["primary"], replicas=replica_set(databases, "replica0")) as db:
+        assert firm_names(db) == {"Replika 0"}
+        with primary_reads(db):
+            assert firm_names(db) == {"Główna"}
+        locked = db.scalars(select(LawFirm.name).with_for_update()).all()
+        assert locked == ["Główna"]
+
+        db.add(LawFirm(name="Nowa"))
+        db.commit()
+
+    with RoutingSession(bind=databases["primary"]) as db:
+        assert "Nowa" in firm_names(db)
+
+    # Żądanie zapisujące (bez oznaczenia odczytu) korzysta z bazy głównej
+    token = _read_only_request.set(False)
+    try:
+        with RoutingSession(bind=databases["primary"], replicas=replica_set(databases, "replica0")) as db:
+            assert "Główna" in firm_names(db)
+    finally:
+        _read_only_request.reset(token)
+
+
+def test_replica_selection_strategies(databases, read_request):
+    """Test wyboru repliki: round-robin oraz najmniej wydanych połączeń"""
+    replicas = replica_set(databases, "replica0", "replica1")
+    seen = []
+    for _ in range(4):
+        with RoutingSession(bind=databases["primary"], replicas=replicas) as db:
+            seen.append(firm_names(db).pop())
+    assert seen == ["Replika 0", "Replika 1", "Replika 0", "Replika 1"]
+
+    replicas = replica_set(databases, "replica0", "replica1", strategy="least_connections")
+    with databases["replica0"].connect():
+        assert replicas.choose().name == "replica1"
+
+
+def test_unhealthy_or_lagging_replica_falls_back_to_primary(databases, read_request, monkeypatch):
+    """Test pomijania niedostępnej lub opóźnionej repliki"""
+    broken = create_engine("sqlite:////nonexistent/katalog/replika.db")
+    replicas = ReplicaSet([Replica("broken", broken)])
+    with RoutingSession(bind=databases["primary"], replicas=replicas) as db:
+        assert "Główna" in firm_names(db)
+    assert replicas.replicas[0].healthy is False
+    assert 'db_replica_up{replica="broken"} 0' in replicas.render_metrics()
+
+    monkeypatch.setattr(routing, "replica_lag", lambda connection: 30.0)
+    lagging = replica_set(databases, "replica0", max_lag=10.0)
+    assert lagging.choose() is None
+
+    monkeypatch.setattr(routing, "replica_lag", lambda connection: 0.0)
+    lagging.replicas[0].checked_at = None
+    assert lagging.choose().name == "replica0"
+
+
+def test_read_your_writes_cookie_pins_reads_to_primary():
+    """Test kierowania odczytów klienta do bazy głównej przez krótki czas po zapisie"""
+    app = FastAPI()
+    app.add_middleware(ReadRoutingMiddleware, window_seconds=30)
+
+    @app.get("/odczyt")
+    def read():
+        return {"replica": _read_only_request.get()}
+
+    @app.post("/zapis")
+    def write():
+        return {}
+
+    client = TestClient(app)
+    assert client.get("/odczyt").json() == {"replica": True}
+
+    response = client.post("/zapis")
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+    assert client.get("/odczyt").json() == {"replica": False}
+
+    client.cookies.set(READ_YOUR_WRITES_COOKIE, "0")
+    assert client.get("/odczyt").json() == {"replica": True}
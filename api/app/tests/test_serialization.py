@@ -0,0 +1,59 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from pydantic import TypeAdapter
+from typing import List
+
+from app.core.serialization import DefaultJSONResponse, serializer_for
+from app.models import kancelaria as models
+from app.api.v1.schemas.kancelaria import Case, Client, LawFirm
+
+
+def pydantic_json(schema, objects) -> list:
+    """Wynik ścieżki standardowej: walidacja response_model i serializacja JSON"""
+    adapter = TypeAdapter(List[schema])
+    return json.loads(adapter.dump_json(adapter.validate_python(objects, from_attributes=True)))
+
+
+def make_case(**fields):
+    values = dict(
+        id=uuid4(), law_firm_id=uuid4(), client_id=uuid4(), assigned_lawyer_id=None,
+        case_number="I C 1/25", title="Sprawa o zapłatę – Łódź", description=None,
+        case_type="cywilna", status="active", priority="high",
+        start_date=date(2025, 1, 2), end_date=None, court_name="Sąd Rejonowy",
+        case_value=Decimal("12500.50"),
+        created_at=datetime(2025, 1, 2, 10, 30, 0, 123456, tzinfo=timezone.utc),
+        updated_at=datetime(2025, 1, 3, 8, 0, tzinfo=timezone.utc),
+    )
+    values.update(fields)
+    return models.Case(**values)
+
+
+@pytest.mark.parametrize("schema, objects", [
+    (Case, [make_case(), make_case(case_value=None, assigned_lawyer_id=uuid4(), status="closed")]),
+    (Client, [models.Client(
+        id=uuid4(), law_firm_id=uuid4(), user_id=None, first_name="Żaneta", last_name="Nowak",
+        email="zaneta@example.com", phone=None, address="ul. Długa 1", date_of_birth=date(1990, 5, 17),
+        pesel="90051712345", notes=None,
+        created_at=datetime(2025, 1, 2, 10, 30), updated_at=datetime(2025, 1, 2, 10, 30)
+    )]),
+    (LawFirm, [models.LawFirm(
+        id=uuid4(), name="Kancelaria", address=None, phone="+48 1", email="biuro@kancelaria.pl",
+        tax_id=None, registration_number=None, website=None, description=None,
+        created_at=datetime(2025, 1, 2, tzinfo=timezone.utc), updated_at=datetime(2025, 1, 2, tzinfo=timezone.utc)
+    )]),
+])
+def test_fast_serializer_matches_response_model(schema, objects):
+    """Test zgodności szybkiego serializatora z walidacją przez response_model"""
+    fast = json.loads(serializer_for(schema).dumps_many(objects))
+    assert fast == pydantic_json(schema, objects)
+
+
+def test_default_response_renders_json():
+    """Test domyślnej klasy odpowiedzi (znaki spoza ASCII, Decimal, UUID)"""
+    identifier = uuid4()
+    response = DefaultJSONResponse({"nazwa": "Łódź", "wartość": Decimal("1.5"), "id": identifier})
+    assert json.loads(response.body) == {"nazwa": "Łódź", "wartość": 1.5, "id": str(identifier)}
@@ -0,0 +1,438 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from uuid import UUID, uuid4
+
+from app.main import app
+from app.db.session import get_db, Base
+from app.core.config import settings
+from app.core.cache import CACHE_REQUESTS
+from app.models.kancelaria import Case as CaseModel
+from app.services.kancelaria_service import CaseService, CASE_EXPORT_COLUMNS, bulk_insert, case_statistics_cache
+
+# Test database URL (SQLite in memory for testing)
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_cases.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.pop(get_db, None)
+    case_statistics_cache.clear()
+
+
+@pytest.fixture
+def sample_client():
+    """Tworzy kancelarię i klienta do testów"""
+    law_firm = client.post("/api/v1/kancelarie/", json={"name": "Kancelaria Sprawy"}).json()
+    response = client.post("/api/v1/klienci/", json={
+        "first_name": "Jan",
+        "last_name": "Kowalski",
+        "law_firm_id": law_firm["id"]
+    })
+    return response.json()
+
+
+def create_case(sample_client, **fields):
+    case_data = {
+        "case_number": f"I C {uuid4().hex[:8]}",
+        "title": "Sprawa testowa",
+        "law_firm_id": sample_client["law_firm_id"],
+        "client_id": sample_client["id"],
+    }
+    case_data.update(fields)
+    response = client.post("/api/v1/sprawy/", json=case_data)
+    assert response.status_code == 201
+    return response.json()
+
+
+def get_statistics(law_firm_id):
+    response = client.get(f"/api/v1/sprawy/statistics?law_firm_id={law_firm_id}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_create_case(sample_client):
+    """Test rejestracji nowej sprawy"""
+    case = create_case(sample_client, title="Rozwód", case_type="Prawo rodzinne")
+    assert case["title"] == "Rozwód"
+    assert case["status"] == "pending"
+    assert case["priority"] == "medium"
+
+
+def test_get_case_not_found():
+    """Test pobierania nieistniejącej sprawy"""
+    response = client.get(f"/api/v1/sprawy/{uuid4()}")
+    assert response.status_code == 404
+
+
+def test_case_statistics_breakdown(sample_client):
+    """Test statystyk spraw w podziale na status, priorytet i prawnika"""
+    lawyer_id = str(uuid4())
+    create_case(sample_client, status="active", priority="urgent", assigned_lawyer_id=lawyer_id)
+    create_case(sample_client, status="active", priority="low", assigned_lawyer_id=lawyer_id)
+    create_case(sample_client, status="pending", priority="urgent")
+    
+    stats = get_statistics(sample_client["law_firm_id"])
+    assert stats["total_cases"] == 3
+    assert stats["active_cases"] == 2
+    assert stats["pending_cases"] == 1
+    assert stats["urgent_cases"] == 2
+    assert stats["by_status"] == {"active": 2, "pending": 1, "closed": 0, "archived": 0}
+    assert stats["by_priority"] == {"low": 1, "medium": 0, "high": 0, "urgent": 2}
+    assert stats["by_lawyer"] == [
+        {"assigned_lawyer_id": lawyer_id, "total_cases": 2, "active_cases": 2},
+        {"assigned_lawyer_id": None, "total_cases": 1, "active_cases": 0},
+    ]
+
+
+def test_case_statistics_cache_invalidation(sample_client):
+    """Test unieważniania cache statystyk przy zmianach spraw"""
+    law_firm_id = sample_client["law_firm_id"]
+    assert get_statistics(law_firm_id)["total_cases"] == 0
+    
+    case = create_case(sample_client)
+    assert get_statistics(law_firm_id)["total_cases"] == 1
+    
+    client.put(f"/api/v1/sprawy/{case['id']}", json={"status": "active"})
+    assert get_statistics(law_firm_id)["active_cases"] == 1
+    
+    client.delete(f"/api/v1/sprawy/{case['id']}")
+    stats = get_statistics(law_firm_id)
+    assert stats["active_cases"] == 0
+    assert stats["by_status"]["archived"] == 1
+
+
+def test_refresh_case_statistics(sample_client):
+    """Test odświeżania statystyk po zmianach wykonanych poza usługą spraw"""
+    law_firm_id = sample_client["law_firm_id"]
+    assert get_statistics(law_firm_id)["total_cases"] == 0
+    
+    # Zapis z pominięciem CaseService (np. import danych) nie unieważnia cache
+    with TestingSessionLocal() as db:
+        db.add(CaseModel(
+            case_number="I C 1/26", title="Import",
+            law_firm_id=UUID(law_firm_id), client_id=UUID(sample_client["id"])
+        ))
+        db.commit()
+    assert get_statistics(law_firm_id)["total_cases"] == 0
+    
+    response = client.post("/api/v1/sprawy/statistics/refresh")
+    assert response.status_code == 204
+    assert get_statistics(law_firm_id)["total_cases"] == 1
+
+
+def test_get_case_details_paginates_collections(sample_client):
+    """Test stronicowania dokumentów i notatek w szczegółach sprawy"""
+    case = create_case(sample_client)
+    for i in range(3):
+        client.post(f"/api/v1/sprawy/{case['id']}/documents", json={
+            "name": f"Pozew {i}.pdf", "case_id": case["id"]
+        })
+        client.post(f"/api/v1/sprawy/{case['id']}/notes", json={
+            "content": f"Notatka {i}", "case_id": case["id"], "author_id": str(uuid4())
+        })
+    
+    response = client.get(f"/api/v1/sprawy/{case['id']}?documents_limit=2&notes_limit=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["client"]["id"] == sample_client["id"]
+    assert len(data["documents"]) == 2
+    assert len(data["case_notes"]) == 2
+    assert data["documents_next_cursor"]
+    
+    response = client.get(
+        f"/api/v1/sprawy/{case['id']}?documents_limit=2&documents_cursor={data['documents_next_cursor']}"
+    )
+    rest = response.json()
+    assert len(rest["documents"]) == 1
+    assert rest["documents_next_cursor"] is None
+    names = {d["name"] for d in data["documents"] + rest["documents"]}
+    assert names == {"Pozew 0.pdf", "Pozew 1.pdf", "Pozew 2.pdf"}
+
+
+def test_get_case_sparse_fields(sample_client):
+    """Test zwracania tylko wybranych pól sprawy"""
+    case = create_case(sample_client, description="Bardzo długi opis sprawy")
+    
+    response = client.get(f"/api/v1/sprawy/{case['id']}?fields=title,status,client")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"id", "title", "status", "client"}
+    assert data["client"]["last_name"] == "Kowalski"
+    
+    response = client.get(f"/api/v1/sprawy/{case['id']}?fields=title,nieistniejace")
+    assert response.status_code == 422
+
+
+def test_add_note_to_missing_case():
+    """Test dodawania notatki i dokumentu do nieistniejącej sprawy"""
+    fake_id = str(uuid4())
+    response = client.post(f"/api/v1/sprawy/{fake_id}/notes", json={
+        "content": "Notatka", "case_id": fake_id, "author_id": str(uuid4())
+    })
+    assert response.status_code == 404
+    
+    response = client.post(f"/api/v1/sprawy/{fake_id}/documents", json={
+        "name": "Pozew.pdf", "case_id": fake_id
+    })
+    assert response.status_code == 404
+
+
+def test_bulk_create_cases_reports_item_errors(sample_client):
+    """Test masowego tworzenia spraw z błędami poszczególnych rekordów"""
+    valid = {
+        "title": "Sprawa masowa",
+        "law_firm_id": sample_client["law_firm_id"],
+        "client_id": sample_client["id"],
+    }
+    payload = [
+        {**valid, "case_number": "B 1/25"},
+        {**valid, "case_number": ""},
+        {**valid, "case_number": "B 2/25", "client_id": str(uuid4())},
+        {**valid, "case_number": "B 3/25"},
+    ]
+    
+    response = client.post("/api/v1/sprawy/bulk", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    
+    cases = client.get(f"/api/v1/sprawy/?law_firm_id={sample_client['law_firm_id']}").json()
+    assert sorted(c["case_number"] for c in cases) == ["B 1/25", "B 3/25"]
+    assert get_statistics(sample_client["law_firm_id"])["total_cases"] == 2
+
+
+def test_bulk_create_cases_atomic(sample_client):
+    """Test masowego tworzenia spraw w trybie wszystko albo nic"""
+    payload = [
+        {"case_number": "A 1/25", "title": "Sprawa", "law_firm_id": sample_client["law_firm_id"],
+         "client_id": sample_client["id"]},
+        {"case_number": "A 2/25", "title": ""},
+    ]
+    
+    response = client.post("/api/v1/sprawy/bulk?atomic=true", json=payload)
+    assert response.status_code == 200
+    assert response.json()["created"] == 0
+    assert client.get(f"/api/v1/sprawy/?law_firm_id={sample_client['law_firm_id']}").json() == []
+
+
+def test_bulk_create_cases_reports_duplicate_numbers(sample_client, monkeypatch):
+    """Test raportowania duplikatów numeru sprawy w partii i w bazie"""
+    monkeypatch.setattr(settings, "BULK_BATCH_SIZE", 2)
+    existing = create_case(sample_client)
+    valid = {
+        "title": "Sprawa masowa",
+        "law_firm_id": sample_client["law_firm_id"],
+        "client_id": sample_client["id"],
+    }
+    payload = [
+        {**valid, "case_number": "D 1/25"},
+        {**valid, "case_number": "D 1/25"},
+        {**valid, "case_number": existing["case_number"]},
+        {**valid, "case_number": "D 2/25"},
+        {**valid, "case_number": "D 2/25"},
+    ]
+    
+    response = client.post("/api/v1/sprawy/bulk", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [error["index"] for error in data["errors"]] == [1, 2, 4]
+    
+    cases = client.get(f"/api/v1/sprawy/?law_firm_id={sample_client['law_firm_id']}").json()
+    assert sorted(c["case_number"] for c in cases) == sorted(["D 1/25", "D 2/25", existing["case_number"]])
+
+
+def test_bulk_create_cases_conflict_hides_database_error(sample_client, monkeypatch):
+    """Test odpowiedzi 409 bez szczegółów błędu bazy danych"""
+    monkeypatch.setattr(
+        CaseService, "bulk_create_cases", lambda self, items: (bulk_insert(self.db, CaseModel, items), [])
+    )
+    case = {
+        "case_number": "K 1/25", "title": "Sprawa",
+        "law_firm_id": sample_client["law_firm_id"], "client_id": sample_client["id"],
+    }
+    
+    response = client.post("/api/v1/sprawy/bulk", json=[case, case])
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Naruszenie ograniczeń bazy danych"
+    assert client.get(f"/api/v1/sprawy/?law_firm_id={sample_client['law_firm_id']}").json() == []
+
+
+def test_bulk_add_notes_ndjson(sample_client):
+    """Test masowego dodawania notatek jako strumień NDJSON"""
+    case = create_case(sample_client)
+    author_id = str(uuid4())
+    lines = [json.dumps({"content": f"Notatka {i}", "author_id": author_id}) for i in range(5)]
+    lines.insert(2, "{niepoprawny json")
+    
+    response = client.post(
+        f"/api/v1/sprawy/{case['id']}/notes/bulk",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 5
+    assert [error["index"] for error in data["errors"]] == [2]
+    
+    notes = client.get(f"/api/v1/sprawy/{case['id']}/notes").json()
+    assert len(notes) == 5
+    assert all(note["case_id"] == case["id"] for note in notes)
+    
+    response = client.post(f"/api/v1/sprawy/{uuid4()}/notes/bulk", json=[])
+    assert response.status_code == 404
+
+
+def test_export_cases_streams_in_batches(sample_client, monkeypatch):
+    """Test eksportu spraw partiami kursora (NDJSON i CSV)"""
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 100)
+    payload = [
+        {"case_number": f"E {i}/25", "title": "Sprawa eksportowa",
+         "law_firm_id": sample_client["law_firm_id"], "client_id": sample_client["id"]}
+        for i in range(250)
+    ]
+    assert client.post("/api/v1/sprawy/bulk", json=payload).json()["created"] == 250
+    
+    db = TestingSessionLocal()
+    try:
+        partitions = CaseService(db).export_cases(law_firm_id=UUID(sample_client["law_firm_id"]))
+        assert [len(rows) for rows in partitions] == [100, 100, 50]
+    finally:
+        db.close()
+    
+    response = client.get(f"/api/v1/sprawy/export?law_firm_id={sample_client['law_firm_id']}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 250
+    assert {record["case_number"] for record in records} == {f"E {i}/25" for i in range(250)}
+    assert records[0]["client_id"] == sample_client["id"]
+    
+    response = client.get(
+        f"/api/v1/sprawy/export?law_firm_id={sample_client['law_firm_id']}&format=csv&status=closed"
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "sprawy.csv" in response.headers["content-disposition"]
+    assert response.text.lstrip("﻿").splitlines() == [",".join(column.key for column in CASE_EXPORT_COLUMNS)]
+    
+    assert client.get("/api/v1/sprawy/export?format=xml").status_code == 422
+
+
+def test_list_cases_fast_serialization(sample_client, monkeypatch):
+    """Test zgodności szybkiej serializacji listy spraw ze ścieżką standardową"""
+    for _ in range(3):
+        create_case(sample_client, case_value=1500.25)
+    url = f"/api/v1/sprawy/?law_firm_id={sample_client['law_firm_id']}&limit=2"
+    
+    standard = client.get(url)
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    fast = client.get(url)
+    
+    assert fast.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    assert fast.json() == standard.json()
+    assert fast.headers["x-next-cursor"] == standard.headers["x-next-cursor"]
+
+
+def test_get_case_conditional_etag(sample_client):
+    """Test odpowiedzi 304 dla aktualnego ETag i nowego ETag po dodaniu notatki"""
+    case = create_case(sample_client)
+    response = client.get(f"/api/v1/sprawy/{case['id']}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+    assert "last-modified" in response.headers
+    
+    not_modified = client.get(f"/api/v1/sprawy/{case['id']}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert 'desc="1 queries"' in not_modified.headers["server-timing"]
+    
+    # ETag zależy od parametrów reprezentacji
+    sparse = client.get(f"/api/v1/sprawy/{case['id']}?fields=title", headers={"If-None-Match": etag})
+    assert sparse.status_code == 200
+    assert sparse.headers["etag"] != etag
+    
+    client.post(f"/api/v1/sprawy/{case['id']}/notes", json={
+        "content": "Nowa notatka", "case_id": case["id"], "author_id": str(uuid4())
+    })
+    changed = client.get(f"/api/v1/sprawy/{case['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["case_notes"]) == 1
+
+
+def test_get_case_details_served_from_entity_cache(sample_client):
+    """Test cache szczegółów sprawy: sprawa i klient z cache, unieważnienie przy aktualizacji"""
+    case = create_case(sample_client)
+    url = f"/api/v1/sprawy/{case['id']}"
+    
+    assert 'desc="4 queries"' in client.get(url).headers["server-timing"]
+    # Klient został załadowany złączeniem ze sprawą - jego wpis powstaje przy kolejnym odczycie
+    client.get(url)
+    hits_before = CACHE_REQUESTS.value(cache="entity", result="hit")
+    cached = client.get(url)
+    assert cached.json()["client"]["id"] == sample_client["id"]
+    # Wersja, dokumenty i notatki - sprawa i klient pochodzą z cache
+    assert 'desc="3 queries"' in cached.headers["server-timing"]
+    assert CACHE_REQUESTS.value(cache="entity", result="hit") == hits_before + 2
+    
+    client.put(url, json={"title": "Zmieniony tytuł"})
+    assert client.get(url).json()["title"] == "Zmieniony tytuł"
+    
+    # Zmiana klienta poza cache sprawy odrzuca wpis klienta po wersji z ETag
+    client.put(f"/api/v1/klienci/{sample_client['id']}", json={"last_name": "Nowak"})
+    assert client.get(url).json()["client"]["last_name"] == "Nowak"
+
+
+def test_list_cases_conditional_etag(sample_client):
+    """Test ETag listy spraw - zmienia się po dodaniu sprawy spełniającej filtry"""
+    create_case(sample_client)
+    url = f"/api/v1/sprawy/?client_id={sample_client['id']}"
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": f'W/"stary", {etag}'}).status_code == 304
+    
+    create_case(sample_client)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_update_case_if_match(sample_client):
+    """Test optymistycznej kontroli współbieżności nagłówkiem If-Match"""
+    case = create_case(sample_client)
+    etag = client.get(f"/api/v1/sprawy/{case['id']}").headers["etag"]
+    
+    stale = client.put(f"/api/v1/sprawy/{case['id']}", json={"title": "Zmiana"}, headers={"If-Match": '"nieaktualny"'})
+    assert stale.status_code == 412
+    assert client.get(f"/api/v1/sprawy/{case['id']}").json()["title"] == "Sprawa testowa"
+    
+    updated = client.put(f"/api/v1/sprawy/{case['id']}", json={"title": "Zmiana"}, headers={"If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["title"] == "Zmiana"
+    assert updated.headers["etag"] == client.get(f"/api/v1/sprawy/{case['id']}").headers["etag"]
@@ -0,0 +1,88 @@
+"""
+Benchmark: koszt dodania notatki w zależności od liczby notatek w sprawie.
+
+Porównuje sprawdzenie istnienia sprawy przez pełne CaseService.get_case
+(ładuje klienta, prawnika, wszystkie dokumenty i notatki) z lekkim
+CaseService.case_exists (SELECT 1 po kluczu głównym).
+
+Uruchomienie (z katalogu api/):
+
+    python -m benchmarks.bench_add_note --notes 0 1000 10000
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", "sqlite:///./bench_add_note.db")
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DEBUG", "False")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.session import Base  # noqa: E402
+from app.models.kancelaria import LawFirm, Client, Case, CaseNote  # noqa: E402
+from app.services.kancelaria_service import CaseService, CaseNoteService  # noqa: E402
+from app.api.v1.schemas.kancelaria import CaseNoteCreate  # noqa: E402
+
+
+def seed(engine, notes: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    law_firm_id, client_id, case_id, author_id = (uuid.uuid4() for _ in range(4))
+    with engine.begin() as conn:
+        conn.execute(insert(LawFirm), [{"id": law_firm_id, "name": "Kancelaria"}])
+        conn.execute(insert(Client), [{
+            "id": client_id, "law_firm_id": law_firm_id, "first_name": "Jan", "last_name": "Kowalski"
+        }])
+        conn.execute(insert(Case), [{
+            "id": case_id, "law_firm_id": law_firm_id, "client_id": client_id,
+            "case_number": "I C 1/25", "title": "Sprawa", "status": "active", "priority": "medium"
+        }])
+        if notes:
+            conn.execute(insert(CaseNote), [
+                {"id": uuid.uuid4(), "case_id": case_id, "author_id": author_id, "content": "x" * 500}
+                for _ in range(notes)
+            ])
+    return case_id, author_id
+
+
+def add_note(SessionLocal, case_id, author_id, probe: str) -> float:
+    db = SessionLocal()
+    start = time.perf_counter()
+    if probe == "get_case":
+        assert CaseService(db).get_case(case_id) is not None
+    else:
+        assert CaseService(db).case_exists(case_id)
+    CaseNoteService(db).create_case_note(CaseNoteCreate(case_id=case_id, author_id=author_id, content="Nowa"))
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    print(f"{'notatek':>8} {'get_case [ms]':>14} {'case_exists [ms]':>17}")
+    for notes in args.notes:
+        case_id, author_id = seed(engine, notes)
+        results = {}
+        for probe in ("get_case", "case_exists"):
+            samples = [add_note(SessionLocal, case_id, author_id, probe) for _ in range(args.repeat)]
+            results[probe] = statistics.median(samples) * 1000
+        print(f"{notes:>8} {results['get_case']:>14.2f} {results['case_exists']:>17.2f}")
+
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: zużycie pamięci (RSS) przy eksporcie strumieniowym spraw.
+
+Wypełnia bazę `--rows` sprawami (domyślnie 500 000), a następnie eksportuje
+je endpointem `GET /api/v1/sprawy/export` w formacie NDJSON i CSV, odbierając
+odpowiedź strumieniowo. Raportuje czas, rozmiar eksportu i przyrost
+szczytowego RSS procesu. Kończy się kodem 1, gdy przyrost przekroczy
+`--max-rss-mb` - eksport ma działać w stałej pamięci niezależnie od liczby wierszy.
+
+Uruchomienie (z katalogu api/):
+
+    python -m benchmarks.bench_export --rows 500000 --max-rss-mb 64
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", "sqlite:///./bench_export.db")
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DEBUG", "False")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+
+from app.db.session import Base, engine as app_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.kancelaria import LawFirm, Client, Case  # noqa: E402
+
+
+def seed(law_firm_id: uuid.UUID, rows: int) -> None:
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client_id = uuid.uuid4()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(LawFirm), [{"id": law_firm_id, "name": "Kancelaria"}])
+        conn.execute(insert(Client), [{
+            "id": client_id, "law_firm_id": law_firm_id, "first_name": "Jan", "last_name": "Kowalski"
+        }])
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "id": uuid.uuid4(),
+                "law_firm_id": law_firm_id,
+                "client_id": client_id,
+                "case_number": f"I C {i}/24",
+                "title": "Sprawa o zapłatę",
+                "description": "Powód wnosi o zasądzenie kwoty wraz z odsetkami ustawowymi.",
+                "case_value": 12500,
+                "created_at": start + timedelta(seconds=i),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Case), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Case), batch)
+    engine.dispose()
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss: kilobajty w Linuksie, bajty w macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def export(law_firm_id: uuid.UUID, export_format: str):
+    """
+    Wywołuje aplikację bezpośrednio przez ASGI i odrzuca kolejne fragmenty
+    odpowiedzi (klienci testowi httpx/TestClient buforują całe ciało).
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/sprawy/export",
+        "raw_path": b"/api/v1/sprawy/export",
+        "query_string": urlencode({"law_firm_id": str(law_firm_id), "format": export_format}).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    stats = {"status": None, "size": 0, "lines": 0}
+    requested, finished = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            stats["size"] += len(body)
+            stats["lines"] += body.count(b"\n")
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    if stats["status"] != 200:
+        raise RuntimeError(f"Eksport zakończony statusem {stats['status']}")
+    return stats["size"], stats["lines"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--max-rss-mb", type=float, default=64.0)
+    args = parser.parse_args()
+
+    # Dane wstawiane są w osobnym procesie, aby nie zawyżały szczytowego RSS
+    law_firm_id = uuid.uuid4()
+    seeder = multiprocessing.Process(target=seed, args=(law_firm_id, args.rows))
+    seeder.start()
+    seeder.join()
+
+    baseline = max_rss_mb()
+    failed = False
+    print(f"{'format':>8} {'wierszy':>10} {'rozmiar [MB]':>13} {'czas [s]':>9} {'przyrost RSS [MB]':>18}")
+    for export_format in ("ndjson", "csv"):
+        start = time.perf_counter()
+        size, lines = asyncio.run(export(law_firm_id, export_format))
+        elapsed = time.perf_counter() - start
+        growth = max_rss_mb() - baseline
+        failed = failed or growth > args.max_rss_mb
+        print(f"{export_format:>8} {lines:>10} {size / 1e6:>13.1f} {elapsed:>9.1f} {growth:>18.1f}")
+
+    app_engine.dispose()
+    Base.metadata.drop_all(bind=create_engine(BENCH_DATABASE_URL))
+    if failed:
+        print(f"Przyrost RSS przekroczył limit {args.max_rss_mb} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: opóźnienie pobrania strony nr 1000 przy paginacji OFFSET i kursorowej.
+
+Dla rosnącej liczby klientów w kancelarii mierzy czas pobrania strony
+`--page` (domyślnie 1000) o rozmiarze `--limit`. Przy OFFSET koszt rośnie
+liniowo z numerem strony, przy kursorze pozostaje stały.
+
+Uruchomienie (z katalogu api/):
+
+    python -m benchmarks.bench_pagination --sizes 25000 100000 400000
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", "sqlite:///./bench_pagination.db")
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DEBUG", "False")
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.session import Base  # noqa: E402
+from app.models.kancelaria import LawFirm, Client  # noqa: E402
+from app.services.kancelaria_service import ClientService  # noqa: E402
+from app.services.pagination import encode_cursor  # noqa: E402
+
+
+def seed(engine, size: int) -> uuid.UUID:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    law_firm_id = uuid.uuid4()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(LawFirm), [{"id": law_firm_id, "name": "Kancelaria"}])
+        batch = []
+        for i in range(size):
+            batch.append({
+                "id": uuid.uuid4(),
+                "law_firm_id": law_firm_id,
+                "first_name": f"Imię{i}",
+                "last_name": f"Nazwisko{i}",
+                "created_at": start + timedelta(seconds=i // 3),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Client), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Client), batch)
+    return law_firm_id
+
+
+def measure(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25000, 100000, 400000])
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    SessionLocal = sessionmaker(bind=engine)
+    skip = (args.page - 1) * args.limit
+
+    print(f"{'wierszy':>10} {'OFFSET [ms]':>12} {'kursor [ms]':>12}")
+    for size in args.sizes:
+        law_firm_id = seed(engine, size)
+        db = SessionLocal()
+        service = ClientService(db)
+
+        # Kursor wskazujący na ostatni rekord strony poprzedzającej
+        anchor = service.get_clients_page(law_firm_id=law_firm_id, skip=skip - 1, limit=1).items[0]
+        cursor = encode_cursor(anchor, "next")
+
+        offset_ms = measure(
+            lambda: service.get_clients_page(law_firm_id=law_firm_id, skip=skip, limit=args.limit), args.repeat
+        )
+        cursor_ms = measure(
+            lambda: service.get_clients_page(law_firm_id=law_firm_id, limit=args.limit, cursor=cursor), args.repeat
+        )
+        db.close()
+        print(f"{size:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+    Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: serializacja listy 1000 spraw do JSON.
+
+Porównuje trzy ścieżki dla tej samej listy obiektów ORM:
+
+- response_model + json    - walidacja Pydantic i JSONResponse ze Starlette
+- response_model + orjson  - walidacja Pydantic i DefaultJSONResponse (orjson)
+- ModelSerializer + orjson - FAST_SERIALIZATION, bez ponownej walidacji
+
+Raportuje medianę czasu i szczytową pamięć zaalokowaną podczas jednej
+serializacji (tracemalloc).
+
+Uruchomienie (z katalogu api/):
+
+    python -m benchmarks.bench_serialization --rows 1000
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_serialization.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("DEBUG", "False")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.v1.schemas.kancelaria import Case  # noqa: E402
+from app.core.serialization import DefaultJSONResponse, serializer_for  # noqa: E402
+from app.models import kancelaria as models  # noqa: E402
+
+
+def build_cases(rows: int) -> list:
+    law_firm_id, client_id = uuid.uuid4(), uuid.uuid4()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        models.Case(
+            id=uuid.uuid4(),
+            law_firm_id=law_firm_id,
+            client_id=client_id,
+            assigned_lawyer_id=uuid.uuid4() if i % 2 else None,
+            case_number=f"I C {i}/24",
+            title="Sprawa o zapłatę",
+            description="Powód wnosi o zasądzenie kwoty wraz z odsetkami ustawowymi.",
+            case_type="cywilna",
+            status="active",
+            priority="medium",
+            start_date=date(2024, 1, 1) + timedelta(days=i % 365),
+            end_date=None,
+            court_name="Sąd Rejonowy dla Warszawy-Mokotowa",
+            case_value=Decimal("12500.00"),
+            created_at=start + timedelta(seconds=i),
+            updated_at=start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+
+
+def measure(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(samples) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = build_cases(args.rows)
+    adapter = TypeAdapter(List[Case])
+    serializer = serializer_for(Case)
+
+    def validated():
+        return adapter.dump_python(adapter.validate_python(cases, from_attributes=True), mode="json")
+
+    paths = {
+        "response_model + json": lambda: JSONResponse(validated()),
+        "response_model + orjson": lambda: DefaultJSONResponse(validated()),
+        "ModelSerializer + orjson": lambda: serializer.dumps_many(cases),
+    }
+
+    print(f"{'ścieżka':<26} {'mediana [ms]':>13} {'szczyt pamięci [KiB]':>21}")
+    for name, fn in paths.items():
+        latency_ms, peak_kib = measure(fn, args.repeat)
+        print(f"{name:<26} {latency_ms:>13.2f} {peak_kib:>21.0f}")
+
+
+if __name__ == "__main__":
+    main()
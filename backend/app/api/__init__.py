@@ -1,6 +1,9 @@
+from flask import Blueprint
 from flask_restx import Api
+from app.utils.exceptions import APIError
 
 api_v1 = Api(
+    Blueprint('api_v1', __name__),
     version='1.0',
     title='Document Analysis Platform API',
     description='API for managing documents, analyses, orders, and payments.',
@@ -17,4 +20,9 @@ api_v1.add_namespace(auth_ns, path='/auth')
 api_v1.add_namespace(orders_ns, path='/orders')
 api_v1.add_namespace(documents_ns, path='/documents')
 api_v1.add_namespace(analyses_ns, path='/analyses')
-api_v1.add_namespace(payments_ns, path='/payments')
\ No newline at end of file
+api_v1.add_namespace(payments_ns, path='/payments')
+
+@api_v1.errorhandler(APIError)
+def handle_api_error(error):
+    """Service and lookup errors raised in resources (DocumentNotFound, ...) become JSON responses"""
+    return {'message': error.message}, error.status_code
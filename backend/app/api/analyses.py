@@ -1,11 +1,11 @@
+from flask import Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
-from app.app import db
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.analysis import Analysis
 from app.models.order import Order
 from app.utils.decorators import user_required, operator_required
 from app.utils.exceptions import OrderNotFound, AnalysisNotFound, APIError
-from app.services.notification_service import NotificationService
+from app.services.analysis_service import AnalysisService
 
 analyses_ns = Namespace('analyses', description='Analysis related operations')
 
@@ -15,7 +15,9 @@ analysis_model = analyses_ns.model('Analysis', {
     'result': fields.String(description='The analysis result (e.g., JSON string)'),
     'status': fields.String(description='The current status of the analysis'),
     'started_at': fields.DateTime(readOnly=True, description='The analysis start timestamp'),
-    'completed_at': fields.DateTime(description='The analysis completion timestamp')
+    'completed_at': fields.DateTime(description='The analysis completion timestamp'),
+    'progress': fields.Integer(description='Progress of a running analysis (0-100)'),
+    'progress_message': fields.String(description='Latest progress message of a running analysis')
 })
 
 @analyses_ns.route('/orders/<int:order_id>/analysis')
@@ -52,20 +54,32 @@ class OrderAnalysisResource(Resource):
                 analyses_ns.abort(409, message="Analysis already in progress for this order.")
             elif existing_analysis.status == 'completed':
                 analyses_ns.abort(409, message="Analysis already completed for this order. Retrieve it via GET.")
-            # If status is 'failed', we can potentially re-trigger or update
-            # For now, let's assume we create a new one if failed, or update existing
-            # For simplicity, let's just update the status to 'in_progress' if it was failed
-            existing_analysis.status = 'in_progress'
-            existing_analysis.started_at = datetime.utcnow()
-            existing_analysis.completed_at = None
-            db.session.commit()
-            return existing_analysis, 200 # Return 200 if updating existing
+            # A failed analysis is queued again
+            analysis = AnalysisService.enqueue_analysis(order, get_jwt_identity(), existing_analysis)
+            return analysis, 200 # Return 200 if updating existing
         else:
-            # Create a new analysis entry
-            analysis = Analysis(order_id=order_id, status='in_progress')
-            db.session.add(analysis)
-            db.session.commit()
-            # In a real scenario, this would trigger an asynchronous analysis job
-            # For now, we'll just simulate completion
-            # NotificationService.send_order_status_update(order.user_id, order_id, 'analysis_in_progress')
-            return analysis, 201
\ No newline at end of file
+            # Queued for the analysis worker (flask analysis-worker); progress via GET .../analysis/events
+            analysis = AnalysisService.enqueue_analysis(order, get_jwt_identity())
+            return analysis, 201
+
+@analyses_ns.route('/orders/<int:order_id>/analysis/events')
+@analyses_ns.param('order_id', 'The order identifier')
+class OrderAnalysisEvents(Resource):
+    @user_required()
+    @analyses_ns.doc(description='Stream analysis progress as server-sent events until the analysis completes or fails')
+    def get(self, order_id):
+        """Stream analysis progress for an order"""
+        order = Order.query.get(order_id)
+        if not order:
+            raise OrderNotFound()
+        if not AnalysisService.user_can_view(order, get_jwt_identity()):
+            analyses_ns.abort(403, message="Access denied: You do not own this order.")
+
+        analysis = Analysis.query.filter_by(order_id=order_id).first()
+        if not analysis:
+            raise AnalysisNotFound("Analysis not found for this order.")
+        return Response(
+            stream_with_context(AnalysisService.progress_events(analysis.id)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
\ No newline at end of file
@@ -2,6 +2,7 @@ from flask import request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, unset_jwt_cookies
 from app.services.auth_service import AuthService
+from app.utils.identity import token_claims
 from app.utils.validators import UserRegisterSchema, UserLoginSchema
 from app.utils.exceptions import InvalidCredentials, UserNotFound, APIError
 
@@ -57,7 +58,8 @@ class UserLogin(Resource):
             user = AuthService.authenticate_user(data['username'], data['password'])
             if not user:
                 raise InvalidCredentials()
-            access_token = create_access_token(identity=user.id)
+            # Role and token version travel in the token so the role decorators need no user lookup
+            access_token = create_access_token(identity=user.id, additional_claims=token_claims(user))
             return {'access_token': access_token}, 200
         except InvalidCredentials as e:
             auth_ns.abort(e.status_code, message=e.message)
@@ -1,17 +1,25 @@
+import base64
+from flask import redirect, request, send_file
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.document_service import DocumentService
+from app.services.direct_upload_service import DirectUploadService
+from app.services.resumable_upload_service import ResumableUploadService
 from app.utils.decorators import user_required, operator_required
 from app.utils.exceptions import DocumentNotFound, APIError
 
 documents_ns = Namespace('documents', description='Document related operations')
 
+TUS_VERSION = '1.0.0'
+
 document_model = documents_ns.model('Document', {
     'id': fields.Integer(readOnly=True, description='The document unique identifier'),
     'order_id': fields.Integer(required=True, description='The ID of the order this document belongs to'),
     'filename': fields.String(required=True, description='The name of the uploaded file'),
     'file_path': fields.String(required=True, description='The path or URL to the stored file'),
     'file_type': fields.String(description='The MIME type of the file'),
+    'size': fields.Integer(description='The file size in bytes'),
+    'sha256': fields.String(description='The SHA-256 digest of the file content'),
     'uploaded_at': fields.DateTime(readOnly=True, description='The document upload timestamp'),
     'status': fields.String(description='The current status of the document')
 })
@@ -37,4 +45,143 @@ class DocumentResource(Resource):
         success = DocumentService.delete_document(document_id)
         if not success:
             raise DocumentNotFound()
-        return {'message': 'Document deleted successfully'}, 204
\ No newline at end of file
+        return {'message': 'Document deleted successfully'}, 204
+
+@documents_ns.route('/<int:document_id>/content')
+@documents_ns.param('document_id', 'The document identifier')
+class DocumentContent(Resource):
+    @user_required()
+    @documents_ns.doc(
+        description='Download the document content; supports Range, If-Range and If-None-Match. '
+                    'With S3 storage this redirects to a short-lived presigned URL.',
+        params={'download': 'Send as an attachment instead of inline'}
+    )
+    def get(self, document_id):
+        """Download a document"""
+        document = DocumentService.get_document(document_id)
+        if not document or not DocumentService.user_can_access(document, get_jwt_identity()):
+            raise DocumentNotFound()
+        as_attachment = request.args.get('download', '').lower() in ('1', 'true', 'yes')
+        location = DocumentService.content_location(document, as_attachment)
+        if location is None:
+            raise DocumentNotFound("Document content not found")
+
+        kind, target = location
+        if kind == 'url':
+            response = redirect(target, code=302)
+            response.headers['Cache-Control'] = 'no-store' # The URL expires
+            return response
+        # conditional=True: 206 for Range (honouring If-Range) and 304 for a matching ETag;
+        # the file is passed to the server's file wrapper (sendfile) instead of being read here
+        response = send_file(
+            target,
+            mimetype=document.file_type or 'application/octet-stream',
+            as_attachment=as_attachment,
+            download_name=document.filename,
+            conditional=True,
+            etag=document.sha256 or True, # Content hash is a strong validator
+            max_age=0
+        )
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+@documents_ns.route('/uploads/<string:token>')
+@documents_ns.param('token', 'The signed upload token')
+class LocalDocumentUpload(Resource):
+    @documents_ns.doc(
+        description='Upload target of direct upload URLs when documents are stored locally; the token authorizes the upload',
+        consumes=['application/octet-stream']
+    )
+    def put(self, token):
+        """Receive a direct upload into local storage"""
+        try:
+            DirectUploadService.receive_local(token, request.stream, request.content_length)
+        except APIError as e:
+            documents_ns.abort(e.status_code, message=e.message)
+        return '', 204
+
+def tus_headers(session=None, **extra):
+    """Response headers of the resumable upload (tus) endpoints"""
+    headers = {'Tus-Resumable': TUS_VERSION, 'Cache-Control': 'no-store'}
+    if session is not None:
+        headers['Upload-Offset'] = str(session.offset)
+        headers['Upload-Length'] = str(session.length)
+        if session.status in session.ACTIVE_STATUSES:
+            headers['Upload-Expires'] = session.expires_at.strftime('%a, %d %b %Y %H:%M:%S GMT')
+        if session.document_id:
+            headers['X-Document-Id'] = str(session.document_id)
+    headers.update(extra)
+    return headers
+
+def parse_upload_metadata(header):
+    """Upload-Metadata: comma-separated "key base64(value)" pairs"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        if not pair.strip():
+            continue
+        key, _, value = pair.strip().partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value).decode('utf-8') if value else ''
+        except ValueError:
+            raise APIError(f"Invalid Upload-Metadata value for {key}", 400)
+    return metadata
+
+def tus_version_error():
+    """Error response when the client speaks another tus version, else None"""
+    version = request.headers.get('Tus-Resumable')
+    if version and version != TUS_VERSION:
+        return {'message': f"Unsupported tus version {version}"}, 412, tus_headers(**{'Tus-Version': TUS_VERSION})
+    return None
+
+@documents_ns.route('/resumable/<string:upload_id>')
+@documents_ns.param('upload_id', 'The resumable upload identifier')
+class ResumableDocumentUpload(Resource):
+    @user_required()
+    @documents_ns.doc(description='Get the offset of a resumable upload (Upload-Offset header)')
+    def head(self, upload_id):
+        """Query resumable upload progress"""
+        error = tus_version_error()
+        if error:
+            return error
+        try:
+            session = ResumableUploadService.get(upload_id, get_jwt_identity())
+        except APIError as e:
+            return '', e.status_code, tus_headers()
+        return '', 200, tus_headers(session)
+
+    @user_required()
+    @documents_ns.doc(
+        description='Upload the next chunk at Upload-Offset; the last chunk creates the document (X-Document-Id header)',
+        consumes=['application/offset+octet-stream']
+    )
+    def patch(self, upload_id):
+        """Upload a chunk of a resumable upload"""
+        error = tus_version_error()
+        if error:
+            return error
+        if request.mimetype != 'application/offset+octet-stream':
+            documents_ns.abort(415, message="Chunks must be sent as application/offset+octet-stream")
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            documents_ns.abort(400, message="A numeric Upload-Offset header is required")
+        try:
+            session = ResumableUploadService.append(
+                upload_id, get_jwt_identity(), offset, request.stream, request.content_length
+            )
+        except APIError as e:
+            return {'message': e.message}, e.status_code, tus_headers()
+        return '', 204, tus_headers(session)
+
+    @user_required()
+    @documents_ns.doc(description='Terminate a resumable upload and discard the uploaded chunks')
+    def delete(self, upload_id):
+        """Terminate a resumable upload"""
+        error = tus_version_error()
+        if error:
+            return error
+        try:
+            ResumableUploadService.terminate(upload_id, get_jwt_identity())
+        except APIError as e:
+            return {'message': e.message}, e.status_code, tus_headers()
+        return '', 204, tus_headers()
\ No newline at end of file
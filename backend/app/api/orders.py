@@ -1,9 +1,12 @@
 from flask import request
+from werkzeug.datastructures import FileStorage
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.order_service import OrderService
 from app.services.document_service import DocumentService
-from app.utils.validators import OrderCreateSchema, OrderUpdateStatusSchema
+from app.services.direct_upload_service import DirectUploadService
+from app.services.resumable_upload_service import ResumableUploadService
+from app.utils.validators import OrderCreateSchema, OrderUpdateStatusSchema, DocumentUploadUrlSchema, DocumentUploadCompleteSchema
 from app.utils.decorators import user_required, operator_required
 from app.utils.exceptions import OrderNotFound, APIError, FileUploadError
 
@@ -24,6 +27,8 @@ document_model = orders_ns.model('Document', {
     'filename': fields.String(required=True, description='The name of the uploaded file'),
     'file_path': fields.String(required=True, description='The path or URL to the stored file'),
     'file_type': fields.String(description='The MIME type of the file'),
+    'size': fields.Integer(description='The file size in bytes'),
+    'sha256': fields.String(description='The SHA-256 digest of the file content'),
     'uploaded_at': fields.DateTime(readOnly=True, description='The document upload timestamp'),
     'status': fields.String(description='The current status of the document')
 })
@@ -35,7 +40,24 @@ order_status_update_parser = orders_ns.parser()
 order_status_update_parser.add_argument('status', type=str, required=True, help='New status for the order')
 
 document_upload_parser = orders_ns.parser()
-document_upload_parser.add_argument('file', type=request.files.get('file'), location='files', required=True, help='Document file to upload')
+document_upload_parser.add_argument('file', type=FileStorage, location='files', required=True, help='Document file to upload')
+
+upload_url_model = orders_ns.model('DocumentUploadUrl', {
+    'upload_token': fields.String(description='Token to pass to the upload completion endpoint'),
+    'upload_url': fields.String(description='URL to upload the file to'),
+    'method': fields.String(description='HTTP method for the upload'),
+    'headers': fields.Raw(description='Headers that must be sent with the upload'),
+    'expires_in': fields.Integer(description='Seconds until the upload URL expires')
+})
+
+upload_url_parser = orders_ns.parser()
+upload_url_parser.add_argument('filename', type=str, required=True, location='json', help='Name of the file to upload')
+upload_url_parser.add_argument('size', type=int, required=True, location='json', help='File size in bytes')
+upload_url_parser.add_argument('sha256', type=str, required=False, location='json', help='SHA-256 of the file (hex); verified by storage when given')
+upload_url_parser.add_argument('content_type', type=str, required=False, location='json', help='MIME type of the file')
+
+upload_complete_parser = orders_ns.parser()
+upload_complete_parser.add_argument('upload_token', type=str, required=True, location='json', help='Token returned with the upload URL')
 
 @orders_ns.route('/')
 class OrderList(Resource):
@@ -123,7 +145,126 @@ class OrderDocumentUpload(Resource):
             if not document:
                 raise FileUploadError("Failed to upload document")
             return document, 201
-        except FileUploadError as e:
+        except APIError as e:
+            orders_ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            orders_ns.abort(500, message=f"An error occurred during file upload: {str(e)}")
+
+@orders_ns.route('/<int:order_id>/documents/stream')
+@orders_ns.param('order_id', 'The order identifier')
+class OrderDocumentStream(Resource):
+    @user_required()
+    @orders_ns.marshal_with(document_model, code=201)
+    @orders_ns.doc(
+        description='Upload a document as the raw request body; it is streamed to storage without multipart parsing',
+        params={
+            'filename': 'The name of the uploaded file',
+            'X-Content-SHA256': {
+                'in': 'header',
+                'description': 'SHA-256 of the file; content the user uploaded before is attached without reading the body'
+            }
+        },
+        consumes=['application/octet-stream']
+    )
+    def put(self, order_id):
+        """Stream a document for a specific order"""
+        filename = request.args.get('filename')
+        if not filename:
+            orders_ns.abort(400, message="The filename query parameter is required")
+        if not OrderService.get_order(order_id):
+            raise OrderNotFound()
+
+        try:
+            sha256 = request.headers.get('X-Content-SHA256')
+            if sha256:
+                document = DocumentService.attach_existing(order_id, filename, sha256, get_jwt_identity())
+                if document:
+                    return document, 201, {'X-Deduplicated': 'true'}
+            return DocumentService.upload_stream(request.stream, order_id, filename, request.mimetype), 201
+        except APIError as e:
             orders_ns.abort(e.status_code, message=e.message)
         except Exception as e:
-            orders_ns.abort(500, message=f"An error occurred during file upload: {str(e)}")
\ No newline at end of file
+            orders_ns.abort(500, message=f"An error occurred during file upload: {str(e)}")
+
+@orders_ns.route('/<int:order_id>/documents/upload-url')
+@orders_ns.param('order_id', 'The order identifier')
+class OrderDocumentUploadUrl(Resource):
+    @user_required()
+    @orders_ns.expect(upload_url_parser)
+    @orders_ns.marshal_with(upload_url_model, code=201)
+    @orders_ns.doc(description='Get a URL to upload a document directly to storage; finish with .../documents/complete')
+    def post(self, order_id):
+        """Create a direct upload URL for a document"""
+        data = upload_url_parser.parse_args()
+        try:
+            DocumentUploadUrlSchema(**data) # Validate input with Pydantic
+        except Exception as e:
+            orders_ns.abort(400, message=str(e))
+        if not OrderService.get_order(order_id):
+            raise OrderNotFound()
+
+        from app.api import api_v1
+        from app.api.documents import LocalDocumentUpload
+        try:
+            upload = DirectUploadService.create_upload(
+                order_id, get_jwt_identity(), data['filename'], data['size'],
+                lambda token: api_v1.url_for(LocalDocumentUpload, token=token, _external=True),
+                data.get('sha256'), data.get('content_type')
+            )
+            return upload, 201
+        except APIError as e:
+            orders_ns.abort(e.status_code, message=e.message)
+
+@orders_ns.route('/<int:order_id>/documents/complete')
+@orders_ns.param('order_id', 'The order identifier')
+class OrderDocumentUploadComplete(Resource):
+    @user_required()
+    @orders_ns.expect(upload_complete_parser)
+    @orders_ns.marshal_with(document_model, code=201)
+    @orders_ns.doc(description='Verify a direct upload (size and SHA-256) and create the document')
+    def post(self, order_id):
+        """Complete a direct document upload"""
+        data = upload_complete_parser.parse_args()
+        try:
+            DocumentUploadCompleteSchema(**data) # Validate input with Pydantic
+            return DirectUploadService.complete_upload(data['upload_token'], order_id, get_jwt_identity()), 201
+        except APIError as e:
+            orders_ns.abort(e.status_code, message=e.message)
+        except Exception as e:
+            orders_ns.abort(400, message=str(e))
+
+@orders_ns.route('/<int:order_id>/documents/resumable')
+@orders_ns.param('order_id', 'The order identifier')
+class OrderDocumentResumableUpload(Resource):
+    @user_required()
+    @orders_ns.doc(
+        description='Create a resumable (tus) upload from the Upload-Length and Upload-Metadata (filename, filetype) headers; '
+                    'chunks are sent to the returned Location',
+        params={
+            'Upload-Length': {'in': 'header', 'description': 'Size of the file in bytes', 'required': True},
+            'Upload-Metadata': {'in': 'header', 'description': 'tus metadata: "filename <base64>,filetype <base64>"'}
+        }
+    )
+    def post(self, order_id):
+        """Create a resumable document upload"""
+        from app.api import api_v1
+        from app.api.documents import ResumableDocumentUpload, tus_version_error, parse_upload_metadata, tus_headers
+
+        error = tus_version_error()
+        if error:
+            return error
+        if not OrderService.get_order(order_id):
+            raise OrderNotFound()
+        try:
+            length = int(request.headers['Upload-Length'])
+        except (KeyError, ValueError):
+            orders_ns.abort(400, message="A numeric Upload-Length header is required")
+        try:
+            metadata = parse_upload_metadata(request.headers.get('Upload-Metadata'))
+            session = ResumableUploadService.create(
+                order_id, get_jwt_identity(), length, metadata.get('filename'), metadata.get('filetype')
+            )
+        except APIError as e:
+            orders_ns.abort(e.status_code, message=e.message)
+        location = api_v1.url_for(ResumableDocumentUpload, upload_id=session.id, _external=True)
+        return '', 201, tus_headers(session, Location=location)
\ No newline at end of file
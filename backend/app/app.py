@@ -0,0 +1,31 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from flask_restx import Api
+from flask_migrate import Migrate
+from flask_cors import CORS
+from app.config import DevelopmentConfig
+
+db = SQLAlchemy()
+jwt = JWTManager()
+from app.api import api_v1
+
+migrate = Migrate()
+
+def create_app(config_class=DevelopmentConfig):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    db.init_app(app)
+    jwt.init_app(app)
+    migrate.init_app(app, db)
+    CORS(app)
+
+    app.register_blueprint(api_v1.blueprint, url_prefix='/api/v1')
+
+    from app.workers.analysis_worker import analysis_worker_command
+    app.cli.add_command(analysis_worker_command)
+    from app.workers.storage_sweeper import storage_sweeper_command
+    app.cli.add_command(storage_sweeper_command)
+
+    return app
\ No newline at end of file
@@ -6,11 +6,56 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'super_secret_jwt_key'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
+    # Uploads are streamed in chunks of this size; larger files are rejected with 413
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+    MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
     AWS_S3_BUCKET_NAME = os.environ.get('AWS_S3_BUCKET_NAME')
+    # Custom S3 endpoint (MinIO, moto server); AWS when unset
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+    # Multipart upload part size (min 5 MiB) and parts uploaded in parallel
+    S3_MULTIPART_PART_SIZE = int(os.environ.get('S3_MULTIPART_PART_SIZE', 16 * 1024 * 1024))
+    S3_MULTIPART_CONCURRENCY = int(os.environ.get('S3_MULTIPART_CONCURRENCY', 4))
+    # Shared S3 client: pooled connections (also the multipart part threads), timeouts and retry attempts
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 32))
+    S3_CONNECT_TIMEOUT = float(os.environ.get('S3_CONNECT_TIMEOUT', 5))
+    S3_READ_TIMEOUT = float(os.environ.get('S3_READ_TIMEOUT', 60))
+    S3_MAX_ATTEMPTS = int(os.environ.get('S3_MAX_ATTEMPTS', 5))
+    # Threads running storage calls for the async storage methods
+    STORAGE_IO_THREADS = int(os.environ.get('STORAGE_IO_THREADS', 8))
+    # Lifetime of direct upload URLs (POST /orders/<id>/documents/upload-url)
+    UPLOAD_URL_EXPIRES = int(os.environ.get('UPLOAD_URL_EXPIRES', 900))
+    # Lifetime of presigned S3 download URLs (GET /documents/<id>/content)
+    DOWNLOAD_URL_EXPIRES = int(os.environ.get('DOWNLOAD_URL_EXPIRES', 60))
+    # Resumable uploads not finished within this many seconds are discarded
+    RESUMABLE_UPLOAD_EXPIRES = int(os.environ.get('RESUMABLE_UPLOAD_EXPIRES', 24 * 3600))
+    # Storage sweeper (flask storage-sweeper): deletion queue interval, orphan scan
+    # interval, and the age below which unreferenced objects are left alone
+    STORAGE_SWEEP_INTERVAL = float(os.environ.get('STORAGE_SWEEP_INTERVAL', 30))
+    STORAGE_ORPHAN_SCAN_INTERVAL = float(os.environ.get('STORAGE_ORPHAN_SCAN_INTERVAL', 6 * 3600))
+    STORAGE_ORPHAN_GRACE_SECONDS = int(os.environ.get('STORAGE_ORPHAN_GRACE_SECONDS', 24 * 3600))
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
     STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
+    # Optional shared cache (identity cache, ...); in-process only when unset
+    REDIS_URL = os.environ.get('REDIS_URL')
+    # Seconds a resolved user identity (role, token version) is reused by the auth decorators
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 10000))
+    # Analysis job queue (flask analysis-worker)
+    ANALYSIS_WORKER_PROCESSES = int(os.environ.get('ANALYSIS_WORKER_PROCESSES', os.cpu_count() or 2))
+    ANALYSIS_POLL_INTERVAL = float(os.environ.get('ANALYSIS_POLL_INTERVAL', 2.0))
+    ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', 3))
+    ANALYSIS_RETRY_BASE_SECONDS = float(os.environ.get('ANALYSIS_RETRY_BASE_SECONDS', 10))
+    ANALYSIS_RETRY_MAX_SECONDS = float(os.environ.get('ANALYSIS_RETRY_MAX_SECONDS', 600))
+    # Jobs running at once per operator who triggered them
+    ANALYSIS_OPERATOR_CONCURRENCY = int(os.environ.get('ANALYSIS_OPERATOR_CONCURRENCY', 2))
+    # A job whose worker stops renewing its lease for this long is claimed again
+    ANALYSIS_JOB_LEASE_SECONDS = int(os.environ.get('ANALYSIS_JOB_LEASE_SECONDS', 300))
+    # Progress stream: keep-alive interval, DB poll interval without Redis, and max stream length
+    ANALYSIS_EVENTS_KEEPALIVE_SECONDS = float(os.environ.get('ANALYSIS_EVENTS_KEEPALIVE_SECONDS', 15))
+    ANALYSIS_EVENTS_POLL_SECONDS = float(os.environ.get('ANALYSIS_EVENTS_POLL_SECONDS', 1.0))
+    ANALYSIS_EVENTS_MAX_SECONDS = float(os.environ.get('ANALYSIS_EVENTS_MAX_SECONDS', 300))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -8,6 +8,8 @@ class Analysis(db.Model):
     status = db.Column(db.String(64), default='pending') # 'pending', 'in_progress', 'completed', 'failed'
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    progress = db.Column(db.Integer, nullable=False, default=0, server_default='0') # 0-100, published by the worker
+    progress_message = db.Column(db.String(255))
 
     def __repr__(self):
         return f'<Analysis for Order {self.order_id} - Status: {self.status}>'
\ No newline at end of file
@@ -0,0 +1,27 @@
+from datetime import datetime
+from app.app import db
+
+class AnalysisJob(db.Model):
+    __tablename__ = 'analysis_job'
+    __table_args__ = (
+        # Workers claim due jobs in run_at order
+        db.Index('ix_analysis_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('analysis.id'), nullable=False, index=True)
+    operator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(64), nullable=False, default='pending') # 'pending', 'in_progress', 'completed', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Not claimed before this time (retry backoff)
+    locked_by = db.Column(db.String(128)) # Worker holding the job
+    locked_until = db.Column(db.DateTime) # Lease; an expired in_progress job is claimed again
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    analysis = db.relationship('Analysis', backref=db.backref('jobs', lazy='dynamic'))
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} for Analysis {self.analysis_id} - Status: {self.status}>'
@@ -0,0 +1,17 @@
+from datetime import datetime
+from app.app import db
+
+class Blob(db.Model):
+    """Stored file content, shared by every document with the same SHA-256"""
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    storage_key = db.Column(db.String(512), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(128))
+    ref_count = db.Column(db.Integer, nullable=False, default=0) # Documents referencing this blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    documents = db.relationship('Document', backref='blob', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<Blob {self.sha256} ({self.ref_count} refs)>'
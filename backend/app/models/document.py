@@ -4,9 +4,12 @@ from app.app import db
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    blob_id = db.Column(db.Integer, db.ForeignKey('blob.id'), index=True) # Content; None for files stored before deduplication
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(512), nullable=False) # Local path or S3 URL
     file_type = db.Column(db.String(128))
+    size = db.Column(db.BigInteger) # Bytes, measured while streaming the upload
+    sha256 = db.Column(db.String(64), index=True) # Hex digest of the content
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(64), default='uploaded') # 'uploaded', 'processing', 'analyzed', 'failed'
 
@@ -0,0 +1,16 @@
+from datetime import datetime
+from app.app import db
+
+class StorageDeletion(db.Model):
+    """Outbox of storage objects to delete, written in the same transaction as the row delete"""
+    __tablename__ = 'storage_deletion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    storage_key = db.Column(db.String(512), nullable=False, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    not_before = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True) # Retry backoff
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StorageDeletion {self.storage_key}>'
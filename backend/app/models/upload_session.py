@@ -0,0 +1,29 @@
+from datetime import datetime
+from app.app import db
+
+class UploadSession(db.Model):
+    """State of a resumable upload, so any worker can accept its next chunk"""
+    __tablename__ = 'upload_session'
+
+    # Statuses of uploads whose stored bytes must be kept
+    ACTIVE_STATUSES = ('uploading', 'finalizing', 'failed')
+
+    id = db.Column(db.String(32), primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(128))
+    length = db.Column(db.BigInteger, nullable=False) # Declared size (Upload-Length)
+    offset = db.Column(db.BigInteger, nullable=False, default=0) # Bytes durably stored; reaches length once the document exists
+    storage_key = db.Column(db.String(512), nullable=False)
+    multipart_upload_id = db.Column(db.String(1024)) # S3 only
+    parts = db.Column(db.Text) # S3 only: JSON list of uploaded parts
+    pending_key = db.Column(db.String(512)) # S3 only: bytes not yet filling a part
+    status = db.Column(db.String(64), nullable=False, default='uploading') # 'uploading', 'finalizing', 'failed', 'completed', 'aborted'
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} for Order {self.order_id} - {self.offset}/{self.length}>'
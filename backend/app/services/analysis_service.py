@@ -0,0 +1,302 @@
+import json
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, text
+from app.app import db
+from app.config import Config
+from app.models.analysis import Analysis
+from app.models.analysis_job import AnalysisJob
+from app.models.document import Document
+from app.services.notification_service import NotificationService
+from app.utils.identity import resolve_identity
+from app.utils.redis_client import get_redis
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# First key of the per-operator advisory locks taken while claiming jobs
+_CLAIM_LOCK_KEY = zlib.crc32(b'analysis_job_claim') & 0x7fffffff
+
+def progress_channel(analysis_id):
+    return f"analysis-progress:{analysis_id}"
+
+def progress_event(analysis):
+    return {
+        'analysis_id': analysis.id,
+        'order_id': analysis.order_id,
+        'status': analysis.status,
+        'progress': analysis.progress or 0,
+        'message': analysis.progress_message
+    }
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(Config.ANALYSIS_RETRY_MAX_SECONDS, Config.ANALYSIS_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+class AnalysisService:
+    @staticmethod
+    def user_can_view(order, user_id):
+        """The order's owner, operators and admins can follow an analysis"""
+        if order.user_id == user_id:
+            return True
+        identity = resolve_identity(user_id)
+        return identity is not None and identity.role in ('operator', 'admin')
+
+    @staticmethod
+    def enqueue_analysis(order, operator_id, analysis=None):
+        """Creates (or resets a failed) analysis and queues a job for it in one transaction"""
+        if analysis is None:
+            analysis = Analysis(order_id=order.id)
+            db.session.add(analysis)
+        analysis.status = 'pending'
+        analysis.result = None
+        analysis.progress = 0
+        analysis.progress_message = None
+        analysis.started_at = None
+        analysis.completed_at = None
+        db.session.add(AnalysisJob(analysis=analysis, operator_id=operator_id, max_attempts=Config.ANALYSIS_MAX_ATTEMPTS))
+        db.session.commit()
+        AnalysisService.publish(analysis)
+        return analysis
+
+    @staticmethod
+    def claim_jobs(worker_id, limit):
+        """
+        Claims up to `limit` due jobs for a worker.
+
+        Candidates are selected with FOR UPDATE SKIP LOCKED so concurrent
+        workers never wait on or claim the same row. Jobs whose lease expired
+        (the worker died) are claimed again. On PostgreSQL a transaction-level
+        advisory lock per operator makes the running-jobs count and the claim
+        atomic across workers; SQLite serializes writers on its own.
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        candidates = (AnalysisJob.query
+            .filter(or_(
+                and_(AnalysisJob.status == 'pending', AnalysisJob.run_at <= now),
+                and_(AnalysisJob.status == 'in_progress', AnalysisJob.locked_until < now)
+            ))
+            .order_by(AnalysisJob.run_at, AnalysisJob.id)
+            .limit(limit * 4) # Headroom for jobs skipped by the operator limit
+            .with_for_update(skip_locked=True)
+            .all())
+
+        claimed = []
+        expired = []
+        running = {}
+        for job in candidates:
+            if len(claimed) >= limit:
+                break
+            if job.status == 'in_progress' and job.attempts >= job.max_attempts:
+                expired.append(AnalysisService._finish_failed(job, "Worker lease expired"))
+                continue
+            if job.operator_id not in running:
+                if not AnalysisService._lock_operator(job.operator_id):
+                    running[job.operator_id] = Config.ANALYSIS_OPERATOR_CONCURRENCY # Another worker is claiming for this operator
+                    continue
+                running[job.operator_id] = AnalysisJob.query.filter(
+                    AnalysisJob.operator_id == job.operator_id,
+                    AnalysisJob.status == 'in_progress',
+                    AnalysisJob.locked_until >= now
+                ).count()
+            if running[job.operator_id] >= Config.ANALYSIS_OPERATOR_CONCURRENCY:
+                continue
+            running[job.operator_id] += 1
+
+            job.status = 'in_progress'
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.locked_until = now + timedelta(seconds=Config.ANALYSIS_JOB_LEASE_SECONDS)
+            analysis = job.analysis
+            analysis.status = 'in_progress'
+            analysis.started_at = now
+            analysis.progress = 0
+            analysis.progress_message = f"Attempt {job.attempts} of {job.max_attempts}"
+            Document.query.filter_by(order_id=analysis.order_id).update({'status': 'processing'}, synchronize_session=False)
+            claimed.append(job)
+        db.session.commit()
+        for analysis in expired + [job.analysis for job in claimed]:
+            AnalysisService.publish(analysis)
+        return claimed
+
+    @staticmethod
+    def _lock_operator(operator_id):
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return True
+        return db.session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key, :operator_id)"),
+            {'key': _CLAIM_LOCK_KEY, 'operator_id': operator_id}
+        ).scalar()
+
+    @staticmethod
+    def job_payload(job):
+        """Plain data handed to the worker process (no ORM objects cross the process boundary)"""
+        documents = Document.query.filter_by(order_id=job.analysis.order_id).order_by(Document.id).all()
+        return {
+            'job_id': job.id,
+            'analysis_id': job.analysis_id,
+            'order_id': job.analysis.order_id,
+            'documents': [
+                {'id': d.id, 'filename': d.filename, 'file_path': d.file_path, 'file_type': d.file_type}
+                for d in documents
+            ]
+        }
+
+    @staticmethod
+    def _owned_job(job_id, worker_id):
+        # A worker whose lease expired and was claimed again must not overwrite the new attempt
+        job = db.session.get(AnalysisJob, job_id, with_for_update=True, populate_existing=True)
+        if job is None or job.status != 'in_progress' or job.locked_by != worker_id:
+            return None
+        return job
+
+    @staticmethod
+    def extend_leases(worker_id, job_ids):
+        if not job_ids:
+            return
+        AnalysisJob.query.filter(
+            AnalysisJob.id.in_(list(job_ids)),
+            AnalysisJob.locked_by == worker_id,
+            AnalysisJob.status == 'in_progress'
+        ).update(
+            {'locked_until': datetime.utcnow() + timedelta(seconds=Config.ANALYSIS_JOB_LEASE_SECONDS)},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    @staticmethod
+    def report_progress(job_id, worker_id, progress, message=None):
+        job = AnalysisService._owned_job(job_id, worker_id)
+        if job is None:
+            db.session.rollback()
+            return
+        analysis = job.analysis
+        analysis.progress = max(0, min(int(progress), 99)) # 100 only once the result is stored
+        analysis.progress_message = message
+        db.session.commit()
+        AnalysisService.publish(analysis)
+
+    @staticmethod
+    def complete_job(job_id, worker_id, result):
+        job = AnalysisService._owned_job(job_id, worker_id)
+        if job is None:
+            db.session.rollback()
+            return None
+        now = datetime.utcnow()
+        job.status = 'completed'
+        job.locked_by = None
+        job.locked_until = None
+        job.last_error = None
+        analysis = job.analysis
+        analysis.status = 'completed'
+        analysis.result = json.dumps(result)
+        analysis.progress = 100
+        analysis.progress_message = None
+        analysis.completed_at = now
+        Document.query.filter_by(order_id=analysis.order_id).update({'status': 'analyzed'}, synchronize_session=False)
+        db.session.commit()
+        AnalysisService.publish(analysis)
+        NotificationService.send_analysis_completion_notification(
+            analysis.order.user_id, analysis.order_id, f"{result.get('document_count', 0)} document(s) analyzed"
+        )
+        return analysis
+
+    @staticmethod
+    def fail_job(job_id, worker_id, error, retry=True):
+        """Schedules a retry with backoff, or fails the analysis after the last attempt"""
+        job = AnalysisService._owned_job(job_id, worker_id)
+        if job is None:
+            db.session.rollback()
+            return None
+        if retry and job.attempts < job.max_attempts:
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+            job.locked_by = None
+            job.locked_until = None
+            job.last_error = error
+            analysis = job.analysis
+            analysis.status = 'pending'
+            analysis.progress = 0
+            analysis.progress_message = f"Attempt {job.attempts} failed, retrying"
+        else:
+            analysis = AnalysisService._finish_failed(job, error)
+        db.session.commit()
+        AnalysisService.publish(analysis)
+        if analysis.status == 'failed':
+            NotificationService.send_order_status_update(analysis.order.user_id, analysis.order_id, 'analysis_failed')
+        return analysis
+
+    @staticmethod
+    def _finish_failed(job, error):
+        job.status = 'failed'
+        job.locked_by = None
+        job.locked_until = None
+        job.last_error = error
+        analysis = job.analysis
+        analysis.status = 'failed'
+        analysis.progress_message = error[:255] if error else None
+        analysis.completed_at = datetime.utcnow()
+        Document.query.filter_by(order_id=analysis.order_id).update({'status': 'failed'}, synchronize_session=False)
+        return analysis
+
+    @staticmethod
+    def publish(analysis):
+        """Publishes the analysis progress to subscribers of the progress stream (Redis only)"""
+        client = get_redis()
+        if client is not None:
+            client.publish(progress_channel(analysis.id), json.dumps(progress_event(analysis)))
+
+    @staticmethod
+    def _current_event(analysis_id):
+        analysis = db.session.get(Analysis, analysis_id, populate_existing=True)
+        event = progress_event(analysis) if analysis else None
+        db.session.rollback() # Return the connection to the pool while the stream waits
+        return event
+
+    @staticmethod
+    def progress_events(analysis_id):
+        """
+        Server-sent events with the analysis progress until it completes or
+        fails. Uses Redis pub/sub when REDIS_URL is set; otherwise polls the
+        analysis row server-side. Streams end after ANALYSIS_EVENTS_MAX_SECONDS
+        and EventSource clients reconnect.
+        """
+        def sse(event):
+            return f"event: progress\ndata: {json.dumps(event)}\n\n"
+
+        client = get_redis()
+        pubsub = None
+        if client is not None:
+            # Subscribe before reading the current state so no update is missed in between
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(progress_channel(analysis_id))
+        try:
+            last = AnalysisService._current_event(analysis_id)
+            if last is None:
+                return
+            yield sse(last)
+            deadline = time.monotonic() + Config.ANALYSIS_EVENTS_MAX_SECONDS
+            keepalive_at = time.monotonic() + Config.ANALYSIS_EVENTS_KEEPALIVE_SECONDS
+            while last['status'] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+                if pubsub is not None:
+                    message = pubsub.get_message(timeout=Config.ANALYSIS_EVENTS_KEEPALIVE_SECONDS)
+                    event = json.loads(message['data']) if message else None
+                else:
+                    time.sleep(Config.ANALYSIS_EVENTS_POLL_SECONDS)
+                    event = AnalysisService._current_event(analysis_id)
+                    if event is None:
+                        return
+                if event is not None and event != last:
+                    last = event
+                    keepalive_at = time.monotonic() + Config.ANALYSIS_EVENTS_KEEPALIVE_SECONDS
+                    yield sse(event)
+                elif time.monotonic() >= keepalive_at:
+                    keepalive_at = time.monotonic() + Config.ANALYSIS_EVENTS_KEEPALIVE_SECONDS
+                    yield ": keep-alive\n\n"
+        finally:
+            if pubsub is not None:
+                pubsub.close()
@@ -1,5 +1,6 @@
 from app.app import db
 from app.models.user import User
+from app.utils.identity import identity_cache
 
 class AuthService:
     @staticmethod
@@ -24,4 +25,25 @@ class AuthService:
 
     @staticmethod
     def get_user_by_id(user_id):
-        return User.query.get(user_id)
\ No newline at end of file
+        return User.query.get(user_id)
+
+    @staticmethod
+    def change_user_role(user_id, role):
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        user.role = role
+        user.token_version = (user.token_version or 0) + 1 # Tokens with the old role stop working
+        db.session.commit()
+        identity_cache.invalidate(user_id)
+        return user
+
+    @staticmethod
+    def revoke_user_tokens(user_id):
+        user = User.query.get(user_id)
+        if not user:
+            return False
+        user.token_version = (user.token_version or 0) + 1
+        db.session.commit()
+        identity_cache.invalidate(user_id)
+        return True
\ No newline at end of file
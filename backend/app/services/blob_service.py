@@ -0,0 +1,110 @@
+import uuid
+from sqlalchemy.exc import IntegrityError
+from app.app import db
+from app.models.blob import Blob
+from app.models.document import Document
+from app.models.order import Order
+from app.models.storage_deletion import StorageDeletion
+from app.services.storage import get_storage
+from app.utils.exceptions import UploadConflict
+
+def blob_key(sha256):
+    """Content-addressed storage key, fanned out over two directory levels"""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+def upload_key():
+    """Temporary key an upload is streamed to before its hash is known"""
+    return f"tmp/{uuid.uuid4().hex}"
+
+class BlobService:
+    """
+    Reference-counted, content-addressed file storage.
+
+    Reference counts change with single UPDATE statements. Dropping the last
+    reference deletes the row and queues the object in the storage deletion
+    outbox (see StorageDeletionService); storing new content removes any
+    queued deletion of its key, so content uploaded again is never swept.
+    """
+
+    # Inserts retried when the blob row is created and released by other uploads meanwhile
+    STORE_ATTEMPTS = 3
+
+    @staticmethod
+    def find_owned(sha256, user_id):
+        """Blob with this hash that the user already uploaded, so the upload can be skipped"""
+        return (Blob.query
+            .join(Document, Document.blob_id == Blob.id)
+            .join(Order, Order.id == Document.order_id)
+            .filter(Blob.sha256 == sha256, Order.user_id == user_id)
+            .first())
+
+    @staticmethod
+    def add_reference(sha256):
+        """Increments the reference count of an existing blob; returns it, or None if there is none"""
+        updated = Blob.query.filter_by(sha256=sha256).update(
+            {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+        )
+        if not updated:
+            return None
+        return Blob.query.filter_by(sha256=sha256).populate_existing().one()
+
+    @staticmethod
+    def store(stored, keep_upload=False):
+        """
+        Takes a reference to the blob for an upload streamed to a temporary key
+        (see upload_key). Known content is detected from the hash and the
+        uploaded copy is discarded; new content is moved to its blob key.
+        With keep_upload=True the uploaded copy is left in place (new content
+        is copied) for callers that delete it once they have committed.
+        Raises UploadConflict if the blob keeps being created and deleted by
+        concurrent requests. The caller commits.
+        """
+        storage = get_storage()
+        for _ in range(BlobService.STORE_ATTEMPTS):
+            blob = BlobService.add_reference(stored.sha256)
+            if blob is not None:
+                if not keep_upload:
+                    storage.delete(stored.key)
+                return blob
+
+            blob = Blob(
+                sha256=stored.sha256,
+                storage_key=blob_key(stored.sha256),
+                size=stored.size,
+                content_type=stored.content_type,
+                ref_count=1
+            )
+            try:
+                with db.session.begin_nested():
+                    db.session.add(blob)
+            except IntegrityError:
+                # Another upload created the blob meanwhile; reference it on the
+                # next attempt, or insert again if its last reference is gone by then
+                continue
+            # Cancel a pending deletion of the same content. The sweeper deletes
+            # objects while holding their outbox rows, so this waits for a running
+            # deletion and the content is moved into place after it
+            StorageDeletion.query.filter_by(storage_key=blob.storage_key).delete(synchronize_session=False)
+            if keep_upload:
+                storage.copy(stored.key, blob.storage_key)
+            else:
+                storage.move(stored.key, blob.storage_key)
+            return blob
+        raise UploadConflict()
+
+    @staticmethod
+    def release(blob_id):
+        """
+        Drops a reference; the last one deletes the blob row and queues its
+        content for deletion. The caller commits. Returns True if the blob
+        was deleted.
+        """
+        blob = Blob.query.filter_by(id=blob_id).with_for_update().populate_existing().first()
+        if blob is None:
+            return False
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return False
+        db.session.delete(blob)
+        db.session.add(StorageDeletion(storage_key=blob.storage_key))
+        return True
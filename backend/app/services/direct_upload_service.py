@@ -0,0 +1,83 @@
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.utils import secure_filename
+from app.config import Config
+from app.services.blob_service import upload_key
+from app.services.document_service import DocumentService
+from app.services.storage import S3Storage, get_storage
+from app.utils.exceptions import APIError, FileTooLarge
+
+def _serializer():
+    return URLSafeTimedSerializer(Config.SECRET_KEY, salt='direct-document-upload')
+
+class DirectUploadService:
+    """
+    Two-step uploads that send the file straight to storage.
+
+    The upload URL comes with a signed token describing the upload (order,
+    user, temporary key, declared size and hash), so no state is kept on
+    the server until the client calls complete_upload.
+    """
+
+    @staticmethod
+    def create_upload(order_id, user_id, filename, size, local_upload_url, sha256=None, content_type=None):
+        if size > Config.MAX_UPLOAD_SIZE:
+            raise FileTooLarge()
+        sha256 = sha256.lower() if sha256 else None
+        key = upload_key()
+        token = _serializer().dumps({
+            'order_id': order_id,
+            'user_id': user_id,
+            'key': key,
+            'filename': secure_filename(filename),
+            'size': size,
+            'sha256': sha256,
+            'content_type': content_type
+        })
+        storage = get_storage()
+        if isinstance(storage, S3Storage):
+            url, headers = storage.presigned_put(key, Config.UPLOAD_URL_EXPIRES, content_type, sha256)
+        else:
+            url, headers = local_upload_url(token), {}
+        return {
+            'upload_token': token,
+            'upload_url': url,
+            'method': 'PUT',
+            'headers': headers,
+            'expires_in': Config.UPLOAD_URL_EXPIRES
+        }
+
+    @staticmethod
+    def _load(token, max_age):
+        try:
+            return _serializer().loads(token, max_age=max_age)
+        except SignatureExpired:
+            raise APIError("The upload token has expired", 410)
+        except BadSignature:
+            raise APIError("Invalid upload token", 400)
+
+    @staticmethod
+    def receive_local(token, stream, content_length=None):
+        """Target of the signed upload URL when documents are stored on the local filesystem"""
+        if isinstance(get_storage(), S3Storage):
+            raise APIError("Direct uploads go to S3", 404)
+        upload = DirectUploadService._load(token, Config.UPLOAD_URL_EXPIRES)
+        if content_length is not None and content_length > upload['size']:
+            raise FileTooLarge("The file is larger than the size declared for this upload")
+        get_storage().save_stream(upload['key'], stream, upload['filename'], upload['content_type'])
+
+    @staticmethod
+    def complete_upload(token, order_id, user_id):
+        """Verifies the uploaded object against the declared size and hash and creates the document"""
+        # An upload started just before its URL expired may finish well after that
+        upload = DirectUploadService._load(token, Config.UPLOAD_URL_EXPIRES * 2)
+        if upload['order_id'] != order_id or upload['user_id'] != user_id:
+            raise APIError("The upload token was issued for another order", 403)
+
+        storage = get_storage()
+        stored = storage.inspect(upload['key'], upload['filename'], upload['content_type'], upload['sha256'])
+        if stored is None:
+            raise APIError("The file has not been uploaded", 409)
+        if stored.size != upload['size'] or (upload['sha256'] and stored.sha256 != upload['sha256']):
+            storage.delete(upload['key'])
+            raise APIError("The uploaded file does not match the declared size or SHA-256", 422)
+        return DocumentService.create_from_upload(order_id, upload['filename'], stored)
\ No newline at end of file
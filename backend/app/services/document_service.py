@@ -1,55 +1,111 @@
 import os
-import boto3
 from werkzeug.utils import secure_filename
 from app.app import db
-from app.models.document import Document
 from app.config import Config
+from app.models.document import Document
+from app.models.storage_deletion import StorageDeletion
+from app.services.blob_service import BlobService, upload_key
+from app.services.storage import S3Storage, get_storage
+from app.utils.identity import resolve_identity
 
 class DocumentService:
     @staticmethod
     def get_document(document_id):
         return Document.query.get(document_id)
 
+    @staticmethod
+    def user_can_access(document, user_id):
+        """The order's owner, operators and admins can access a document"""
+        if document.order.user_id == user_id:
+            return True
+        identity = resolve_identity(user_id)
+        return identity is not None and identity.role in ('operator', 'admin')
+
+    @staticmethod
+    def content_location(document, as_attachment=False):
+        """
+        Where to read the document content from: ('url', presigned S3 URL)
+        or ('path', local file path); None if the file is missing.
+        """
+        storage = get_storage()
+        key = storage.key_for(document.file_path)
+        if isinstance(storage, S3Storage):
+            return 'url', storage.presigned_get(
+                key, Config.DOWNLOAD_URL_EXPIRES, document.filename, document.file_type, as_attachment
+            )
+        path = storage.path(key)
+        return ('path', path) if os.path.isfile(path) else None
+
     @staticmethod
     def delete_document(document_id):
         document = Document.query.get(document_id)
         if document:
-            # Delete from storage
-            if Config.AWS_S3_BUCKET_NAME:
-                s3 = boto3.client(
-                    's3',
-                    aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY
-                )
-                s3.delete_object(Bucket=Config.AWS_S3_BUCKET_NAME, Key=document.file_path)
-            else:
-                if os.path.exists(document.file_path):
-                    os.remove(document.file_path)
-
+            blob_id = document.blob_id
             db.session.delete(document)
+            db.session.flush()
+            if blob_id is not None:
+                # Shared content is only deleted with its last document
+                BlobService.release(blob_id)
+            else:
+                db.session.add(StorageDeletion(storage_key=get_storage().key_for(document.file_path)))
+            # The object itself is removed by the storage sweeper (flask storage-sweeper)
             db.session.commit()
             return True
         return False
 
     @staticmethod
     def upload_document(file, order_id):
-        filename = secure_filename(file.filename)
-        if Config.AWS_S3_BUCKET_NAME:
-            s3 = boto3.client(
-                's3',
-                aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY
-            )
-            s3_key = f"orders/{order_id}/{filename}"
-            s3.upload_fileobj(file, Config.AWS_S3_BUCKET_NAME, s3_key)
-            file_path = f"s3://{Config.AWS_S3_BUCKET_NAME}/{s3_key}"
-        else:
-            upload_folder = os.path.join(Config.UPLOAD_FOLDER, str(order_id))
-            os.makedirs(upload_folder, exist_ok=True)
-            file_path = os.path.join(upload_folder, filename)
-            file.save(file_path)
+        return DocumentService.upload_stream(file.stream, order_id, file.filename, file.mimetype)
+
+    @staticmethod
+    def upload_stream(stream, order_id, filename, content_type=None):
+        """Streams an upload into storage, hashing and sniffing its type on the way; known content is stored once"""
+        filename = secure_filename(filename)
+        stored = get_storage().save_stream(upload_key(), stream, filename, content_type)
+        return DocumentService.create_from_upload(order_id, filename, stored)
+
+    @staticmethod
+    def create_from_upload(order_id, filename, stored, keep_upload=False):
+        """
+        Creates a document for content uploaded to a temporary key (see
+        blob_service.upload_key). With keep_upload=True the uploaded object is
+        left in place and the caller commits, then deletes it.
+        """
+        try:
+            blob = BlobService.store(stored, keep_upload)
+        except Exception:
+            db.session.rollback()
+            if not keep_upload:
+                get_storage().delete(stored.key)
+            raise
+        return DocumentService._create_document(order_id, filename, blob, commit=not keep_upload)
 
-        document = Document(order_id=order_id, filename=filename, file_path=file_path, file_type=file.mimetype)
+    @staticmethod
+    def attach_existing(order_id, filename, sha256, user_id):
+        """
+        Creates a document for content the user has uploaded before, without
+        receiving it again. Returns None when the content is unknown (or only
+        uploaded by other users - a hash alone does not grant access to it).
+        """
+        blob = BlobService.find_owned(sha256.lower(), user_id)
+        if blob is None or BlobService.add_reference(blob.sha256) is None:
+            return None
+        return DocumentService._create_document(order_id, secure_filename(filename), blob)
+
+    @staticmethod
+    def _create_document(order_id, filename, blob, commit=True):
+        document = Document(
+            order_id=order_id,
+            blob_id=blob.id,
+            filename=filename,
+            file_path=get_storage().location(blob.storage_key),
+            file_type=blob.content_type,
+            size=blob.size,
+            sha256=blob.sha256
+        )
         db.session.add(document)
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
         return document
\ No newline at end of file
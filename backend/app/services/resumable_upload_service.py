@@ -0,0 +1,215 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.utils import secure_filename
+from app.app import db
+from app.config import Config
+from app.models.upload_session import UploadSession
+from app.services.blob_service import upload_key
+from app.services.document_service import DocumentService
+from app.services.storage import S3Storage, get_storage, is_not_found
+from app.utils.exceptions import APIError, FileTooLarge, FileUploadError
+
+class _ChunkStream:
+    """
+    Request body of a PATCH, limited to the bytes the upload still expects.
+    A dropped connection ends the stream instead of failing the request, so
+    whatever arrived is kept and the client resumes from there.
+    """
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+        self.disconnected = False
+
+    def read(self, size):
+        if self.remaining <= 0 or self.disconnected:
+            return b''
+        try:
+            chunk = self.stream.read(min(size, self.remaining))
+        except (ClientDisconnected, OSError):
+            self.disconnected = True
+            return b''
+        self.remaining -= len(chunk)
+        return chunk
+
+class ResumableUploadService:
+    """
+    tus-style resumable uploads (https://tus.io, core protocol with the
+    creation and termination extensions).
+
+    Chunks are written straight to storage - appended to a file locally,
+    or as parts of an S3 multipart upload - and the stored offset is kept in
+    `upload_session`, so any worker can accept the next chunk. The session
+    row is locked while a chunk is written, which rejects concurrent PATCH
+    requests for the same upload.
+
+    Once the last byte is stored the upload is 'finalizing': the stored
+    offset stays below the length and the assembled object stays at its
+    temporary key until the document is committed. A finalization that fails
+    marks the upload 'failed'; the client's retry of the last chunk (at the
+    offset it gets from HEAD) then runs the finalization again instead of
+    writing the chunk.
+    """
+
+    @staticmethod
+    def create(order_id, user_id, length, filename, content_type=None):
+        if length <= 0:
+            raise APIError("Upload-Length must be a positive number of bytes", 400)
+        if length > Config.MAX_UPLOAD_SIZE:
+            raise FileTooLarge()
+        storage = get_storage()
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            order_id=order_id,
+            user_id=user_id,
+            filename=secure_filename(filename or 'upload'),
+            content_type=content_type,
+            length=length,
+            offset=0,
+            storage_key=upload_key(),
+            expires_at=datetime.utcnow() + timedelta(seconds=Config.RESUMABLE_UPLOAD_EXPIRES)
+        )
+        if isinstance(storage, S3Storage):
+            session.multipart_upload_id = storage.start_multipart(session.storage_key, content_type)
+            session.parts = '[]'
+        db.session.add(session)
+        db.session.commit()
+        return session
+
+    @staticmethod
+    def get(upload_id, user_id, lock=False):
+        query = UploadSession.query.filter_by(id=upload_id)
+        if lock:
+            query = query.with_for_update(nowait=True)
+        try:
+            session = query.first()
+        except OperationalError:
+            db.session.rollback()
+            raise APIError("Another request is writing to this upload", 423)
+        if session is None or session.user_id != user_id:
+            raise APIError("Upload not found", 404)
+        expired = session.status in UploadSession.ACTIVE_STATUSES and session.expires_at < datetime.utcnow()
+        if session.status == 'aborted' or expired:
+            raise APIError("Upload expired or was terminated", 410)
+        return session
+
+    @staticmethod
+    def append(upload_id, user_id, offset, stream, content_length=None):
+        """
+        Stores a chunk starting at `offset` (which must match the stored
+        offset) and returns the session. The last chunk creates the document.
+        """
+        session = ResumableUploadService.get(upload_id, user_id, lock=True)
+        try:
+            if session.status == 'completed':
+                raise APIError("Upload is already complete", 409)
+            if offset != session.offset:
+                raise APIError(f"Upload-Offset {offset} does not match the current offset {session.offset}", 409)
+            remaining = session.length - session.offset
+            if session.status == 'uploading' and content_length is not None and content_length > remaining:
+                raise APIError("The chunk exceeds the declared Upload-Length", 413)
+        except APIError:
+            db.session.rollback()
+            raise
+        if session.status != 'uploading':
+            # Every byte is stored already; the resent last chunk retries the finalization
+            ResumableUploadService._finish(session)
+            return session
+
+        chunk = _ChunkStream(stream, remaining)
+        storage = get_storage()
+        stale_pending_key = None
+        if isinstance(storage, S3Storage):
+            parts, pending_key, received = storage.append_multipart(
+                session.storage_key, session.multipart_upload_id, json.loads(session.parts or '[]'),
+                session.pending_key, chunk, remaining
+            )
+            stale_pending_key = session.pending_key
+            session.parts = json.dumps(parts)
+            session.pending_key = pending_key
+        else:
+            received = storage.write_at(session.storage_key, session.offset, chunk)
+        if received < remaining:
+            session.offset += received
+        else:
+            session.status = 'finalizing'
+        db.session.commit()
+        if stale_pending_key:
+            storage.delete(stale_pending_key)
+
+        if session.status == 'finalizing':
+            session = ResumableUploadService.get(upload_id, user_id, lock=True)
+            if session.status != 'completed':
+                ResumableUploadService._finish(session)
+        return session
+
+    @staticmethod
+    def _finish(session):
+        """
+        Assembles the upload and creates its document; the caller holds the
+        session lock. Every step can run again after a failure or a crash:
+        the multipart upload is only completed while its object does not exist
+        yet, and the uploaded object is deleted once the document is committed.
+        """
+        storage = get_storage()
+        try:
+            # The temporary key is unique to the upload, so an object there means it was completed before
+            if session.multipart_upload_id and not storage.exists(session.storage_key):
+                storage.complete_multipart(session.storage_key, session.multipart_upload_id, json.loads(session.parts))
+            stored = storage.inspect(session.storage_key, session.filename, session.content_type)
+            if stored is None or stored.size != session.length:
+                raise APIError("The uploaded content is incomplete", 500)
+            document = DocumentService.create_from_upload(session.order_id, session.filename, stored, keep_upload=True)
+            session.status = 'completed'
+            session.offset = session.length
+            session.document_id = document.id
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if session.status in ('finalizing', 'failed'):
+                session.status = 'failed'
+                db.session.commit()
+            if isinstance(e, APIError):
+                raise
+            raise FileUploadError("Finalizing the upload failed; send the last chunk again to retry") from e
+        storage.delete(session.storage_key) # The content now lives under its blob key
+
+    @staticmethod
+    def terminate(upload_id, user_id):
+        session = ResumableUploadService.get(upload_id, user_id, lock=True)
+        if session.status == 'completed':
+            db.session.rollback()
+            raise APIError("Upload is already complete", 409)
+        ResumableUploadService._discard(session)
+        db.session.commit()
+
+    @staticmethod
+    def _discard(session):
+        storage = get_storage()
+        if session.multipart_upload_id:
+            try:
+                storage.abort_multipart(session.storage_key, session.multipart_upload_id)
+            except Exception as e:
+                if not is_not_found(e): # Completed by a finalization that failed later
+                    raise
+            if session.pending_key:
+                storage.delete(session.pending_key)
+        storage.delete(session.storage_key)
+        session.status = 'aborted'
+
+    @staticmethod
+    def abort_expired(limit=100):
+        """Discards the stored chunks of expired uploads; returns how many were aborted"""
+        sessions = (UploadSession.query
+            .filter(UploadSession.status.in_(UploadSession.ACTIVE_STATUSES), UploadSession.expires_at < datetime.utcnow())
+            .order_by(UploadSession.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all())
+        for session in sessions:
+            ResumableUploadService._discard(session)
+        db.session.commit()
+        return len(sessions)
@@ -0,0 +1,545 @@
+"""
+Streaming document storage (local filesystem or S3).
+
+Uploads are read from a file-like stream in fixed-size chunks. Every chunk
+passes through an UploadInspector that computes the SHA-256, counts the
+size (enforcing MAX_UPLOAD_SIZE) and sniffs the MIME type from the first
+bytes, so nothing is buffered beyond a chunk (local) or the parts in
+flight (S3).
+
+Each process holds one backend (get_storage) and, for S3, one lazily
+created client with a connection pool sized by S3_MAX_POOL_CONNECTIONS,
+retries and timeouts. boto3 clients are thread-safe, so every request
+thread and multipart upload shares it; a forked process creates its own.
+The `a*` methods run the blocking calls on a bounded thread pool
+(STORAGE_IO_THREADS) for use from async code.
+"""
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import namedtuple
+from urllib.parse import quote
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from app.config import Config
+from app.utils.exceptions import FileTooLarge
+
+# Result of a stored upload; location is what Document.file_path holds
+StoredObject = namedtuple('StoredObject', ['key', 'location', 'size', 'sha256', 'content_type'])
+
+# Magic numbers of the document types we receive
+_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'), # OLE2 (.doc, .xls)
+    (b'{\\rtf', 'application/rtf'),
+    (b'PK\x03\x04', 'application/zip'), # Also .docx/.xlsx/.odt, refined by extension
+]
+SNIFF_BYTES = 512
+
+def sniff_content_type(head, filename=None, declared=None):
+    """MIME type from the first bytes of a file; falls back to the extension and the client's type"""
+    guessed = mimetypes.guess_type(filename)[0] if filename else None
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            if content_type in ('application/zip', 'application/msword') and guessed:
+                return guessed # Office formats are ZIP/OLE2 containers
+            return content_type
+    if head and b'\x00' not in head:
+        try:
+            head.decode('utf-8')
+        except UnicodeDecodeError as e:
+            if e.start < len(head) - 3: # A multi-byte character cut at the end of the sample is fine
+                return guessed or declared or 'application/octet-stream'
+        return guessed if guessed and guessed.startswith('text/') else 'text/plain'
+    return guessed or declared or 'application/octet-stream'
+
+class UploadInspector:
+    """Hashes, measures and sniffs an upload while it streams through"""
+
+    def __init__(self, filename=None, declared_type=None, max_size=None):
+        self.filename = filename
+        self.declared_type = declared_type
+        self.max_size = Config.MAX_UPLOAD_SIZE if max_size is None else max_size
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self._head = b''
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        if self.max_size and self.size > self.max_size:
+            raise FileTooLarge()
+        if len(self._head) < SNIFF_BYTES:
+            self._head += chunk[:SNIFF_BYTES - len(self._head)]
+        self.sha256.update(chunk)
+
+    def chunks(self, stream, chunk_size=None):
+        chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            self.update(chunk)
+            yield chunk
+
+    @property
+    def content_type(self):
+        return sniff_content_type(self._head, self.filename, self.declared_type)
+
+    def result(self, key, location):
+        return StoredObject(key, location, self.size, self.sha256.hexdigest(), self.content_type)
+
+def inspect_stream(key, location, stream, filename=None, content_type=None):
+    """Size, SHA-256 and type of stored content, read back in chunks"""
+    inspector = UploadInspector(filename, content_type, max_size=0)
+    try:
+        for _ in inspector.chunks(stream):
+            pass
+    finally:
+        stream.close()
+    return inspector.result(key, location)
+
+def is_not_found(error):
+    """True for a missing local file, S3 object or S3 multipart upload"""
+    if isinstance(error, FileNotFoundError):
+        return True
+    response = getattr(error, 'response', None) # botocore ClientError
+    return bool(response) and response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound', 'NoSuchUpload')
+
+class _ProcessLocal:
+    """Lazily created, thread-safe per-process value (recreated after a fork)"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self.factory()
+                    self._pid = os.getpid()
+        return self._value
+
+_io_pool = _ProcessLocal(lambda: ThreadPoolExecutor(
+    max_workers=Config.STORAGE_IO_THREADS, thread_name_prefix='storage-io'
+))
+
+class StorageBackend:
+    """Async-friendly wrappers shared by the storage backends"""
+
+    def submit(self, method, *args, **kwargs):
+        """Runs a blocking storage method on the I/O pool; returns a concurrent.futures.Future"""
+        return _io_pool.get().submit(getattr(self, method), *args, **kwargs)
+
+    async def run_async(self, method, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(method, *args, **kwargs))
+
+    async def asave_stream(self, key, stream, filename=None, content_type=None):
+        return await self.run_async('save_stream', key, stream, filename, content_type)
+
+    async def ainspect(self, key, filename=None, content_type=None, sha256=None):
+        return await self.run_async('inspect', key, filename, content_type, sha256)
+
+    async def aexists(self, key):
+        return await self.run_async('exists', key)
+
+    async def amove(self, source_key, key):
+        return await self.run_async('move', source_key, key)
+
+    async def adelete(self, key):
+        return await self.run_async('delete', key)
+
+    async def adelete_many(self, keys):
+        return await self.run_async('delete_many', list(keys))
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Storage key outside the storage root: {key}")
+        return path
+
+    def location(self, key):
+        return self.path(key)
+
+    def key_for(self, location):
+        return os.path.relpath(os.path.abspath(location), self.root)
+
+    def save_stream(self, key, stream, filename=None, content_type=None):
+        """Writes to a temporary file next to the target and renames it into place once complete"""
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        inspector = UploadInspector(filename, content_type)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in inspector.chunks(stream):
+                    tmp.write(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, path) # Atomic: readers never see a partial file
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return inspector.result(key, path)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def write_at(self, key, offset, stream):
+        """
+        Writes a stream into a file at `offset` (resumable uploads) and
+        returns the number of bytes written. Anything past the offset - left
+        by an interrupted write that was never recorded - is discarded first.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            if os.fstat(f.fileno()).st_size < offset:
+                raise ValueError(f"Cannot write {key} at offset {offset}: bytes are missing")
+            f.truncate(offset)
+            f.seek(offset)
+            written = 0
+            for chunk in iter(lambda: stream.read(Config.UPLOAD_CHUNK_SIZE), b''):
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return written
+
+    def inspect(self, key, filename=None, content_type=None, sha256=None):
+        """StoredObject for content already in storage, or None if there is no such object"""
+        try:
+            stream = self.open(key)
+        except FileNotFoundError:
+            return None
+        return inspect_stream(key, self.location(key), stream, filename, content_type)
+
+    def move(self, source_key, key):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.path(source_key), path)
+
+    def copy(self, source_key, key):
+        """Hard-links the file to the new key (copies it across filesystems), then renames it into place"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f'.copy-{uuid.uuid4().hex}')
+        try:
+            try:
+                os.link(self.path(source_key), tmp_path)
+            except FileNotFoundError:
+                raise
+            except OSError: # Another filesystem, or no hard link support
+                shutil.copyfile(self.path(source_key), tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_many(self, keys):
+        """Deletes objects; returns {key: error} for the ones that could not be deleted"""
+        errors = {}
+        for key in keys:
+            try:
+                self.delete(key)
+            except (OSError, ValueError) as e:
+                errors[key] = str(e)
+        return errors
+
+    def list_keys(self):
+        """Yields (key, last modified timestamp) of every stored file"""
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    modified = os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root), modified
+
+def create_s3_client():
+    """S3 client with the configured connection pool, retries and timeouts"""
+    import boto3
+    from botocore.config import Config as BotoConfig
+    # A private session: the default boto3 session is not thread-safe
+    return boto3.session.Session().client(
+        's3',
+        aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+        endpoint_url=Config.AWS_S3_ENDPOINT_URL,
+        config=BotoConfig(
+            max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=Config.S3_CONNECT_TIMEOUT,
+            read_timeout=Config.S3_READ_TIMEOUT,
+            retries={'max_attempts': Config.S3_MAX_ATTEMPTS, 'mode': 'standard'},
+            tcp_keepalive=True
+        )
+    )
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket, part_size=None, concurrency=None):
+        self.bucket = bucket
+        # S3 rejects multipart parts below 5 MiB (except the last one)
+        self.part_size = max(part_size or Config.S3_MULTIPART_PART_SIZE, 5 * 1024 * 1024)
+        self.concurrency = concurrency or Config.S3_MULTIPART_CONCURRENCY
+        self._client = _ProcessLocal(create_s3_client)
+        # Shared by all multipart uploads; each upload keeps at most `concurrency` parts in flight
+        self._part_pool = _ProcessLocal(lambda: ThreadPoolExecutor(
+            max_workers=Config.S3_MAX_POOL_CONNECTIONS, thread_name_prefix='s3-parts'
+        ))
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    def location(self, key):
+        return f"s3://{self.bucket}/{key}"
+
+    def key_for(self, location):
+        prefix = f"s3://{self.bucket}/"
+        return location[len(prefix):] if location.startswith(prefix) else location
+
+    def _read_part(self, inspector, stream):
+        # Parts are assembled from upload chunks so only part_size bytes per part are held
+        parts = []
+        size = 0
+        for chunk in inspector.chunks(stream):
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= self.part_size:
+                break
+        return b''.join(parts)
+
+    def save_stream(self, key, stream, filename=None, content_type=None):
+        """
+        Uploads in parts of S3_MULTIPART_PART_SIZE, S3_MULTIPART_CONCURRENCY
+        at a time; reading pauses while that many parts are in flight, which
+        bounds memory to roughly part_size * (concurrency + 1). Files that
+        fit in one part are sent with a single PutObject.
+        """
+        inspector = UploadInspector(filename, content_type)
+        first = self._read_part(inspector, stream)
+        if len(first) < self.part_size:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=first, ContentType=inspector.content_type)
+            return inspector.result(key, self.location(key))
+
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=inspector.content_type
+        )['UploadId']
+        try:
+            parts = self._upload_parts(key, upload_id, inspector, stream, first)
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+            )
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        return inspector.result(key, self.location(key))
+
+    def _upload_parts(self, key, upload_id, inspector, stream, first):
+        def upload_part(number, body):
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            return {'PartNumber': number, 'ETag': response['ETag']}
+
+        parts = []
+        in_flight = set()
+        pool = self._part_pool.get()
+        try:
+            number, body = 1, first
+            while body:
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    parts.extend(future.result() for future in done)
+                in_flight.add(pool.submit(upload_part, number, body))
+                number, body = number + 1, self._read_part(inspector, stream)
+            parts.extend(future.result() for future in in_flight)
+        finally:
+            wait(in_flight) # The upload is only aborted once no part is being sent
+        return sorted(parts, key=lambda part: part['PartNumber'])
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if is_not_found(e):
+                return False
+            raise
+        return True
+
+    def open(self, key, byte_range=None):
+        params = {'Bucket': self.bucket, 'Key': key}
+        if byte_range:
+            params['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        return self.client.get_object(**params)['Body']
+
+    def inspect(self, key, filename=None, content_type=None, sha256=None):
+        """
+        StoredObject for an uploaded object, or None if there is no such object.
+        When the object carries a full-object SHA-256 checksum that S3 verified
+        on upload (see presigned_put) only the first bytes are read to sniff
+        the type; otherwise the object is streamed to hash it.
+        """
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key, ChecksumMode='ENABLED')
+        except Exception as e:
+            if is_not_found(e):
+                return None
+            raise
+        checksum = head.get('ChecksumSHA256')
+        if sha256 and checksum and '-' not in checksum: # "-N" marks a checksum of multipart checksums
+            if base64.b64decode(checksum).hex() == sha256.lower():
+                size = head['ContentLength']
+                sample = self.open(key, (0, SNIFF_BYTES - 1)).read() if size else b''
+                return StoredObject(key, self.location(key), size, sha256.lower(), sniff_content_type(sample, filename, content_type))
+        return inspect_stream(key, self.location(key), self.open(key), filename, content_type)
+
+    def start_multipart(self, key, content_type=None):
+        params = {'Bucket': self.bucket, 'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        return self.client.create_multipart_upload(**params)['UploadId']
+
+    def append_multipart(self, key, upload_id, parts, pending_key, stream, remaining):
+        """
+        Appends a stream to a multipart upload (resumable uploads). Bytes that
+        do not fill a whole part are stored as a separate "pending" object and
+        sent ahead of the next append, since every part but the last must be
+        at least 5 MiB. The upload is complete when `remaining` bytes arrive;
+        the remainder is then sent as the last part.
+
+        Returns (parts, pending_key, bytes_read). The pending object gets a new
+        key on every append so the previously recorded state stays valid until
+        the caller commits the new one; the caller deletes the old object.
+        """
+        parts = list(parts)
+        buffer = bytearray(self.open(pending_key).read() if pending_key else b'')
+        read = 0
+
+        def upload_part(body):
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=len(parts) + 1, Body=bytes(body)
+            )
+            parts.append({'PartNumber': len(parts) + 1, 'ETag': response['ETag']})
+
+        for chunk in iter(lambda: stream.read(Config.UPLOAD_CHUNK_SIZE), b''):
+            read += len(chunk)
+            buffer += chunk
+            while len(buffer) >= self.part_size:
+                upload_part(buffer[:self.part_size])
+                del buffer[:self.part_size]
+
+        if buffer and read >= remaining:
+            upload_part(buffer)
+            buffer.clear()
+        new_pending_key = None
+        if buffer:
+            new_pending_key = f"{key}.pending-{uuid.uuid4().hex}"
+            self.client.put_object(Bucket=self.bucket, Key=new_pending_key, Body=bytes(buffer))
+        return parts, new_pending_key, read
+
+    def complete_multipart(self, key, upload_id, parts):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+        )
+
+    def abort_multipart(self, key, upload_id):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def presigned_get(self, key, expires_in, filename=None, content_type=None, as_attachment=False):
+        """Presigned GetObject URL; S3 serves Range requests and conditional GETs itself"""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if filename:
+            disposition = 'attachment' if as_attachment else 'inline'
+            params['ResponseContentDisposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        if content_type:
+            params['ResponseContentType'] = content_type
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+    def presigned_put(self, key, expires_in, content_type=None, sha256=None):
+        """
+        Presigned PutObject URL and the headers the client must send with it.
+        With a SHA-256 the checksum is part of the signature and S3 rejects
+        content that does not match it.
+        """
+        params = {'Bucket': self.bucket, 'Key': key}
+        headers = {}
+        if content_type:
+            params['ContentType'] = headers['Content-Type'] = content_type
+        if sha256:
+            checksum = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+            params['ChecksumSHA256'] = headers['x-amz-checksum-sha256'] = checksum
+        url = self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=expires_in)
+        return url, headers
+
+    def copy(self, source_key, key):
+        # Server-side copy (multipart for large objects); no bytes pass through the app
+        self.client.copy({'Bucket': self.bucket, 'Key': source_key}, self.bucket, key)
+
+    def move(self, source_key, key):
+        self.copy(source_key, key)
+        self.client.delete_object(Bucket=self.bucket, Key=source_key)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys):
+        """DeleteObjects in batches of 1000; returns {key: error} for the ones that failed"""
+        keys = list(keys)
+        errors = {}
+        for start in range(0, len(keys), 1000):
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                errors[error['Key']] = f"{error.get('Code')}: {error.get('Message')}"
+        return errors
+
+    def list_keys(self):
+        """Yields (key, last modified timestamp) of every object in the bucket"""
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket):
+            for item in page.get('Contents', []):
+                yield item['Key'], item['LastModified'].timestamp()
+
+def create_storage():
+    """Storage backend for the configuration: S3 when AWS_S3_BUCKET_NAME is set, local otherwise"""
+    if Config.AWS_S3_BUCKET_NAME:
+        return S3Storage(Config.AWS_S3_BUCKET_NAME)
+    return LocalStorage(Config.UPLOAD_FOLDER)
+
+_storage = _ProcessLocal(create_storage)
+
+def get_storage():
+    """The process-wide storage backend"""
+    return _storage.get()
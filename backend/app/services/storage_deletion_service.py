@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timedelta
+from app.app import db
+from app.config import Config
+from app.models.blob import Blob
+from app.models.document import Document
+from app.models.storage_deletion import StorageDeletion
+from app.models.upload_session import UploadSession
+from app.services.storage import get_storage
+
+class StorageDeletionService:
+    """
+    Deletes storage objects queued in the `storage_deletion` outbox.
+
+    Requests only delete rows and enqueue the object key in the same
+    transaction, so a crash can no longer leave a row without its file or a
+    file without its row. The sweeper removes the queued objects in batches
+    (one DeleteObjects call per 1000 keys on S3) and the orphan scan queues
+    objects that no row references at all.
+    """
+
+    @staticmethod
+    def enqueue(keys):
+        for key in keys:
+            db.session.add(StorageDeletion(storage_key=key))
+
+    @staticmethod
+    def _legacy_keys():
+        """
+        Storage keys of documents stored before deduplication. Those have no
+        blob and store their own path, which can be relative to the working
+        directory (uploads/5/ruling.pdf), so the paths are read once and
+        converted to storage keys here rather than compared in SQL.
+        """
+        storage = get_storage()
+        paths = db.session.query(Document.file_path).filter(Document.blob_id.is_(None)).yield_per(1000)
+        return {storage.key_for(path) for (path,) in paths}
+
+    @staticmethod
+    def _referenced(keys, legacy_keys=None):
+        """
+        Keys among `keys` that are still referenced by a blob, a document or an
+        active upload. `legacy_keys` (see _legacy_keys) is read when not given.
+        """
+        keys = list(keys)
+        if not keys:
+            return set()
+        referenced = {key for (key,) in db.session.query(Blob.storage_key).filter(Blob.storage_key.in_(keys))}
+        # Documents with a blob are covered by it
+        if legacy_keys is None:
+            legacy_keys = StorageDeletionService._legacy_keys()
+        referenced.update(legacy_keys.intersection(keys))
+        for column in (UploadSession.storage_key, UploadSession.pending_key):
+            referenced.update(
+                key for (key,) in
+                db.session.query(column)
+                .filter(column.in_(keys), UploadSession.status.in_(UploadSession.ACTIVE_STATUSES))
+            )
+        return referenced
+
+    @staticmethod
+    def sweep_batch(batch_size=1000):
+        """
+        Deletes one batch of queued objects; returns the number of outbox rows
+        processed. Rows are claimed with FOR UPDATE SKIP LOCKED and the objects
+        are deleted while the rows are locked, so several sweepers can run and
+        an upload of the same content waits for the deletion (see BlobService.store).
+        """
+        entries = (StorageDeletion.query
+            .filter(StorageDeletion.not_before <= datetime.utcnow())
+            .order_by(StorageDeletion.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all())
+        if not entries:
+            db.session.commit()
+            return 0
+
+        # A key can be referenced again (legacy rows, re-uploaded content); those are kept
+        referenced = StorageDeletionService._referenced({entry.storage_key for entry in entries})
+        keys = {entry.storage_key for entry in entries if entry.storage_key not in referenced}
+        errors = get_storage().delete_many(keys) if keys else {}
+
+        for entry in entries:
+            error = errors.get(entry.storage_key)
+            if error is None:
+                db.session.delete(entry)
+                continue
+            entry.attempts += 1
+            entry.last_error = error
+            entry.not_before = datetime.utcnow() + timedelta(
+                seconds=min(Config.STORAGE_SWEEP_INTERVAL * 2 ** entry.attempts, 24 * 3600)
+            )
+        db.session.commit()
+        return len(entries)
+
+    @staticmethod
+    def sweep(batch_size=1000):
+        """Deletes queued objects until the outbox has no due entries; returns the number processed"""
+        total = 0
+        while True:
+            processed = StorageDeletionService.sweep_batch(batch_size)
+            total += processed
+            if processed < batch_size:
+                return total
+
+    @staticmethod
+    def scan_orphans(grace_seconds=None, batch_size=1000):
+        """
+        Queues stored objects that nothing references, e.g. left by a crash
+        between an upload and its commit, or by abandoned direct uploads.
+        Objects younger than the grace period may belong to an upload that
+        is still running and are skipped. Returns the number of keys queued.
+
+        Legacy document paths are read once per scan; a document added during
+        the scan is still protected, since the sweep checks references again
+        before deleting.
+        """
+        grace_seconds = Config.STORAGE_ORPHAN_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace_seconds
+        queued = 0
+        batch = []
+        legacy_keys = StorageDeletionService._legacy_keys()
+
+        def flush():
+            queued_keys = {key for (key,) in db.session.query(StorageDeletion.storage_key).filter(StorageDeletion.storage_key.in_(batch))}
+            orphans = set(batch) - StorageDeletionService._referenced(batch, legacy_keys) - queued_keys
+            StorageDeletionService.enqueue(sorted(orphans))
+            db.session.commit()
+            batch.clear()
+            return len(orphans)
+
+        for key, modified in get_storage().list_keys():
+            if modified > cutoff:
+                continue
+            batch.append(key)
+            if len(batch) >= batch_size:
+                queued += flush()
+        if batch:
+            queued += flush()
+        return queued
@@ -1,16 +1,30 @@
 from functools import wraps
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 from flask_restx import abort
-from app.models.user import User
+from app.utils.identity import resolve_identity
+
+def _current_role():
+    """
+    Returns the role of the authenticated user.
+
+    The role comes from the token's claims; the cached identity only confirms
+    that the user still exists and that the token was issued for the user's
+    current token version (bumped on role changes), so no query is needed
+    while the identity is cached. Tokens issued before the role claim existed
+    fall back to the role from the identity.
+    """
+    verify_jwt_in_request()
+    claims = get_jwt()
+    identity = resolve_identity(get_jwt_identity())
+    if not identity or claims.get('ver', 0) != identity.token_version:
+        abort(401, message="Authentication required")
+    return claims.get('role', identity.role)
 
 def admin_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user or user.role != 'admin':
+            if _current_role() != 'admin':
                 abort(403, message="Admins only access")
             return fn(*args, **kwargs)
         return decorator
@@ -20,10 +34,7 @@ def operator_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user or user.role not in ['operator', 'admin']:
+            if _current_role() not in ['operator', 'admin']:
                 abort(403, message="Operators and Admins only access")
             return fn(*args, **kwargs)
         return decorator
@@ -33,11 +44,7 @@ def user_required():
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user:
-                abort(401, message="Authentication required")
+            _current_role()
             return fn(*args, **kwargs)
         return decorator
     return wrapper
\ No newline at end of file
@@ -32,6 +32,14 @@ class FileUploadError(APIError):
     def __init__(self, message="File upload failed"):
         super().__init__(message, 500)
 
+class FileTooLarge(APIError):
+    def __init__(self, message="File exceeds the maximum upload size"):
+        super().__init__(message, 413)
+
+class UploadConflict(APIError):
+    def __init__(self, message="The same content was stored and deleted concurrently, please retry the upload"):
+        super().__init__(message, 409)
+
 class PaymentProcessingError(APIError):
     def __init__(self, message="Payment processing failed"):
         super().__init__(message, 500)
\ No newline at end of file
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from app.app import db
+from app.config import Config
+from app.models.user import User
+from app.utils.redis_client import get_redis
+
+# What the role decorators need to know about the user behind a token
+Identity = namedtuple('Identity', ['user_id', 'role', 'token_version'])
+
+
+class IdentityCache:
+    """
+    Short-lived cache of user identities (role and token version).
+
+    When REDIS_URL is configured the entries live only in Redis, shared by
+    all workers: every lookup reads Redis, so an invalidation after a role
+    change or token revocation is seen by every worker on its next request.
+    Without Redis the entries live in an in-process LRU dict; invalidation
+    then only reaches the worker that made the change, and other workers can
+    serve the old identity until their entry expires (at most ttl seconds).
+    """
+
+    def __init__(self, ttl=30, maxsize=10000, prefix='identity:', redis_client=get_redis):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.prefix = prefix
+        self._redis_client = redis_client
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        if self.ttl <= 0:
+            return None
+        client = self._redis_client()
+        if client is not None:
+            raw = client.get(f"{self.prefix}{user_id}")
+            return Identity(**json.loads(raw)) if raw is not None else None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at <= now:
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return identity
+
+    def set(self, user_id, identity):
+        if self.ttl <= 0:
+            return
+        client = self._redis_client()
+        if client is not None:
+            client.set(f"{self.prefix}{user_id}", json.dumps(identity._asdict()), ex=int(self.ttl))
+            return
+
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.ttl, identity)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._local.pop(user_id, None)
+        client = self._redis_client()
+        if client is not None:
+            client.delete(f"{self.prefix}{user_id}")
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+identity_cache = IdentityCache(
+    ttl=Config.IDENTITY_CACHE_TTL,
+    maxsize=Config.IDENTITY_CACHE_SIZE
+)
+
+
+def token_claims(user):
+    """Extra JWT claims issued at login: the role and the user's current token version"""
+    return {'role': user.role, 'ver': user.token_version or 0}
+
+
+def resolve_identity(user_id):
+    """
+    Returns the Identity for a user id from the cache, or loads it from the
+    database. Returns None if the user no longer exists.
+    """
+    identity = identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        identity_cache.invalidate(user_id)
+        return None
+    identity = Identity(user.id, user.role, user.token_version or 0)
+    identity_cache.set(user_id, identity)
+    return identity
@@ -0,0 +1,23 @@
+import threading
+from app.config import Config
+
+try:
+    import redis
+except ImportError:  # redis is optional; features fall back to the database without it
+    redis = None
+
+_client = None
+_lock = threading.Lock()
+
+def get_redis():
+    """Shared Redis client for REDIS_URL, or None when Redis is not configured"""
+    global _client
+    if not Config.REDIS_URL:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if redis is None:
+                    raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+                _client = redis.Redis.from_url(Config.REDIS_URL)
+    return _client
@@ -24,6 +24,15 @@ class DocumentUploadSchema(BaseModel):
     filename: str
     file_type: str
 
+class DocumentUploadUrlSchema(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$")
+    content_type: Optional[str] = Field(None, max_length=128)
+
+class DocumentUploadCompleteSchema(BaseModel):
+    upload_token: str
+
 class AnalysisCreateSchema(BaseModel):
     # No specific fields for analysis creation, as it's triggered by order/document
     pass
@@ -0,0 +1,124 @@
+"""
+Analysis job worker: `flask analysis-worker`.
+
+The worker claims due jobs from the `analysis_job` table, runs document
+analysis in a process pool (one job per process) and records the outcome.
+Failed jobs are retried with exponential backoff up to
+ANALYSIS_MAX_ATTEMPTS. While jobs run, the worker renews their leases and
+publishes progress reported by the pool processes. Several workers (on one
+or more hosts) can run against the same database.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.app import db
+from app.config import Config
+from app.services.analysis_service import AnalysisService
+from app.workers.document_analysis import NonRetryableError, analyze_order_documents
+
+logger = logging.getLogger(__name__)
+
+class AnalysisWorker:
+    def __init__(self, app, processes=None, poll_interval=None):
+        self.app = app
+        self.processes = processes or Config.ANALYSIS_WORKER_PROCESSES
+        self.poll_interval = poll_interval or Config.ANALYSIS_POLL_INTERVAL
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        # spawn: pool processes must not inherit the parent's database connections
+        self._context = multiprocessing.get_context('spawn')
+        self._running = {} # future -> job id
+        self._leases_renewed_at = 0.0
+
+    def stop(self, *args):
+        logger.info("Analysis worker %s stopping after running jobs finish", self.worker_id)
+        self.stopping.set()
+
+    def run(self):
+        with self._context.Manager() as manager:
+            progress_queue = manager.Queue()
+            while not self.stopping.is_set():
+                with ProcessPoolExecutor(max_workers=self.processes, mp_context=self._context) as pool:
+                    self._run_pool(pool, progress_queue)
+
+    def _run_pool(self, pool, progress_queue):
+        while self._running or not self.stopping.is_set():
+            with self.app.app_context():
+                try:
+                    self._publish_progress(progress_queue)
+                    if self._collect_results():
+                        return # The pool broke; start a new one
+                    if not self.stopping.is_set():
+                        self._claim(pool, progress_queue)
+                    self._renew_leases()
+                finally:
+                    db.session.remove()
+            if self._running:
+                wait(self._running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                self.stopping.wait(self.poll_interval)
+
+    def _claim(self, pool, progress_queue):
+        free = self.processes - len(self._running)
+        for job in AnalysisService.claim_jobs(self.worker_id, free):
+            payload = AnalysisService.job_payload(job)
+            logger.info("Job %s (analysis %s) attempt %s started", job.id, job.analysis_id, job.attempts)
+            self._running[pool.submit(analyze_order_documents, payload, progress_queue)] = job.id
+        db.session.commit()
+
+    def _collect_results(self):
+        broken = False
+        for future in [future for future in self._running if future.done()]:
+            job_id = self._running.pop(future)
+            error = future.exception()
+            if error is None:
+                AnalysisService.complete_job(job_id, self.worker_id, future.result())
+                logger.info("Job %s completed", job_id)
+                continue
+            broken = broken or isinstance(error, BrokenProcessPool)
+            logger.warning("Job %s failed: %r", job_id, error)
+            AnalysisService.fail_job(
+                job_id, self.worker_id, f"{type(error).__name__}: {error}",
+                retry=not isinstance(error, NonRetryableError)
+            )
+        return broken
+
+    def _publish_progress(self, progress_queue):
+        latest = {}
+        while True:
+            try:
+                job_id, progress, message = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            latest[job_id] = (progress, message) # Only the newest update per job is worth a write
+        for job_id, (progress, message) in latest.items():
+            AnalysisService.report_progress(job_id, self.worker_id, progress, message)
+
+    def _renew_leases(self):
+        now = time.monotonic()
+        if self._running and now - self._leases_renewed_at >= Config.ANALYSIS_JOB_LEASE_SECONDS / 3:
+            AnalysisService.extend_leases(self.worker_id, self._running.values())
+            self._leases_renewed_at = now
+
+@click.command('analysis-worker')
+@click.option('--processes', type=int, default=None, help='Analysis processes (default: ANALYSIS_WORKER_PROCESSES)')
+@with_appcontext
+def analysis_worker_command(processes):
+    """Run the analysis job worker"""
+    worker = AnalysisWorker(current_app._get_current_object(), processes=processes)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    click.echo(f"Analysis worker {worker.worker_id} running with {worker.processes} processes")
+    worker.run()
@@ -0,0 +1,71 @@
+"""
+Document analysis run in the worker's process pool.
+
+Functions here receive plain data (no ORM objects, no database access) so
+they can run in a separate process; progress is reported through a queue
+that the parent worker drains and publishes.
+"""
+import hashlib
+import re
+from app.services.storage import get_storage, is_not_found
+
+CHUNK_SIZE = 1024 * 1024
+TEXT_TYPES = ('application/json', 'application/xml', 'text/csv')
+_WORD = re.compile(rb'\S+')
+
+class NonRetryableError(Exception):
+    """A failure that will not go away on retry (e.g. a missing file)"""
+
+def _open_document(file_path):
+    # Each pool process gets its own storage backend (and S3 client) on first use
+    storage = get_storage()
+    try:
+        return storage.open(storage.key_for(file_path))
+    except Exception as e:
+        if is_not_found(e):
+            raise NonRetryableError(f"File not found: {file_path}")
+        raise
+
+def analyze_document(document):
+    """Streams one document: size, SHA-256 and, for text documents, line and word counts"""
+    file_type = document.get('file_type') or ''
+    is_text = file_type.startswith('text/') or file_type in TEXT_TYPES
+    digest = hashlib.sha256()
+    size = lines = words = 0
+    in_word = False
+
+    stream = _open_document(document['file_path'])
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            if is_text:
+                lines += chunk.count(b'\n')
+                words += len(_WORD.findall(chunk))
+                if in_word and not chunk[:1].isspace():
+                    words -= 1 # A word split across chunks was counted twice
+                in_word = not chunk[-1:].isspace()
+    finally:
+        stream.close()
+
+    result = {'document_id': document['id'], 'filename': document['filename'], 'size': size, 'sha256': digest.hexdigest()}
+    if is_text:
+        result.update({'lines': lines, 'words': words})
+    return result
+
+def analyze_order_documents(payload, progress_queue=None):
+    """Entry point for the process pool: analyzes all documents of an order"""
+    documents = payload['documents']
+    if not documents:
+        raise NonRetryableError("Order has no documents to analyze")
+
+    results = []
+    for index, document in enumerate(documents, start=1):
+        results.append(analyze_document(document))
+        if progress_queue is not None:
+            progress_queue.put((payload['job_id'], index * 100 // len(documents), f"Analyzed {document['filename']}"))
+    return {
+        'document_count': len(results),
+        'total_size': sum(result['size'] for result in results),
+        'documents': results
+    }
@@ -0,0 +1,60 @@
+"""
+Storage sweeper: `flask storage-sweeper`.
+
+Deletes objects queued in the storage deletion outbox every
+STORAGE_SWEEP_INTERVAL seconds, discards expired resumable uploads, and
+every STORAGE_ORPHAN_SCAN_INTERVAL seconds queues objects that no database
+row references. Several sweepers can run at once.
+"""
+import logging
+import signal
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.app import db
+from app.config import Config
+from app.services.resumable_upload_service import ResumableUploadService
+from app.services.storage_deletion_service import StorageDeletionService
+
+logger = logging.getLogger(__name__)
+
+def run_sweeper(app, stopping, scan_orphans=True):
+    next_scan = time.monotonic() if scan_orphans else float('inf')
+    while not stopping.is_set():
+        with app.app_context():
+            try:
+                expired = ResumableUploadService.abort_expired()
+                deleted = StorageDeletionService.sweep()
+                if deleted or expired:
+                    logger.info("Storage sweep: %s queued deletions processed, %s expired uploads discarded", deleted, expired)
+                if time.monotonic() >= next_scan:
+                    logger.info("Orphan scan queued %s objects", StorageDeletionService.scan_orphans())
+                    next_scan = time.monotonic() + Config.STORAGE_ORPHAN_SCAN_INTERVAL
+            except Exception:
+                logger.exception("Storage sweep failed")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        stopping.wait(Config.STORAGE_SWEEP_INTERVAL)
+
+@click.command('storage-sweeper')
+@click.option('--once', is_flag=True, help='Run a single sweep (and orphan scan) and exit')
+@click.option('--no-orphan-scan', is_flag=True, help='Only process the deletion queue')
+@with_appcontext
+def storage_sweeper_command(once, no_orphan_scan):
+    """Delete queued storage objects and reconcile storage with the database"""
+    stopping = threading.Event()
+    if once:
+        stopping.set()
+        click.echo(f"{ResumableUploadService.abort_expired()} expired uploads discarded")
+        if not no_orphan_scan:
+            click.echo(f"{StorageDeletionService.scan_orphans()} orphaned objects queued")
+        click.echo(f"{StorageDeletionService.sweep()} queued deletions processed")
+        return
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+    run_sweeper(current_app._get_current_object(), stopping, scan_orphans=not no_orphan_scan)
@@ -0,0 +1,110 @@
+"""
+Benchmark: S3 call latency with a new boto3 client per call vs. the shared
+storage client (app.services.storage).
+
+Each call is a HeadObject on a small object. Paths:
+
+- new client per call  - boto3.client(...) + head_object, as the document
+                         service did before the storage layer
+- shared client        - S3Storage.exists on the process-wide client
+- shared client, async - S3Storage.aexists, --concurrency calls at a time
+                         on the storage I/O thread pool
+
+With moto's in-process mock (default) the difference is the cost of
+building a client: credential resolution, endpoint and service model
+loading. With --endpoint-url pointing at a moto server (moto_server) or
+MinIO it also includes connection setup, as a new client cannot reuse
+pooled connections.
+
+Run (from backend/):
+
+    python -m benchmarks.bench_storage_client --calls 200
+    python -m benchmarks.bench_storage_client --endpoint-url http://localhost:5000
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import time
+
+BUCKET = 'benchmark-documents'
+KEY = 'benchmarks/object.bin'
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def measure(fn, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), percentile(samples, 0.95)
+
+async def measure_async(storage, calls, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            await storage.aexists(KEY)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    return statistics.median(samples), percentile(samples, 0.95), calls / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--endpoint-url', help='S3 endpoint (moto server, MinIO); in-process moto when omitted')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ['AWS_S3_BUCKET_NAME'] = BUCKET
+    if args.endpoint_url:
+        os.environ['AWS_S3_ENDPOINT_URL'] = args.endpoint_url
+    mock = contextlib.nullcontext()
+    if not args.endpoint_url:
+        from moto import mock_aws
+        mock = mock_aws()
+
+    with mock:
+        import boto3
+        from app.services.storage import get_storage
+
+        storage = get_storage()
+        with contextlib.suppress(storage.client.exceptions.BucketAlreadyOwnedByYou):
+            storage.client.create_bucket(Bucket=BUCKET)
+        storage.client.put_object(Bucket=BUCKET, Key=KEY, Body=b'x' * 1024)
+
+        def new_client_per_call():
+            client = boto3.client(
+                's3',
+                aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
+                aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY'],
+                endpoint_url=args.endpoint_url
+            )
+            client.head_object(Bucket=BUCKET, Key=KEY)
+
+        storage.exists(KEY) # Build the shared client outside the measurement
+        results = {
+            'new client per call': measure(new_client_per_call, args.calls),
+            'shared client': measure(lambda: storage.exists(KEY), args.calls),
+        }
+        median, p95, throughput = asyncio.run(measure_async(storage, args.calls, args.concurrency))
+
+    print(f"{'path':<24} {'median [ms]':>12} {'p95 [ms]':>10} {'calls/s':>9}")
+    for name, (median_ms, p95_ms) in results.items():
+        print(f"{name:<24} {median_ms:>12.2f} {p95_ms:>10.2f} {1000 / median_ms:>9.0f}")
+    print(f"{'shared client, async':<24} {median:>12.2f} {p95:>10.2f} {throughput:>9.0f}")
+
+if __name__ == '__main__':
+    main()
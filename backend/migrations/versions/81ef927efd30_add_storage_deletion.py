@@ -0,0 +1,39 @@
+"""add storage_deletion
+
+Revision ID: 81ef927efd30
+Revises: 74766cf97dff
+Create Date: 2026-10-18 08:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81ef927efd30'
+down_revision = '74766cf97dff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('storage_deletion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('storage_key', sa.String(length=512), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('not_before', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('storage_deletion', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_storage_deletion_not_before'), ['not_before'], unique=False)
+        batch_op.create_index(batch_op.f('ix_storage_deletion_storage_key'), ['storage_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('storage_deletion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_storage_deletion_storage_key'))
+        batch_op.drop_index(batch_op.f('ix_storage_deletion_not_before'))
+
+    op.drop_table('storage_deletion')
@@ -0,0 +1,57 @@
+"""add analysis job queue and analysis progress
+
+Revision ID: bfb063c3f6f4
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-18 06:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bfb063c3f6f4'
+down_revision = '3f9a1c7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analysis_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('operator_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=64), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=128), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analysis.id'], ),
+    sa.ForeignKeyConstraint(['operator_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('analysis_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_analysis_job_analysis_id'), ['analysis_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_analysis_job_operator_id'), ['operator_id'], unique=False)
+        batch_op.create_index('ix_analysis_job_status_run_at', ['status', 'run_at'], unique=False)
+
+    with op.batch_alter_table('analysis', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('progress', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('progress_message', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis', schema=None) as batch_op:
+        batch_op.drop_column('progress_message')
+        batch_op.drop_column('progress')
+
+    with op.batch_alter_table('analysis_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_analysis_job_status_run_at')
+        batch_op.drop_index(batch_op.f('ix_analysis_job_operator_id'))
+        batch_op.drop_index(batch_op.f('ix_analysis_job_analysis_id'))
+
+    op.drop_table('analysis_job')
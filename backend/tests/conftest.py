@@ -0,0 +1,89 @@
+import boto3
+import pytest
+from flask_jwt_extended import create_access_token
+from moto import mock_aws
+
+from app.app import create_app, db as _db
+from app.config import TestingConfig
+from app.models.order import Order
+from app.models.user import User
+from app.services import storage as storage_module
+from app.services.storage import LocalStorage, S3Storage
+from app.utils.identity import identity_cache, token_claims
+
+BUCKET = 'test-documents'
+
+
+class SQLiteTestingConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app = create_app(SQLiteTestingConfig)
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+    identity_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Local storage in a temporary directory, used by every service during the test"""
+    backend = LocalStorage(str(tmp_path / 'storage'))
+    monkeypatch.setattr(storage_module, '_storage', storage_module._ProcessLocal(lambda: backend))
+    return backend
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    """S3 storage on a moto bucket, used by every service during the test"""
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        backend = S3Storage(BUCKET, concurrency=2)
+        monkeypatch.setattr(storage_module, '_storage', storage_module._ProcessLocal(lambda: backend))
+        yield backend
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username='jan', role='user'):
+        user = User(username=username, email=f'{username}@example.com', role=role)
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_order(db):
+    def make_order(user):
+        order = Order(user_id=user.id)
+        db.session.add(order)
+        db.session.commit()
+        return order
+    return make_order
+
+
+@pytest.fixture
+def auth_headers():
+    def auth_headers(user):
+        token = create_access_token(identity=user.id, additional_claims=token_claims(user))
+        return {'Authorization': f'Bearer {token}'}
+    return auth_headers
@@ -0,0 +1,171 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import Config
+from app.models.analysis_job import AnalysisJob
+from app.services.analysis_service import AnalysisService
+from app.services.document_service import DocumentService
+
+
+@pytest.fixture
+def operator(make_user):
+    return make_user('operator', role='operator')
+
+
+@pytest.fixture
+def enqueue(storage, make_user, make_order, operator):
+    def enqueue(username='jan'):
+        order = make_order(make_user(username))
+        DocumentService.upload_stream(io.BytesIO(b'wyrok\n'), order.id, 'wyrok.txt')
+        return AnalysisService.enqueue_analysis(order, operator.id)
+    return enqueue
+
+
+def make_due(db, job):
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_claim_locks_job_for_worker(enqueue):
+    analysis = enqueue()
+
+    jobs = AnalysisService.claim_jobs('w1', 5)
+
+    assert [job.analysis_id for job in jobs] == [analysis.id]
+    job = jobs[0]
+    assert (job.status, job.attempts, job.locked_by) == ('in_progress', 1, 'w1')
+    assert job.locked_until > datetime.utcnow()
+    assert analysis.status == 'in_progress'
+    assert [document.status for document in analysis.order.documents] == ['processing']
+    assert AnalysisService.claim_jobs('w2', 5) == []
+
+
+def test_claim_limits_running_jobs_per_operator(enqueue):
+    for username in ('jan', 'anna', 'ewa'):
+        enqueue(username)
+
+    assert len(AnalysisService.claim_jobs('w1', 5)) == Config.ANALYSIS_OPERATOR_CONCURRENCY
+    assert AnalysisService.claim_jobs('w2', 5) == []
+
+
+def test_failed_attempt_is_retried_after_backoff(db, enqueue):
+    analysis = enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+
+    AnalysisService.fail_job(job.id, 'w1', 'OSError: timeout')
+
+    assert (job.status, job.locked_by, job.last_error) == ('pending', None, 'OSError: timeout')
+    assert job.run_at > datetime.utcnow()
+    assert analysis.status == 'pending'
+    assert AnalysisService.claim_jobs('w1', 1) == []
+
+    make_due(db, job)
+    assert AnalysisService.claim_jobs('w1', 1) == [job]
+    assert job.attempts == 2
+
+
+def test_gives_up_after_max_attempts(db, enqueue):
+    analysis = enqueue()
+    job = analysis.jobs.one()
+
+    for attempt in range(1, job.max_attempts + 1):
+        make_due(db, job)
+        assert AnalysisService.claim_jobs('w1', 1) == [job]
+        AnalysisService.fail_job(job.id, 'w1', f'error {attempt}')
+
+    assert job.attempts == Config.ANALYSIS_MAX_ATTEMPTS
+    assert (job.status, job.last_error) == ('failed', f'error {job.max_attempts}')
+    assert (analysis.status, analysis.progress_message) == ('failed', f'error {job.max_attempts}')
+    assert [document.status for document in analysis.order.documents] == ['failed']
+    make_due(db, job)
+    assert AnalysisService.claim_jobs('w1', 1) == []
+
+
+def test_non_retryable_failure_fails_at_once(enqueue):
+    analysis = enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+
+    AnalysisService.fail_job(job.id, 'w1', 'File not found', retry=False)
+
+    assert (job.status, job.attempts, analysis.status) == ('failed', 1, 'failed')
+
+
+def test_expired_lease_is_claimed_by_another_worker(db, enqueue):
+    analysis = enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert AnalysisService.claim_jobs('w2', 1) == [job]
+    assert (job.locked_by, job.attempts) == ('w2', 2)
+
+    # The first worker no longer owns the job and cannot overwrite the new attempt
+    AnalysisService.report_progress(job.id, 'w1', 50, 'stale')
+    assert AnalysisService.complete_job(job.id, 'w1', {'document_count': 1}) is None
+    assert (job.status, analysis.status, analysis.progress) == ('in_progress', 'in_progress', 0)
+
+
+def test_expired_lease_on_last_attempt_fails_job(db, enqueue):
+    analysis = enqueue()
+    job = analysis.jobs.one()
+    job.max_attempts = 1
+    db.session.commit()
+    AnalysisService.claim_jobs('w1', 1)
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert AnalysisService.claim_jobs('w2', 1) == []
+    assert (job.status, job.last_error) == ('failed', 'Worker lease expired')
+    assert analysis.status == 'failed'
+
+
+def test_extend_leases_only_renews_own_jobs(db, enqueue):
+    enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+    lease = job.locked_until - timedelta(seconds=60)
+    job.locked_until = lease
+    db.session.commit()
+
+    AnalysisService.extend_leases('w2', [job.id])
+    db.session.refresh(job)
+    assert job.locked_until == lease
+
+    AnalysisService.extend_leases('w1', [job.id])
+    db.session.refresh(job)
+    assert job.locked_until > lease
+
+
+def test_progress_and_completion(enqueue):
+    analysis = enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+
+    AnalysisService.report_progress(job.id, 'w1', 150, 'Analyzed wyrok.txt')
+    assert (analysis.progress, analysis.progress_message) == (99, 'Analyzed wyrok.txt')
+
+    AnalysisService.complete_job(job.id, 'w1', {'document_count': 1})
+    assert (job.status, job.locked_by) == ('completed', None)
+    assert (analysis.status, analysis.progress, analysis.progress_message) == ('completed', 100, None)
+    assert json.loads(analysis.result) == {'document_count': 1}
+    assert [document.status for document in analysis.order.documents] == ['analyzed']
+
+
+def test_progress_events_require_order_access(client, make_user, auth_headers, operator, enqueue):
+    analysis = enqueue()
+    job = AnalysisService.claim_jobs('w1', 1)[0]
+    AnalysisService.complete_job(job.id, 'w1', {'document_count': 1})
+    url = f'/api/v1/analyses/orders/{analysis.order_id}/analysis/events'
+
+    response = client.get(url, headers=auth_headers(make_user('anna')))
+    assert response.status_code == 403
+
+    for user in (analysis.order.user, operator):
+        response = client.get(url, headers=auth_headers(user))
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        event = json.loads(response.get_data(as_text=True).split('data: ', 1)[1])
+        assert (event['status'], event['progress']) == ('completed', 100)
+
+    assert client.get('/api/v1/analyses/orders/999/analysis/events', headers=auth_headers(operator)).status_code == 404
@@ -0,0 +1,95 @@
+import io
+import json
+import queue
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.analysis_service import AnalysisService
+from app.services.document_service import DocumentService
+from app.workers.analysis_worker import AnalysisWorker
+
+
+class InlinePool:
+    """Runs submitted jobs in the test process instead of a process pool"""
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            if self.error is not None:
+                raise self.error
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture
+def worker(app):
+    return AnalysisWorker(app, processes=2, poll_interval=0.01)
+
+
+@pytest.fixture
+def analysis(storage, make_user, make_order):
+    order = make_order(make_user())
+    DocumentService.upload_stream(io.BytesIO(b'wyrok sadu\nuzasadnienie\n'), order.id, 'wyrok.txt')
+    return AnalysisService.enqueue_analysis(order, make_user('operator', role='operator').id)
+
+
+def run_once(worker, pool):
+    progress_queue = queue.Queue()
+    worker._claim(pool, progress_queue)
+    worker._publish_progress(progress_queue)
+    return worker._collect_results()
+
+
+def test_worker_runs_job_and_records_result(worker, analysis):
+    assert run_once(worker, InlinePool()) is False
+
+    job = analysis.jobs.one()
+    assert (job.status, job.attempts) == ('completed', 1)
+    assert (analysis.status, analysis.progress) == ('completed', 100)
+    result = json.loads(analysis.result)
+    assert result['document_count'] == 1
+    assert result['documents'][0]['lines'] == 2
+    assert worker._running == {}
+
+
+def test_worker_publishes_latest_progress_per_job(worker, analysis):
+    job = AnalysisService.claim_jobs(worker.worker_id, 1)[0]
+    progress_queue = queue.Queue()
+    for update in ((job.id, 10, 'first'), (job.id, 60, 'second')):
+        progress_queue.put(update)
+
+    worker._publish_progress(progress_queue)
+
+    assert (analysis.progress, analysis.progress_message) == (60, 'second')
+
+
+def test_worker_retries_failed_job(worker, analysis):
+    assert run_once(worker, InlinePool(OSError('storage timeout'))) is False
+
+    job = analysis.jobs.one()
+    assert (job.status, job.attempts, job.last_error) == ('pending', 1, 'OSError: storage timeout')
+    assert analysis.status == 'pending'
+
+
+def test_worker_fails_job_without_retry_for_missing_file(worker, analysis, storage):
+    for document in analysis.order.documents:
+        storage.delete(storage.key_for(document.file_path))
+
+    run_once(worker, InlinePool())
+
+    job = analysis.jobs.one()
+    assert (job.status, job.attempts) == ('failed', 1)
+    assert analysis.status == 'failed'
+    assert analysis.progress_message.startswith('NonRetryableError: File not found')
+
+
+def test_worker_reports_broken_pool(worker, analysis):
+    assert run_once(worker, InlinePool(BrokenProcessPool('worker died'))) is True
+    assert analysis.jobs.one().status == 'pending'
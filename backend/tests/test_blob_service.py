@@ -0,0 +1,90 @@
+import io
+
+import pytest
+
+from app.models.blob import Blob
+from app.models.storage_deletion import StorageDeletion
+from app.services.blob_service import BlobService, blob_key
+from app.services.document_service import DocumentService
+from app.utils.exceptions import UploadConflict
+
+CONTENT = b'%PDF-1.7\nWyrok Sadu Rejonowego'
+
+
+def stored_files(storage):
+    return sorted(key for key, _ in storage.list_keys())
+
+
+def test_duplicate_content_shares_one_blob(storage, make_user, make_order):
+    order = make_order(make_user())
+    first = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    second = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'kopia.pdf')
+
+    assert first.blob_id == second.blob_id
+    assert first.file_path == second.file_path == storage.location(blob_key(first.sha256))
+    assert Blob.query.one().ref_count == 2
+    # The second upload's temporary copy is discarded
+    assert stored_files(storage) == [blob_key(first.sha256)]
+
+
+def test_releasing_last_reference_queues_deletion(storage, make_user, make_order):
+    order = make_order(make_user())
+    first = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    second = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'kopia.pdf')
+    key = blob_key(first.sha256)
+
+    assert DocumentService.delete_document(first.id) is True
+    assert Blob.query.one().ref_count == 1
+    assert StorageDeletion.query.count() == 0
+
+    assert DocumentService.delete_document(second.id) is True
+    assert Blob.query.count() == 0
+    assert [entry.storage_key for entry in StorageDeletion.query] == [key]
+    # The object is removed by the sweeper, not by the request
+    assert stored_files(storage) == [key]
+
+
+def test_upload_cancels_queued_deletion(storage, make_user, make_order):
+    order = make_order(make_user())
+    document = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    DocumentService.delete_document(document.id)
+
+    DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    assert StorageDeletion.query.count() == 0
+    assert Blob.query.one().ref_count == 1
+
+
+def test_store_retries_when_blob_is_released_concurrently(db, storage, make_user, make_order, monkeypatch):
+    order = make_order(make_user())
+    existing = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    add_reference = BlobService.add_reference
+    calls = []
+
+    def racing_add_reference(sha256):
+        calls.append(sha256)
+        if len(calls) == 1:
+            return None # The blob row is not visible yet, so the insert conflicts
+        if len(calls) == 2:
+            DocumentService.delete_document(existing.id) # Its last reference is dropped meanwhile
+        return add_reference(sha256)
+
+    monkeypatch.setattr(BlobService, 'add_reference', staticmethod(racing_add_reference))
+    document = DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'kopia.pdf')
+
+    assert len(calls) == 2
+    blob = Blob.query.one()
+    assert document.blob_id == blob.id and blob.ref_count == 1
+    assert StorageDeletion.query.count() == 0
+    assert stored_files(storage) == [blob.storage_key]
+
+
+def test_store_gives_up_after_repeated_conflicts(db, storage, make_user, make_order, monkeypatch):
+    order = make_order(make_user())
+    DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+    monkeypatch.setattr(BlobService, 'add_reference', staticmethod(lambda sha256: None))
+
+    with pytest.raises(UploadConflict):
+        DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'kopia.pdf')
+    assert Blob.query.one().ref_count == 1
+    # The temporary upload is removed
+    assert stored_files(storage) == [Blob.query.one().storage_key]
@@ -0,0 +1,88 @@
+import base64
+import hashlib
+from urllib.parse import urlsplit
+
+from app.models.blob import Blob
+
+CONTENT = b'%PDF-1.7\nPelnomocnictwo procesowe'
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+def request_upload(client, order, headers, **fields):
+    body = {'filename': 'pelnomocnictwo.pdf', 'size': len(CONTENT), 'sha256': SHA256}
+    body.update(fields)
+    return client.post(f'/api/v1/orders/{order.id}/documents/upload-url', json=body, headers=headers)
+
+
+def complete_upload(client, order, headers, token):
+    return client.post(f'/api/v1/orders/{order.id}/documents/complete', json={'upload_token': token}, headers=headers)
+
+
+def test_local_direct_upload(client, storage, make_user, make_order, auth_headers):
+    user = make_user()
+    order = make_order(user)
+    headers = auth_headers(user)
+    upload = request_upload(client, order, headers).get_json()
+    assert upload['method'] == 'PUT'
+
+    assert complete_upload(client, order, headers, upload['upload_token']).status_code == 409
+
+    response = client.put(urlsplit(upload['upload_url']).path, data=CONTENT)
+    assert response.status_code == 204
+
+    response = complete_upload(client, order, headers, upload['upload_token'])
+    assert response.status_code == 201
+    document = response.get_json()
+    assert document['sha256'] == SHA256
+    assert document['size'] == len(CONTENT)
+    assert document['file_type'] == 'application/pdf'
+    assert Blob.query.one().ref_count == 1
+
+
+def test_local_direct_upload_is_verified(client, storage, make_user, make_order, auth_headers):
+    user = make_user()
+    order = make_order(user)
+    headers = auth_headers(user)
+    upload = request_upload(client, order, headers, sha256='0' * 64).get_json()
+    client.put(urlsplit(upload['upload_url']).path, data=CONTENT)
+
+    assert complete_upload(client, order, headers, upload['upload_token']).status_code == 422
+    # The rejected upload is removed from storage
+    assert list(storage.list_keys()) == []
+
+    upload = request_upload(client, order, headers, size=len(CONTENT) - 1).get_json()
+    assert client.put(urlsplit(upload['upload_url']).path, data=CONTENT).status_code == 413
+
+
+def test_upload_token_is_bound_to_the_order(client, storage, make_user, make_order, auth_headers):
+    user = make_user()
+    order, other_order = make_order(user), make_order(user)
+    headers = auth_headers(user)
+    upload = request_upload(client, order, headers).get_json()
+    client.put(urlsplit(upload['upload_url']).path, data=CONTENT)
+
+    assert complete_upload(client, other_order, headers, upload['upload_token']).status_code == 403
+    assert complete_upload(client, order, headers, 'not-a-token').status_code == 400
+
+
+def test_s3_presigned_upload(client, s3_storage, make_user, make_order, auth_headers):
+    user = make_user()
+    order = make_order(user)
+    headers = auth_headers(user)
+    upload = request_upload(client, order, headers, content_type='application/pdf').get_json()
+    checksum = base64.b64encode(bytes.fromhex(SHA256)).decode()
+    assert upload['headers'] == {'Content-Type': 'application/pdf', 'x-amz-checksum-sha256': checksum}
+
+    # The client's PUT to the presigned URL, with the headers it was given
+    key = urlsplit(upload['upload_url']).path.split(f'/{s3_storage.bucket}/', 1)[-1].lstrip('/')
+    s3_storage.client.put_object(
+        Bucket=s3_storage.bucket, Key=key, Body=CONTENT, ContentType='application/pdf', ChecksumSHA256=checksum
+    )
+
+    response = complete_upload(client, order, headers, upload['upload_token'])
+    assert response.status_code == 201
+    document = response.get_json()
+    assert document['sha256'] == SHA256
+    assert document['file_path'] == s3_storage.location(Blob.query.one().storage_key)
+    assert not s3_storage.exists(key)
+    assert s3_storage.open(Blob.query.one().storage_key).read() == CONTENT
@@ -0,0 +1,87 @@
+import io
+from urllib.parse import parse_qs, urlsplit
+
+from app.services.document_service import DocumentService
+
+CONTENT = b'%PDF-1.7\n' + bytes(range(256)) * 4
+
+
+def upload(make_user, make_order, username='jan'):
+    user = make_user(username)
+    order = make_order(user)
+    return user, DocumentService.upload_stream(io.BytesIO(CONTENT), order.id, 'wyrok.pdf')
+
+
+def get_content(client, document, headers, **extra):
+    return client.get(f'/api/v1/documents/{document.id}/content', headers=dict(headers, **extra))
+
+
+def test_full_download(client, storage, make_user, make_order, auth_headers):
+    user, document = upload(make_user, make_order)
+    response = get_content(client, document, auth_headers(user))
+
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers['Content-Type'] == 'application/pdf'
+    assert response.headers['ETag'] == f'"{document.sha256}"'
+    assert response.headers['Content-Disposition'].startswith('inline')
+
+
+def test_range_requests(client, storage, make_user, make_order, auth_headers):
+    user, document = upload(make_user, make_order)
+    headers = auth_headers(user)
+
+    response = get_content(client, document, headers, Range='bytes=0-4')
+    assert response.status_code == 206
+    assert response.data == b'%PDF-'
+    assert response.headers['Content-Range'] == f'bytes 0-4/{len(CONTENT)}'
+
+    response = get_content(client, document, headers, Range='bytes=-10')
+    assert response.status_code == 206
+    assert response.data == CONTENT[-10:]
+    assert response.headers['Content-Range'] == f'bytes {len(CONTENT) - 10}-{len(CONTENT) - 1}/{len(CONTENT)}'
+
+    response = get_content(client, document, headers, Range='bytes=100-')
+    assert response.status_code == 206
+    assert response.data == CONTENT[100:]
+
+    response = get_content(client, document, headers, Range=f'bytes={len(CONTENT)}-')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(CONTENT)}'
+
+
+def test_conditional_requests(client, storage, make_user, make_order, auth_headers):
+    user, document = upload(make_user, make_order)
+    headers = auth_headers(user)
+    etag = f'"{document.sha256}"'
+
+    assert get_content(client, document, headers, **{'If-None-Match': etag}).status_code == 304
+
+    response = get_content(client, document, headers, Range='bytes=0-4', **{'If-Range': etag})
+    assert response.status_code == 206
+    # A changed validator sends the whole document instead of the range
+    response = get_content(client, document, headers, Range='bytes=0-4', **{'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+
+def test_download_access(client, storage, make_user, make_order, auth_headers):
+    _, document = upload(make_user, make_order)
+
+    assert get_content(client, document, auth_headers(make_user('obcy'))).status_code == 404
+    assert get_content(client, document, auth_headers(make_user('operator', role='operator'))).status_code == 200
+
+
+def test_s3_download_redirects_to_presigned_url(client, s3_storage, make_user, make_order, auth_headers):
+    user, document = upload(make_user, make_order)
+    response = client.get(
+        f'/api/v1/documents/{document.id}/content?download=1', headers=auth_headers(user)
+    )
+
+    assert response.status_code == 302
+    assert response.headers['Cache-Control'] == 'no-store'
+    url = urlsplit(response.headers['Location'])
+    assert url.path.endswith(f'/{s3_storage.key_for(document.file_path)}')
+    query = parse_qs(url.query)
+    assert query['response-content-disposition'] == ["attachment; filename*=UTF-8''wyrok.pdf"]
+    assert query['response-content-type'] == ['application/pdf']
@@ -0,0 +1,69 @@
+import fakeredis
+
+from app.services.auth_service import AuthService
+from app.utils.identity import Identity, IdentityCache, identity_cache, resolve_identity
+
+
+def test_resolve_identity_is_cached(db, make_user):
+    user = make_user()
+    assert resolve_identity(user.id) == Identity(user.id, 'user', 0)
+
+    # Without an invalidation the cached identity is served
+    user.role = 'admin'
+    db.session.commit()
+    assert resolve_identity(user.id).role == 'user'
+
+    identity_cache.invalidate(user.id)
+    assert resolve_identity(user.id).role == 'admin'
+
+
+def test_resolve_identity_of_deleted_user(db, make_user):
+    user = make_user()
+    user_id = user.id
+    db.session.delete(user)
+    db.session.commit()
+    assert resolve_identity(user_id) is None
+
+
+def test_role_change_rejects_old_tokens(client, make_user, auth_headers):
+    user = make_user()
+    old_headers = auth_headers(user)
+    assert client.get('/api/v1/orders/', headers=old_headers).status_code == 200
+
+    user = AuthService.change_user_role(user.id, 'operator')
+    assert client.get('/api/v1/orders/', headers=old_headers).status_code == 401
+    assert client.get('/api/v1/orders/', headers=auth_headers(user)).status_code == 200
+
+
+def test_revoked_tokens_are_rejected(client, make_user, auth_headers):
+    user = make_user()
+    headers = auth_headers(user)
+    assert client.get('/api/v1/orders/', headers=headers).status_code == 200
+
+    assert AuthService.revoke_user_tokens(user.id) is True
+    assert client.get('/api/v1/orders/', headers=headers).status_code == 401
+
+
+def test_redis_cache_invalidation_reaches_every_worker():
+    server = fakeredis.FakeServer()
+    worker_a = IdentityCache(ttl=30, redis_client=lambda: fakeredis.FakeRedis(server=server))
+    worker_b = IdentityCache(ttl=30, redis_client=lambda: fakeredis.FakeRedis(server=server))
+
+    worker_a.set(1, Identity(1, 'admin', 0))
+    assert worker_a.get(1) == Identity(1, 'admin', 0)
+    assert worker_b.get(1) == Identity(1, 'admin', 0)
+
+    worker_b.invalidate(1)
+    assert worker_a.get(1) is None
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = IdentityCache(ttl=30, maxsize=2, redis_client=lambda: None)
+    for user_id in (1, 2):
+        cache.set(user_id, Identity(user_id, 'user', 0))
+    cache.get(1)
+    cache.set(3, Identity(3, 'user', 0))
+
+    assert cache.get(1) is not None
+    assert cache.get(2) is None
+    assert cache.get(3) is not None
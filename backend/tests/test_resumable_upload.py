@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import os
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import pytest
+
+from app.models.blob import Blob
+from app.models.document import Document
+from app.models.upload_session import UploadSession
+from app.services.blob_service import BlobService
+from app.services.resumable_upload_service import ResumableUploadService
+
+TUS = {'Tus-Resumable': '1.0.0'}
+
+
+@pytest.fixture
+def uploader(client, make_user, make_order, auth_headers):
+    user = make_user()
+    order = make_order(user)
+    headers = dict(auth_headers(user), **TUS)
+
+    class Uploader:
+        def create(self, length, filename='akta.pdf'):
+            metadata = f"filename {base64.b64encode(filename.encode()).decode()}"
+            response = client.post(
+                f'/api/v1/orders/{order.id}/documents/resumable',
+                headers=dict(headers, **{'Upload-Length': str(length), 'Upload-Metadata': metadata})
+            )
+            assert response.status_code == 201
+            return urlsplit(response.headers['Location']).path
+
+        def patch(self, location, offset, chunk):
+            return client.patch(
+                location, data=chunk, content_type='application/offset+octet-stream',
+                headers=dict(headers, **{'Upload-Offset': str(offset)})
+            )
+
+        def offset(self, location):
+            response = client.head(location, headers=headers)
+            return response.status_code, int(response.headers.get('Upload-Offset', -1))
+
+        def delete(self, location):
+            return client.delete(location, headers=headers)
+
+    return Uploader()
+
+
+def upload_id(location):
+    return location.rsplit('/', 1)[-1]
+
+
+def send_chunks(uploader, location, data, chunk_size):
+    response = None
+    for offset in range(0, len(data), chunk_size):
+        response = uploader.patch(location, offset, data[offset:offset + chunk_size])
+    return response
+
+
+def test_local_chunked_upload(db, storage, uploader):
+    data = b'%PDF-1.7\n' + os.urandom(3000)
+    location = uploader.create(len(data))
+
+    response = uploader.patch(location, 0, data[:1000])
+    assert response.status_code == 204
+    assert response.headers['Upload-Offset'] == '1000'
+    assert uploader.offset(location) == (200, 1000)
+
+    response = send_chunks(uploader, location, data, 1000)
+    assert response.status_code == 204
+    assert response.headers['Upload-Offset'] == str(len(data))
+
+    document = db.session.get(Document, int(response.headers['X-Document-Id']))
+    assert document.sha256 == hashlib.sha256(data).hexdigest()
+    assert document.file_type == 'application/pdf'
+    with open(document.file_path, 'rb') as f:
+        assert f.read() == data
+    # Only the blob is left; the temporary upload is gone
+    assert [key for key, _ in storage.list_keys()] == [Blob.query.one().storage_key]
+
+
+def test_offset_must_match(storage, uploader):
+    data = os.urandom(2000)
+    location = uploader.create(len(data))
+    uploader.patch(location, 0, data[:1000])
+
+    assert uploader.patch(location, 500, data[500:]).status_code == 409
+    assert uploader.patch(location, 1000, data[1000:] + b'extra').status_code == 413
+    assert uploader.patch(location, 1000, data[1000:]).status_code == 204
+    assert uploader.patch(location, 2000, b'').status_code == 409
+
+
+def test_expired_upload_is_discarded(db, storage, uploader):
+    data = os.urandom(2000)
+    location = uploader.create(len(data))
+    uploader.patch(location, 0, data[:1000])
+    session = db.session.get(UploadSession, upload_id(location))
+    session.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert uploader.offset(location)[0] == 410
+    assert uploader.patch(location, 1000, data[1000:]).status_code == 410
+
+    assert ResumableUploadService.abort_expired() == 1
+    assert db.session.get(UploadSession, upload_id(location)).status == 'aborted'
+    assert list(storage.list_keys()) == []
+
+
+def test_terminate_upload(db, storage, uploader):
+    location = uploader.create(2000)
+    uploader.patch(location, 0, os.urandom(1000))
+
+    assert uploader.delete(location).status_code == 204
+    assert uploader.offset(location)[0] == 410
+    assert list(storage.list_keys()) == []
+
+
+def fail_first_store(monkeypatch):
+    store = BlobService.store
+    calls = []
+
+    def failing_store(stored, keep_upload=False):
+        calls.append(stored)
+        if len(calls) == 1:
+            raise RuntimeError("database went away")
+        return store(stored, keep_upload)
+
+    monkeypatch.setattr(BlobService, 'store', staticmethod(failing_store))
+    return calls
+
+
+def test_failed_finalize_is_retried(db, storage, uploader, monkeypatch):
+    data = os.urandom(2000)
+    location = uploader.create(len(data))
+    uploader.patch(location, 0, data[:1000])
+    calls = fail_first_store(monkeypatch)
+
+    response = uploader.patch(location, 1000, data[1000:])
+    assert response.status_code == 500
+    session = db.session.get(UploadSession, upload_id(location))
+    assert session.status == 'failed'
+    # The offset stays short of the length so the client resends the last chunk
+    assert uploader.offset(location) == (200, 1000)
+    assert Document.query.count() == 0
+    assert storage.exists(session.storage_key)
+
+    response = uploader.patch(location, 1000, data[1000:])
+    assert response.status_code == 204
+    assert response.headers['Upload-Offset'] == str(len(data))
+    assert len(calls) == 2
+    document = db.session.get(Document, int(response.headers['X-Document-Id']))
+    assert document.sha256 == hashlib.sha256(data).hexdigest()
+    assert not storage.exists(session.storage_key)
+    assert uploader.patch(location, len(data), b'').status_code == 409
+
+
+def test_s3_chunked_upload_with_failed_finalize(db, s3_storage, uploader, monkeypatch):
+    # Chunks smaller than a part are carried over as pending objects
+    data = b'%PDF-1.7\n' + os.urandom(2 * s3_storage.part_size + 1000)
+    chunk_size = 4 * 1024 * 1024
+    location = uploader.create(len(data))
+    last = len(data) - len(data) % chunk_size
+    assert send_chunks(uploader, location, data[:last], chunk_size).status_code == 204
+    fail_first_store(monkeypatch)
+
+    # The multipart upload is completed before the failure; the retry completes it again
+    assert uploader.patch(location, last, data[last:]).status_code == 500
+    response = uploader.patch(location, last, data[last:])
+    assert response.status_code == 204
+
+    document = db.session.get(Document, int(response.headers['X-Document-Id']))
+    assert document.size == len(data)
+    assert document.sha256 == hashlib.sha256(data).hexdigest()
+    blob = Blob.query.one()
+    assert s3_storage.open(blob.storage_key).read() == data
+    assert [key for key, _ in s3_storage.list_keys()] == [blob.storage_key]
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import io
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.config import Config
+from app.services.storage import LocalStorage, sniff_content_type
+from app.utils.exceptions import FileTooLarge
+
+PDF = b'%PDF-1.7\n' + b'x' * 1000
+
+
+class FailingStream(io.BytesIO):
+    """Stream that breaks after `limit` bytes, like a dropped connection"""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() >= self.limit:
+            raise IOError("connection reset")
+        return super().read(size)
+
+
+def test_sniff_content_type():
+    assert sniff_content_type(PDF, 'scan.txt', 'text/plain') == 'application/pdf'
+    assert sniff_content_type(b'PK\x03\x04...', 'umowa.docx') == \
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    assert sniff_content_type('Zażółć gęślą jaźń'.encode(), 'notes') == 'text/plain'
+    assert sniff_content_type(b'\x00\x01\x02', None, 'application/x-custom') == 'application/x-custom'
+
+
+def test_local_save_stream(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    stored = storage.save_stream('orders/1/a.pdf', io.BytesIO(PDF), 'a.pdf')
+
+    assert stored.size == len(PDF)
+    assert stored.sha256 == hashlib.sha256(PDF).hexdigest()
+    assert stored.content_type == 'application/pdf'
+    assert stored.location == str(tmp_path / 'orders' / '1' / 'a.pdf')
+    assert storage.key_for(stored.location) == 'orders/1/a.pdf'
+    with storage.open('orders/1/a.pdf') as f:
+        assert f.read() == PDF
+    assert storage.inspect('orders/1/a.pdf', 'a.pdf') == stored
+
+    storage.delete('orders/1/a.pdf')
+    storage.delete('orders/1/a.pdf')
+    assert not storage.exists('orders/1/a.pdf')
+    assert storage.inspect('orders/1/a.pdf') is None
+
+
+def test_local_failed_upload_leaves_no_file(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    monkeypatch.setattr(Config, 'UPLOAD_CHUNK_SIZE', 100)
+    with pytest.raises(IOError):
+        storage.save_stream('a.pdf', FailingStream(PDF, 500))
+
+    monkeypatch.setattr(Config, 'MAX_UPLOAD_SIZE', 500)
+    with pytest.raises(FileTooLarge):
+        storage.save_stream('a.pdf', io.BytesIO(PDF))
+    assert os.listdir(tmp_path) == []
+
+
+def test_local_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(str(tmp_path / 'root'))
+    with pytest.raises(ValueError):
+        storage.path('../outside.pdf')
+
+
+def test_s3_put_get_delete(s3_storage):
+    stored = s3_storage.save_stream('orders/1/a.pdf', io.BytesIO(PDF), 'a.pdf')
+
+    assert stored.location == f's3://{s3_storage.bucket}/orders/1/a.pdf'
+    assert s3_storage.key_for(stored.location) == 'orders/1/a.pdf'
+    assert s3_storage.open('orders/1/a.pdf').read() == PDF
+    assert s3_storage.open('orders/1/a.pdf', (0, 4)).read() == b'%PDF-'
+    head = s3_storage.client.head_object(Bucket=s3_storage.bucket, Key='orders/1/a.pdf')
+    assert head['ContentType'] == 'application/pdf'
+    assert s3_storage.inspect('orders/1/a.pdf', 'a.pdf') == stored
+
+    s3_storage.delete('orders/1/a.pdf')
+    assert not s3_storage.exists('orders/1/a.pdf')
+    assert s3_storage.inspect('orders/1/a.pdf') is None
+
+
+def test_s3_multipart_upload(s3_storage):
+    data = PDF + os.urandom(2 * s3_storage.part_size)
+    stored = s3_storage.save_stream('big.pdf', io.BytesIO(data), 'big.pdf')
+
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    head = s3_storage.client.head_object(Bucket=s3_storage.bucket, Key='big.pdf')
+    assert head['ContentLength'] == len(data)
+    assert head['ETag'].endswith('-3"') # Three parts
+    assert s3_storage.open('big.pdf').read() == data
+
+
+def test_s3_failed_multipart_upload_is_aborted(s3_storage):
+    data = PDF + os.urandom(2 * s3_storage.part_size)
+    with pytest.raises(IOError):
+        s3_storage.save_stream('big.pdf', FailingStream(data, s3_storage.part_size + 1))
+
+    uploads = s3_storage.client.list_multipart_uploads(Bucket=s3_storage.bucket)
+    assert uploads.get('Uploads', []) == []
+    assert not s3_storage.exists('big.pdf')
+
+
+def test_s3_delete_many_and_list_keys(s3_storage):
+    for key in ('a', 'b', 'c'):
+        s3_storage.save_stream(key, io.BytesIO(key.encode()))
+    assert sorted(key for key, _ in s3_storage.list_keys()) == ['a', 'b', 'c']
+
+    assert s3_storage.delete_many(['a', 'b', 'missing']) == {}
+    assert [key for key, _ in s3_storage.list_keys()] == ['c']
+
+
+def test_s3_presigned_urls(s3_storage):
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    checksum = base64.b64encode(hashlib.sha256(PDF).digest()).decode()
+    url, headers = s3_storage.presigned_put('tmp/upload', 900, 'application/pdf', sha256)
+    assert urlsplit(url).path.endswith('/tmp/upload')
+    assert parse_qs(urlsplit(url).query)['x-amz-checksum-sha256'] == [checksum]
+    assert headers == {'Content-Type': 'application/pdf', 'x-amz-checksum-sha256': checksum}
+
+    url = s3_storage.presigned_get('tmp/upload', 60, 'wyrok.pdf', 'application/pdf', as_attachment=True)
+    query = parse_qs(urlsplit(url).query)
+    assert query['response-content-disposition'] == ["attachment; filename*=UTF-8''wyrok.pdf"]
+    assert query['response-content-type'] == ['application/pdf']
+
+
+def test_stream_upload_endpoint(client, storage, make_user, make_order, auth_headers):
+    user = make_user()
+    order = make_order(user)
+    response = client.put(
+        f'/api/v1/orders/{order.id}/documents/stream?filename=wyrok.pdf',
+        data=PDF, headers=auth_headers(user), content_type='application/octet-stream'
+    )
+
+    assert response.status_code == 201
+    document = response.get_json()
+    assert document['size'] == len(PDF)
+    assert document['sha256'] == hashlib.sha256(PDF).hexdigest()
+    assert document['file_type'] == 'application/pdf'
+    with open(document['file_path'], 'rb') as f:
+        assert f.read() == PDF
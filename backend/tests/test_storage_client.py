@@ -0,0 +1,81 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import Config
+from app.services import storage as storage_module
+from app.services.storage import S3Storage, create_storage, get_storage
+
+
+def counting_client_factory(monkeypatch):
+    created = []
+    create_s3_client = storage_module.create_s3_client
+
+    def factory():
+        created.append(threading.current_thread().name)
+        return create_s3_client()
+
+    monkeypatch.setattr(storage_module, 'create_s3_client', factory)
+    return created
+
+
+def test_s3_client_is_shared_by_threads(s3_storage, monkeypatch):
+    created = counting_client_factory(monkeypatch)
+    storage = S3Storage(s3_storage.bucket)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: storage.client, range(32)))
+
+    assert len(created) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_s3_client_configuration(s3_storage, monkeypatch):
+    monkeypatch.setattr(Config, 'S3_MAX_POOL_CONNECTIONS', 7)
+    monkeypatch.setattr(Config, 'S3_MAX_ATTEMPTS', 2)
+    config = S3Storage(s3_storage.bucket).client.meta.config
+
+    assert config.max_pool_connections == 7
+    assert config.connect_timeout == Config.S3_CONNECT_TIMEOUT
+    assert config.read_timeout == Config.S3_READ_TIMEOUT
+    assert config.retries == {'mode': 'standard', 'total_max_attempts': 3} # Retries plus the first attempt
+
+
+def test_s3_client_is_recreated_after_fork(s3_storage, monkeypatch):
+    created = counting_client_factory(monkeypatch)
+    storage = S3Storage(s3_storage.bucket)
+    client = storage.client
+    monkeypatch.setattr(storage_module.os, 'getpid', lambda: -1) # As seen from a forked child
+
+    assert storage.client is not client
+    assert storage.client is storage.client
+    assert len(created) == 2
+
+
+def test_storage_backend_is_created_once_per_process(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'AWS_S3_BUCKET_NAME', None)
+    monkeypatch.setattr(Config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(storage_module, '_storage', storage_module._ProcessLocal(create_storage))
+
+    assert get_storage() is get_storage()
+    assert get_storage().root == str(tmp_path)
+
+
+def test_async_methods_run_on_the_io_pool(s3_storage):
+    threads = []
+    inspect = s3_storage.inspect
+
+    def recording_inspect(*args):
+        threads.append(threading.current_thread().name)
+        return inspect(*args)
+
+    s3_storage.inspect = recording_inspect
+
+    async def upload_and_inspect():
+        stored = await s3_storage.asave_stream('orders/1/a.txt', io.BytesIO(b'akt notarialny'), 'a.txt')
+        return stored, await s3_storage.ainspect('orders/1/a.txt', 'a.txt'), await s3_storage.aexists('missing')
+
+    stored, inspected, exists = asyncio.run(upload_and_inspect())
+    assert inspected == stored
+    assert exists is False
+    assert threads[0].startswith('storage-io')
@@ -0,0 +1,147 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+from app.config import Config
+from app.models.document import Document
+from app.models.storage_deletion import StorageDeletion
+from app.services.document_service import DocumentService
+from app.services.resumable_upload_service import ResumableUploadService
+from app.services.storage_deletion_service import StorageDeletionService
+
+
+def put(storage, key, data=b'content'):
+    storage.save_stream(key, io.BytesIO(data))
+
+
+def keys(storage):
+    return sorted(key for key, _ in storage.list_keys())
+
+
+def test_sweep_deletes_queued_objects_in_batches(db, storage):
+    for key in ('a', 'b', 'c'):
+        put(storage, key)
+    StorageDeletionService.enqueue(['a', 'b', 'c'])
+    db.session.commit()
+
+    assert StorageDeletionService.sweep_batch(batch_size=2) == 2
+    assert keys(storage) == ['c']
+    assert StorageDeletionService.sweep(batch_size=2) == 1
+    assert keys(storage) == []
+    assert StorageDeletion.query.count() == 0
+
+
+def test_sweep_keeps_referenced_objects(db, storage, make_user, make_order):
+    order = make_order(make_user())
+    document = DocumentService.upload_stream(io.BytesIO(b'%PDF-1.7 akt'), order.id, 'akt.pdf')
+    key = storage.key_for(document.file_path)
+    # Queued by hand while the blob is still referenced, as a stale queue entry would be
+    StorageDeletionService.enqueue([key])
+    db.session.commit()
+
+    assert StorageDeletionService.sweep() == 1
+    assert StorageDeletion.query.count() == 0
+    assert storage.exists(key)
+
+
+def test_failed_deletion_is_retried_with_backoff(db, storage, monkeypatch):
+    put(storage, 'a')
+    put(storage, 'b')
+    StorageDeletionService.enqueue(['a', 'b'])
+    db.session.commit()
+    delete_many = storage.delete_many
+    monkeypatch.setattr(storage, 'delete_many', lambda keys: {'b': 'AccessDenied: try later'})
+
+    assert StorageDeletionService.sweep() == 2
+    entry = StorageDeletion.query.one()
+    assert entry.storage_key == 'b'
+    assert entry.attempts == 1
+    assert entry.last_error == 'AccessDenied: try later'
+    assert entry.not_before > datetime.utcnow()
+    # Not due yet
+    assert StorageDeletionService.sweep() == 0
+
+    monkeypatch.setattr(storage, 'delete_many', delete_many)
+    entry.not_before = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert StorageDeletionService.sweep() == 1
+    assert StorageDeletion.query.count() == 0
+    assert not storage.exists('b')
+
+
+def test_deleting_a_document_queues_its_content(db, storage, make_user, make_order):
+    order = make_order(make_user())
+    document = DocumentService.upload_stream(io.BytesIO(b'%PDF-1.7 akt'), order.id, 'akt.pdf')
+    key = storage.key_for(document.file_path)
+
+    DocumentService.delete_document(document.id)
+    assert [entry.storage_key for entry in StorageDeletion.query] == [key]
+    assert storage.exists(key)
+
+    StorageDeletionService.sweep()
+    assert not storage.exists(key)
+
+
+def test_orphan_scan_respects_grace_period(db, storage):
+    put(storage, 'orphan')
+
+    assert StorageDeletionService.scan_orphans(grace_seconds=3600) == 0
+    assert StorageDeletionService.scan_orphans(grace_seconds=0) == 1
+    assert [entry.storage_key for entry in StorageDeletion.query] == ['orphan']
+    # Keys already queued are not queued again
+    assert StorageDeletionService.scan_orphans(grace_seconds=0) == 0
+
+
+def test_orphan_scan_keeps_referenced_objects(db, storage, make_user, make_order, monkeypatch, tmp_path):
+    user = make_user()
+    order = make_order(user)
+    blob_document = DocumentService.upload_stream(io.BytesIO(b'%PDF-1.7 akt'), order.id, 'akt.pdf')
+    session = ResumableUploadService.create(order.id, user.id, 100, 'pozew.pdf')
+    storage.write_at(session.storage_key, 0, io.BytesIO(b'x' * 10))
+
+    # A document stored before deduplication, with a path relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    put(storage, '5/ruling.pdf')
+    db.session.add(Document(order_id=order.id, filename='ruling.pdf', file_path=os.path.join('storage', '5', 'ruling.pdf')))
+    # ... and one stored with an absolute path
+    put(storage, '5/appeal.pdf')
+    db.session.add(Document(order_id=order.id, filename='appeal.pdf', file_path=storage.location('5/appeal.pdf')))
+    db.session.commit()
+    put(storage, 'orphan')
+
+    assert StorageDeletionService.scan_orphans(grace_seconds=0) == 1
+    assert [entry.storage_key for entry in StorageDeletion.query] == ['orphan']
+    StorageDeletionService.sweep()
+    assert keys(storage) == sorted([
+        '5/appeal.pdf', '5/ruling.pdf', storage.key_for(blob_document.file_path), session.storage_key
+    ])
+
+
+def test_orphan_scan_reads_legacy_paths_once(db, storage, make_user, make_order, monkeypatch):
+    order = make_order(make_user())
+    put(storage, 'legacy.pdf')
+    db.session.add(Document(order_id=order.id, filename='legacy.pdf', file_path=storage.location('legacy.pdf')))
+    db.session.commit()
+    for index in range(5):
+        put(storage, f'orphan-{index}')
+    calls = []
+    legacy_keys = StorageDeletionService._legacy_keys
+    monkeypatch.setattr(StorageDeletionService, '_legacy_keys', staticmethod(lambda: calls.append(1) or legacy_keys()))
+
+    assert StorageDeletionService.scan_orphans(grace_seconds=0, batch_size=2) == 5
+    assert calls == [1]
+    assert 'legacy.pdf' not in {entry.storage_key for entry in StorageDeletion.query}
+
+
+def test_sweeper_command(app, db, s3_storage, monkeypatch):
+    for key in ('orders/1/a.pdf', 'orders/1/b.pdf'):
+        put(s3_storage, key)
+    StorageDeletionService.enqueue(['orders/1/a.pdf'])
+    db.session.commit()
+    monkeypatch.setattr(Config, 'STORAGE_ORPHAN_GRACE_SECONDS', 0)
+
+    result = app.test_cli_runner().invoke(args=['storage-sweeper', '--once'])
+    assert result.exit_code == 0, result.output
+    assert '1 orphaned objects queued' in result.output
+    assert '2 queued deletions processed' in result.output
+    assert keys(s3_storage) == []
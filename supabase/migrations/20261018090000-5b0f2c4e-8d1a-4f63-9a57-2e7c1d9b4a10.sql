@@ -0,0 +1,11 @@
+-- Indeksy złożone dla paginacji kursorowej (keyset) po (created_at, id)
+-- Zapytania typu WHERE (created_at, id) > ($1, $2) ORDER BY created_at, id LIMIT n
+-- korzystają z tych indeksów niezależnie od numeru strony.
+CREATE INDEX IF NOT EXISTS idx_law_firms_created_at_id ON public.law_firms(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_clients_created_at_id ON public.clients(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_clients_law_firm_created_at_id ON public.clients(law_firm_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_cases_created_at_id ON public.cases(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_law_firm_created_at_id ON public.cases(law_firm_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_cases_client_created_at_id ON public.cases(client_id, created_at, id);
@@ -0,0 +1,31 @@
+-- Indeks wyszukiwania klientów
+-- Zastępuje ILIKE '%fraza%' na konkatenacji kolumn (pełny skan tabeli)
+-- zapytaniami pełnotekstowymi i trigramowymi obsługiwanymi przez indeksy GIN.
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- unaccent() nie jest IMMUTABLE, więc nie może być użyte w kolumnie generowanej
+CREATE OR REPLACE FUNCTION public.immutable_unaccent(value TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, value) $$;
+
+-- Znormalizowany tekst: małe litery, bez polskich znaków diakrytycznych
+ALTER TABLE public.clients ADD COLUMN IF NOT EXISTS search_text TEXT
+GENERATED ALWAYS AS (
+    lower(public.immutable_unaccent(
+        coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '')
+    ))
+) STORED;
+
+-- Kolumna generowana nie może odwoływać się do innej kolumny generowanej,
+-- więc tsvector budowany jest z tego samego wyrażenia co search_text
+ALTER TABLE public.clients ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    to_tsvector('simple', lower(public.immutable_unaccent(
+        coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '')
+    )))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_clients_search_vector ON public.clients USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_clients_search_text_trgm ON public.clients USING GIN (search_text gin_trgm_ops);
@@ -0,0 +1,116 @@
+-- Liczniki kancelarii utrzymywane przyrostowo przez triggery
+-- Odczyt statystyk kancelarii (GET /kancelarie/{id}) przy LAW_FIRM_STATS_COUNTERS=True
+-- to pojedynczy odczyt wiersza zamiast zliczania klientów i spraw.
+-- Funkcje triggerów są SECURITY DEFINER, bo tabela liczników ma włączone RLS,
+-- dlatego mają ustawiony search_path.
+-- Usunięcie kancelarii: klienci i sprawy są usuwani kaskadowo, a ich triggery
+-- AFTER DELETE działają już po usunięciu kancelarii. law_firm_stats_apply
+-- wyłącznie aktualizuje istniejący wiersz (tworzy go trigger na law_firms
+-- i wypełnienie poniżej), więc dla usuniętej kancelarii nic nie robi zamiast
+-- wstawiać wiersz naruszający klucz obcy.
+CREATE TABLE IF NOT EXISTS public.law_firm_stats (
+    law_firm_id UUID NOT NULL PRIMARY KEY REFERENCES public.law_firms(id) ON DELETE CASCADE,
+    clients_count INTEGER NOT NULL DEFAULT 0,
+    cases_count INTEGER NOT NULL DEFAULT 0,
+    active_cases_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- Wypełnienie liczników dla istniejących danych
+INSERT INTO public.law_firm_stats (law_firm_id, clients_count, cases_count, active_cases_count)
+SELECT
+    lf.id,
+    (SELECT count(*) FROM public.clients c WHERE c.law_firm_id = lf.id),
+    (SELECT count(*) FROM public.cases cs WHERE cs.law_firm_id = lf.id),
+    (SELECT count(*) FROM public.cases cs WHERE cs.law_firm_id = lf.id AND cs.status = 'active')
+FROM public.law_firms lf
+ON CONFLICT (law_firm_id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.law_firm_stats_apply(
+    firm_id UUID, clients_delta INTEGER, cases_delta INTEGER, active_delta INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE public.law_firm_stats SET
+        clients_count = clients_count + clients_delta,
+        cases_count = cases_count + cases_delta,
+        active_cases_count = active_cases_count + active_delta,
+        updated_at = now()
+    WHERE law_firm_id = firm_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.law_firm_stats_on_law_firm()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.law_firm_stats (law_firm_id) VALUES (NEW.id)
+    ON CONFLICT (law_firm_id) DO NOTHING;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.law_firm_stats_on_client()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.law_firm_stats_apply(OLD.law_firm_id, -1, 0, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.law_firm_stats_apply(NEW.law_firm_id, 1, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.law_firm_stats_on_case()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.law_firm_stats_apply(
+            OLD.law_firm_id, 0, -1, CASE WHEN OLD.status = 'active' THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.law_firm_stats_apply(
+            NEW.law_firm_id, 0, 1, CASE WHEN NEW.status = 'active' THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER law_firm_stats_law_firm_insert
+    AFTER INSERT ON public.law_firms
+    FOR EACH ROW
+    EXECUTE FUNCTION public.law_firm_stats_on_law_firm();
+
+CREATE TRIGGER law_firm_stats_client_insert_delete
+    AFTER INSERT OR DELETE ON public.clients
+    FOR EACH ROW
+    EXECUTE FUNCTION public.law_firm_stats_on_client();
+
+CREATE TRIGGER law_firm_stats_client_update
+    AFTER UPDATE OF law_firm_id ON public.clients
+    FOR EACH ROW
+    WHEN (OLD.law_firm_id IS DISTINCT FROM NEW.law_firm_id)
+    EXECUTE FUNCTION public.law_firm_stats_on_client();
+
+CREATE TRIGGER law_firm_stats_case_insert_delete
+    AFTER INSERT OR DELETE ON public.cases
+    FOR EACH ROW
+    EXECUTE FUNCTION public.law_firm_stats_on_case();
+
+CREATE TRIGGER law_firm_stats_case_update
+    AFTER UPDATE OF law_firm_id, status ON public.cases
+    FOR EACH ROW
+    WHEN (OLD.law_firm_id IS DISTINCT FROM NEW.law_firm_id OR OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION public.law_firm_stats_on_case();
+
+ALTER TABLE public.law_firm_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view stats of their law firm"
+ON public.law_firm_stats FOR SELECT
+USING (
+    law_firm_id = public.get_user_law_firm(auth.uid()) OR
+    public.get_user_role(auth.uid()) = 'admin'
+);
@@ -0,0 +1,20 @@
+-- Widok zmaterializowany statystyk spraw (CASE_STATS_MATERIALIZED_VIEW=True)
+-- Liczba spraw kancelarii w podziale na status, priorytet i przypisanego prawnika.
+-- GET /sprawy/statistics czyta z widoku zamiast agregować tabelę cases.
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.case_statistics_mv AS
+SELECT
+    law_firm_id,
+    status,
+    priority,
+    assigned_lawyer_id,
+    count(*)::INTEGER AS cases_count
+FROM public.cases
+GROUP BY law_firm_id, status, priority, assigned_lawyer_id;
+
+-- Indeks unikalny wymagany przez REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_case_statistics_mv_key
+ON public.case_statistics_mv (law_firm_id, status, priority, assigned_lawyer_id) NULLS NOT DISTINCT;
+
+-- Odświeżanie bez blokowania odczytów, np. co minutę przez pg_cron:
+-- SELECT cron.schedule('refresh-case-statistics', '* * * * *',
+--     'REFRESH MATERIALIZED VIEW CONCURRENTLY public.case_statistics_mv');